@@ -0,0 +1,140 @@
+"""
+Навантажувальна перевірка обробки оновлень
+
+Імітує потік оновлень від багатьох чатів (частина користувачів натискає
+кнопку двічі поспіль) і пропускає його через обробник оновлень так само,
+як це робить Application: послідовно, паралельно без порядку
+(concurrent_updates=N) та через ChatOrderedUpdateProcessor. Обробник
+імітує запит до БД у пулі потоків (іноді - повільний пошук). Для кожного
+режиму виводяться перцентилі затримки від надходження до завершення та
+кількість випадків, коли два оновлення одного чату оброблялись одночасно.
+
+Використання:
+    python bench_updates.py [--updates 2000] [--rate 200] [--chats 300]
+"""
+from types import SimpleNamespace
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import asyncio
+import random
+import statistics
+import time
+from telegram import Update
+from telegram.ext import SimpleUpdateProcessor
+from config import settings
+from bot.utils.update_processor import ChatOrderedUpdateProcessor
+
+FAST_SECONDS = 0.02  # звичайний обробник
+SLOW_SECONDS = 0.4  # повільний пошук
+SLOW_SHARE = 0.05
+DOUBLE_TAP_SHARE = 0.1
+
+
+class FakeUpdate(Update):
+    """Оновлення з потрібним чатом без розбору JSON"""
+
+    def __init__(self, update_id: int, chat_id: int):
+        super().__init__(update_id)
+        self._chat = SimpleNamespace(id=chat_id)
+
+    @property
+    def effective_chat(self):
+        return self._chat
+
+
+def make_workload(count: int, rate: float, chats: int, seed: int = 1):
+    """Список (час надходження, chat_id, тривалість обробки)"""
+    rng = random.Random(seed)
+    workload = []
+    now = 0.0
+    while len(workload) < count:
+        now += rng.expovariate(rate)
+        chat_id = rng.randrange(chats)
+        cost = SLOW_SECONDS if rng.random() < SLOW_SHARE else FAST_SECONDS
+        workload.append((now, chat_id, cost))
+        if rng.random() < DOUBLE_TAP_SHARE:
+            workload.append((now + 0.05, chat_id, cost))
+    workload.sort()
+    return workload[:count]
+
+
+async def run_mode(processor, workload, executor):
+    """Пропускає навантаження через обробник; повертає (затримки, перетини в чатах)"""
+    loop = asyncio.get_running_loop()
+    latencies = []
+    active = {}
+    overlaps = 0
+
+    async def handler(chat_id, cost, arrived):
+        nonlocal overlaps
+        active[chat_id] = active.get(chat_id, 0) + 1
+        if active[chat_id] > 1:
+            overlaps += 1
+        await loop.run_in_executor(executor, time.sleep, cost)
+        active[chat_id] -= 1
+        latencies.append(time.monotonic() - arrived)
+
+    await processor.initialize()
+    tasks = []
+    start = time.monotonic()
+    for i, (at, chat_id, cost) in enumerate(workload):
+        delay = start + at - time.monotonic()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        # Затримка рахується від запланованого надходження (при послідовній обробці воно чекає)
+        coroutine = handler(chat_id, cost, start + at)
+        update = FakeUpdate(i, chat_id)
+        if processor.max_concurrent_updates > 1:
+            tasks.append(asyncio.create_task(processor.process_update(update, coroutine)))
+        else:
+            # Як Application при concurrent_updates=1: наступне оновлення лише після попереднього
+            await processor.process_update(update, coroutine)
+    await asyncio.gather(*tasks)
+    await processor.shutdown()
+    return latencies, overlaps
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def report(name, latencies, overlaps):
+    print(
+        f"{name:<28} p50={percentile(latencies, 0.5) * 1000:7.1f} мс  "
+        f"p95={percentile(latencies, 0.95) * 1000:7.1f} мс  "
+        f"p99={percentile(latencies, 0.99) * 1000:7.1f} мс  "
+        f"середнє={statistics.mean(latencies) * 1000:7.1f} мс  "
+        f"одночасно в чаті: {overlaps}"
+    )
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--updates", type=int, default=2000)
+    parser.add_argument("--rate", type=float, default=200, help="оновлень на секунду")
+    parser.add_argument("--chats", type=int, default=300)
+    parser.add_argument("--workers", type=int, default=settings.CONCURRENT_UPDATES)
+    parser.add_argument("--sequential-updates", type=int, default=300, help="оновлень для послідовного режиму")
+    args = parser.parse_args()
+
+    executor = ThreadPoolExecutor(max_workers=settings.DB_EXECUTOR_WORKERS)
+    workload = make_workload(args.updates, args.rate, args.chats)
+    print(
+        f"Оновлень: {args.updates}, {args.rate:.0f}/с, чатів: {args.chats}, "
+        f"обробників: {args.workers}, потоків БД: {settings.DB_EXECUTOR_WORKERS}\n"
+    )
+
+    # Послідовна обробка не встигає за потоком, тому лише на початку навантаження
+    sequential = workload[:args.sequential_updates]
+    report(f"послідовно ({len(sequential)} онов.)", *await run_mode(SimpleUpdateProcessor(1), sequential, executor))
+    report("паралельно без порядку", *await run_mode(SimpleUpdateProcessor(args.workers), workload, executor))
+    report(
+        "паралельно, порядок у чаті",
+        *await run_mode(ChatOrderedUpdateProcessor(args.workers, settings.MAX_PENDING_UPDATES), workload, executor)
+    )
+    executor.shutdown()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,9 @@
 """Адмінські обробники для керування ботом"""
 from telegram import Update
 from telegram.ext import ContextTypes
-import asyncio
 import logging
+from bot.utils.db_helpers import run_db
+from scraper.leader import request_scrape
 
 logger = logging.getLogger(__name__)
 
@@ -16,11 +17,19 @@ async def update_jobs_handler(update: Update, context: ContextTypes.DEFAULT_TYPE
     await update.message.reply_text("🔄 Початок оновлення вакансій у фоновому режимі...")
     
     scheduler = context.application.bot_data.get('scheduler')
-    if not scheduler:
-        await update.message.reply_text("❌ Планувальник скрапінгу не знайдено.")
+    if scheduler:
+        # Цей інстанс - лідер: запускаємо скрапінг асинхронно
+        scheduler.run_scrape()
+        await update.message.reply_text("✅ Запит на скрапінг прийнято. Слідкуйте за логами сервера.")
         return
     
-    # Запускаємо скрапінг асинхронно
-    asyncio.create_task(scheduler.scrape_all())
+    leader = context.application.bot_data.get('leader')
+    if not leader or not leader.leader:
+        await update.message.reply_text("❌ Планувальник скрапінгу не знайдено.")
+        return
     
-    await update.message.reply_text("✅ Запит на скрапінг прийнято. Слідкуйте за логами сервера.")
+    # Скрапінг виконує інша репліка - передаємо запит через рядок оренди
+    await run_db(request_scrape)
+    await update.message.reply_text(
+        f"✅ Запит на скрапінг передано лідеру ({leader.leader}). Слідкуйте за логами сервера."
+    )
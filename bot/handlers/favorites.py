@@ -2,12 +2,66 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from database.database import get_db
-from database.models import User, UserFavorite, JobListing
+from database.models import UserFavorite
 from bot.keyboards.pagination import get_pagination_keyboard
 from bot.keyboards.main_menu import get_back_to_menu_keyboard
 from bot.utils.formatters import format_job_listing
-from bot.utils.db_helpers import get_db_session
+from bot.utils.db_helpers import load_job, run_db
+from bot.middlewares.user_middleware import resolve_user_id
+from bot.handlers.search import user_search_state
 from sqlalchemy.orm import Session
+from typing import List, Optional
+
+
+def _update_cached_favorite(user_id: int, job_id: int, is_favorite: bool):
+    """Синхронізує набір улюблених у кеші сторінок пошуку"""
+    page_cache = user_search_state.get(user_id, {}).get("page_cache")
+    if page_cache and job_id in page_cache["listings"]:
+        if is_favorite:
+            page_cache["favorites"].add(job_id)
+        else:
+            page_cache["favorites"].discard(job_id)
+
+
+def get_favorite_ids(db: Session, user_id: int) -> Optional[List[int]]:
+    """id улюблених вакансій (найновіші першими) або None, якщо користувача немає"""
+    # Отримуємо користувача
+    db_user_id = resolve_user_id(db, user_id)
+    if db_user_id is None:
+        return None
+    
+    # Отримуємо улюблені вакансії
+    return [
+        job_id for job_id, in db.query(UserFavorite.job_listing_id).filter(
+            UserFavorite.user_id == db_user_id
+        ).order_by(UserFavorite.created_at.desc()).limit(50)
+    ]
+
+
+def toggle_favorite(db: Session, user_id: int, job_id: int, add: bool) -> Optional[bool]:
+    """
+    Додає або видаляє вакансію з улюблених
+    
+    Returns:
+        True - змінено, False - вже було так, None - користувача не знайдено
+    """
+    db_user_id = resolve_user_id(db, user_id)
+    if db_user_id is None:
+        return None
+    
+    favorite = db.query(UserFavorite).filter(
+        UserFavorite.user_id == db_user_id,
+        UserFavorite.job_listing_id == job_id
+    ).first()
+    
+    if add and not favorite:
+        db.add(UserFavorite(user_id=db_user_id, job_listing_id=job_id))
+    elif not add and favorite:
+        db.delete(favorite)
+    else:
+        return False
+    db.commit()
+    return True
 
 
 async def favorites_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -18,35 +72,22 @@ async def favorites_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         await update.callback_query.answer()
     
     user_id = update.effective_user.id
+    job_ids = await run_db(get_favorite_ids, user_id)
     
-    with get_db_session() as db:
-        # Отримуємо користувача
-        db_user = db.query(User).filter(User.telegram_id == user_id).first()
+    if job_ids is None:
+        text = "❌ Помилка: користувач не знайдений"
+    elif not job_ids:
+        text = "⭐ У вас поки немає улюблених вакансій.\n\nДодайте вакансії в улюблені під час пошуку."
+    else:
+        # Зберігаємо для пагінації
+        if not hasattr(context, 'user_data'):
+            context.user_data = {}
+        context.user_data[f"favorites_{user_id}"] = job_ids
+        context.user_data[f"favorites_page_{user_id}"] = 1
         
-        if not db_user:
-            text = "❌ Помилка: користувач не знайдений"
-        else:
-            # Отримуємо улюблені вакансії
-            favorites = db.query(UserFavorite).filter(
-                UserFavorite.user_id == db_user.id
-            ).order_by(UserFavorite.created_at.desc()).limit(50).all()
-            
-            if not favorites:
-                text = "⭐ У вас поки немає улюблених вакансій.\n\nДодайте вакансії в улюблені під час пошуку."
-            else:
-                job_ids = [f.job_listing_id for f in favorites]
-                text = f"⭐ <b>Улюблені вакансії</b>\n\nЗнайдено: {len(favorites)} вакансій"
-                
-                # Зберігаємо для пагінації
-                if not hasattr(context, 'user_data'):
-                    context.user_data = {}
-                context.user_data[f"favorites_{user_id}"] = job_ids
-                context.user_data[f"favorites_page_{user_id}"] = 1
-                
-                # Показуємо першу вакансію
-                if job_ids:
-                    await show_favorite_job(update, context, user_id, job_ids[0], 1, len(job_ids))
-                    return
+        # Показуємо першу вакансію
+        await show_favorite_job(update, context, user_id, job_ids[0], 1, len(job_ids))
+        return
     
     if hasattr(query, 'edit_message_text'):
         await query.edit_message_text(
@@ -71,36 +112,35 @@ async def show_favorite_job(
     total_pages: int
 ):
     """Показує улюблену вакансію"""
-    with get_db_session() as db:
-        job = db.query(JobListing).filter(JobListing.id == job_id).first()
-        
-        if not job:
-            await update.callback_query.answer("Вакансія не знайдена")
-            return
-        
-        text = format_job_listing(job)
+    job = await run_db(load_job, job_id)
+    
+    if not job:
+        await update.callback_query.answer("Вакансія не знайдена")
+        return
+    
+    text = format_job_listing(job)
+    
+    if update.callback_query:
+        # Remove keyboard from the previous message
+        try:
+            await update.callback_query.edit_message_reply_markup(reply_markup=None)
+        except Exception:
+            pass
         
-        if update.callback_query:
-            # Remove keyboard from the previous message
-            try:
-                await update.callback_query.edit_message_reply_markup(reply_markup=None)
-            except Exception:
-                pass
-            
-            # Send new message
-            await update.callback_query.message.reply_text(
-                text,
-                reply_markup=get_pagination_keyboard(page, total_pages, job.id, is_favorite=True),
-                parse_mode="HTML",
-                disable_web_page_preview=False
-            )
-        else:
-            await update.message.reply_text(
-                text,
-                reply_markup=get_pagination_keyboard(page, total_pages, job.id, is_favorite=True),
-                parse_mode="HTML",
-                disable_web_page_preview=False
-            )
+        # Send new message
+        await update.callback_query.message.reply_text(
+            text,
+            reply_markup=get_pagination_keyboard(page, total_pages, job.id, is_favorite=True),
+            parse_mode="HTML",
+            disable_web_page_preview=False
+        )
+    else:
+        await update.message.reply_text(
+            text,
+            reply_markup=get_pagination_keyboard(page, total_pages, job.id, is_favorite=True),
+            parse_mode="HTML",
+            disable_web_page_preview=False
+        )
 
 
 async def favorite_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -111,62 +151,46 @@ async def favorite_callback_handler(update: Update, context: ContextTypes.DEFAUL
     user_id = update.effective_user.id
     data = query.data
     
-    with get_db_session() as db:
-        db_user = db.query(User).filter(User.telegram_id == user_id).first()
+    if data.startswith("favorite_add_"):
+        job_id = int(data.replace("favorite_add_", ""))
+        changed = await run_db(toggle_favorite, user_id, job_id, True)
+    elif data.startswith("favorite_remove_"):
+        job_id = int(data.replace("favorite_remove_", ""))
+        changed = await run_db(toggle_favorite, user_id, job_id, False)
+    else:
+        return
+    
+    if changed is None:
+        await query.edit_message_text(
+            "❌ Помилка: користувач не знайдений",
+            reply_markup=get_back_to_menu_keyboard(),
+            parse_mode="HTML"
+        )
+        return
+    
+    if data.startswith("favorite_add_"):
+        if changed:
+            _update_cached_favorite(user_id, job_id, True)
+            await query.answer("✅ Додано в улюблені")
+        else:
+            await query.answer("Вже в улюблених")
+    
+    elif changed:
+        _update_cached_favorite(user_id, job_id, False)
+        await query.answer("➖ Видалено з улюблених")
         
-        if not db_user:
+        # Оновлюємо повідомлення
+        job = await run_db(load_job, job_id)
+        if job:
+            text = format_job_listing(job)
+            # Отримуємо поточну сторінку з контексту
+            page = context.user_data.get(f"favorites_page_{user_id}", 1)
+            favorites_list = context.user_data.get(f"favorites_{user_id}", [])
+            total_pages = len(favorites_list)
+            
             await query.edit_message_text(
-                "❌ Помилка: користувач не знайдений",
-                reply_markup=get_back_to_menu_keyboard(),
-                parse_mode="HTML"
+                text,
+                reply_markup=get_pagination_keyboard(page, total_pages, job.id, is_favorite=False),
+                parse_mode="HTML",
+                disable_web_page_preview=False
             )
-            return
-        
-        if data.startswith("favorite_add_"):
-            job_id = int(data.replace("favorite_add_", ""))
-            
-            # Перевіряємо чи вже в улюблених
-            existing = db.query(UserFavorite).filter(
-                UserFavorite.user_id == db_user.id,
-                UserFavorite.job_listing_id == job_id
-            ).first()
-            
-            if existing:
-                await query.answer("Вже в улюблених")
-            else:
-                favorite = UserFavorite(
-                    user_id=db_user.id,
-                    job_listing_id=job_id
-                )
-                db.add(favorite)
-                db.commit()
-                await query.answer("✅ Додано в улюблені")
-        
-        elif data.startswith("favorite_remove_"):
-            job_id = int(data.replace("favorite_remove_", ""))
-            
-            favorite = db.query(UserFavorite).filter(
-                UserFavorite.user_id == db_user.id,
-                UserFavorite.job_listing_id == job_id
-            ).first()
-            
-            if favorite:
-                db.delete(favorite)
-                db.commit()
-                await query.answer("➖ Видалено з улюблених")
-                
-                # Оновлюємо повідомлення
-                job = db.query(JobListing).filter(JobListing.id == job_id).first()
-                if job:
-                    text = format_job_listing(job)
-                    # Отримуємо поточну сторінку з контексту
-                    page = context.user_data.get(f"favorites_page_{user_id}", 1)
-                    favorites_list = context.user_data.get(f"favorites_{user_id}", [])
-                    total_pages = len(favorites_list)
-                    
-                    await query.edit_message_text(
-                        text,
-                        reply_markup=get_pagination_keyboard(page, total_pages, job.id, is_favorite=False),
-                        parse_mode="HTML",
-                        disable_web_page_preview=False
-                    )
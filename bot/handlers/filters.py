@@ -9,6 +9,14 @@ from bot.keyboards.filters_keyboard import (
 )
 from bot.keyboards.main_menu import get_back_to_menu_keyboard
 from bot.handlers.search import user_search_state
+from bot.utils.db_helpers import run_db
+from search.facets import load_facet_counts
+
+
+async def get_facet_counts(field: str, filters_dict: dict) -> dict:
+    """Кількість вакансій для кнопок фільтра (одне читання таблиці лічильників)"""
+    facet_counts = await run_db(load_facet_counts)
+    return facet_counts.counts_for(field, filters_dict)
 
 
 async def filters_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -51,11 +59,20 @@ async def filter_callback_handler(update: Update, context: ContextTypes.DEFAULT_
     if data == "filters":
         await filters_handler(update, context)
     
-    elif data == "filter_city":
-        current_city = user_search_state[user_id]["filters"].get("city")
+    elif data == "filter_city" or data.startswith("radius_"):
+        filters_dict = user_search_state[user_id]["filters"]
+        if data.startswith("radius_"):
+            radius = int(data.replace("radius_", ""))
+            if radius:
+                filters_dict["radius_km"] = radius
+            else:
+                filters_dict.pop("radius_km", None)
         await query.edit_message_text(
-            "🏙️ Оберіть місто:",
-            reply_markup=get_city_keyboard(current_city),
+            "🏙️ Оберіть місто та радіус пошуку:",
+            reply_markup=get_city_keyboard(
+                filters_dict.get("city"), await get_facet_counts("city", filters_dict),
+                filters_dict.get("radius_km", 0)
+            ),
             parse_mode="HTML"
         )
     
@@ -65,8 +82,10 @@ async def filter_callback_handler(update: Update, context: ContextTypes.DEFAULT_
             user_search_state[user_id]["filters"].pop("city", None)
         else:
             user_search_state[user_id]["filters"]["city"] = city
+        radius = user_search_state[user_id]["filters"].get("radius_km")
+        radius_text = f" (+{radius} км)" if radius and city != "all" else ""
         await query.edit_message_text(
-            f"✅ Місто встановлено: {city if city != 'all' else 'Всі міста'}",
+            f"✅ Місто встановлено: {city if city != 'all' else 'Всі міста'}{radius_text}",
             reply_markup=get_filters_keyboard(),
             parse_mode="HTML"
         )
@@ -75,7 +94,9 @@ async def filter_callback_handler(update: Update, context: ContextTypes.DEFAULT_
         current_category = user_search_state[user_id]["filters"].get("category")
         await query.edit_message_text(
             "📋 Оберіть категорію:",
-            reply_markup=get_category_keyboard(current_category),
+            reply_markup=get_category_keyboard(
+                current_category, await get_facet_counts("category", user_search_state[user_id]["filters"])
+            ),
             parse_mode="HTML"
         )
     
@@ -95,7 +116,9 @@ async def filter_callback_handler(update: Update, context: ContextTypes.DEFAULT_
         current_type = user_search_state[user_id]["filters"].get("employment_type")
         await query.edit_message_text(
             "⏰ Оберіть тип зайнятості:",
-            reply_markup=get_employment_type_keyboard(current_type),
+            reply_markup=get_employment_type_keyboard(
+                current_type, await get_facet_counts("employment_type", user_search_state[user_id]["filters"])
+            ),
             parse_mode="HTML"
         )
     
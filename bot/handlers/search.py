@@ -2,18 +2,106 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from database.database import get_db
-from database.models import JobListing, SearchHistory, User
+from database.models import JobListing, SearchHistory, UserFavorite
 from bot.keyboards.pagination import get_pagination_keyboard
-from bot.keyboards.main_menu import get_back_to_menu_keyboard
+from bot.keyboards.main_menu import get_back_to_menu_keyboard, get_suggestions_keyboard
 from bot.utils.formatters import format_job_listing
-from bot.utils.db_helpers import get_db_session
+from bot.utils.db_helpers import load_job, run_db
+from bot.middlewares.user_middleware import resolve_user_id
+from bot.utils.session_store import get_session_store, pack_ids
 from config.constants import MESSAGES
+from config import settings
+from scraper.enrichment import DetailEnricher, get_interactive_enricher
+from search.ingest import on_jobs_changed
+from search.cursor import ORDER_RANDOM, ORDER_RECENT, ORDER_RELEVANCE, ResultCursor
+from search.index import get_search_index
+from search.query import RESULT_WINDOW_SIZE
+from search.suggest import get_suggestion_index
+from search.cache import get_result_cache
 from sqlalchemy.orm import Session
-from sqlalchemy import or_, and_
 
 
-# Зберігаємо стан пошуку для кожного користувача
-user_search_state = {}
+# Стан пошуку для кожного користувача (обмежений кеш + постійне сховище)
+user_search_state = get_session_store()
+
+
+def start_result_session(db: Session, user_id: int, filters_dict: dict,
+                         query_text: str = None, order: str = ORDER_RECENT) -> list:
+    """Починає нову сесію результатів: перше вікно id та курсор наступного"""
+    search_filters = dict(filters_dict)
+    job_ids, cursor = get_result_cache().fetch_window(
+        db, search_filters, query_text, ResultCursor.start(order)
+    )
+    
+    state = user_search_state.setdefault(user_id, {"filters": {}})
+    state.update({
+        "jobs": pack_ids(job_ids),
+        "cursor": cursor.encode() if cursor else None,
+        "search": {"filters": search_filters, "query": query_text},
+        "current_page": 1
+    })
+    prefetch_window(db, user_id, state, 1)
+    return job_ids
+
+
+def prefetch_window(db: Session, user_id: int, state: dict, page: int):
+    """
+    Завантажує вікно вакансій, що містить сторінку, та улюблені серед них
+    
+    Два запити на вікно замість трьох на кожну сторінку. Вакансії від'єднуються
+    від сесії, тому перегортання в межах вікна не звертається до БД.
+    """
+    start = (page - 1) // RESULT_WINDOW_SIZE * RESULT_WINDOW_SIZE
+    window_ids = state.get("jobs", [])[start:start + RESULT_WINDOW_SIZE]
+    if not window_ids:
+        state["page_cache"] = {"listings": {}, "favorites": set()}
+        return
+    
+    window_ids = list(window_ids)
+    jobs = db.query(JobListing).filter(JobListing.id.in_(window_ids)).all()
+    for job in jobs:
+        db.expunge(job)
+    
+    db_user_id = resolve_user_id(db, user_id)
+    favorite_ids = {
+        job_id for job_id, in db.query(UserFavorite.job_listing_id)
+        .filter(UserFavorite.user_id == db_user_id, UserFavorite.job_listing_id.in_(window_ids))
+    } if db_user_id is not None else set()
+    state["page_cache"] = {"listings": {job.id: job for job in jobs}, "favorites": favorite_ids}
+
+
+def save_enriched_job(db: Session, job: JobListing, fetched: bool = True) -> JobListing:
+    """Зберігає результат дозавантаження від'єднаної вакансії та повертає оновлену копію"""
+    job = db.merge(job)
+    db.commit()
+    if fetched:
+        on_jobs_changed(db, [job.id])
+    db.refresh(job)
+    db.expunge(job)
+    return job
+
+
+def load_next_window(db: Session, user_id: int, state: dict) -> bool:
+    """Довантажує наступне вікно результатів за курсором сесії"""
+    cursor = ResultCursor.decode(state.get("cursor"))
+    if not cursor:
+        return False
+    
+    search = state.get("search", {})
+    job_ids, next_cursor = get_result_cache().fetch_window(
+        db, search.get("filters", {}), search.get("query"), cursor
+    )
+    page = len(state.get("jobs", [])) + 1
+    jobs = pack_ids(state.get("jobs", ()))
+    # Після скрапінгу випадковий порядок інший, тож вікно може повторити показані вакансії
+    shown = set(jobs)
+    job_ids = [job_id for job_id in job_ids if job_id not in shown]
+    jobs.extend(job_ids)
+    state["jobs"] = jobs
+    state["cursor"] = next_cursor.encode() if next_cursor else None
+    if job_ids:
+        prefetch_window(db, user_id, state, page)
+    return bool(job_ids)
 
 
 async def search_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -24,66 +112,17 @@ async def search_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.callback_query:
         await update.callback_query.answer()
     
-    with get_db_session() as db:
-        # Отримуємо фільтри користувача
-        state = user_search_state.get(user_id, {})
-        filters_dict = state.get("filters", {})
-        
-        # Формуємо запит до БД
-        db_query = db.query(JobListing).filter(JobListing.is_active == True)
-        
-        # Застосовуємо фільтри
-        if filters_dict.get("city"):
-            db_query = db_query.filter(JobListing.city == filters_dict["city"])
-        
-        if filters_dict.get("category"):
-            db_query = db_query.filter(JobListing.category == filters_dict["category"])
-        
-        if filters_dict.get("employment_type"):
-            db_query = db_query.filter(JobListing.employment_type == filters_dict["employment_type"])
-        
-        if filters_dict.get("salary_min"):
-            try:
-                s_min = float(filters_dict["salary_min"])
-                db_query = db_query.filter(
-                    or_(
-                        JobListing.salary_min >= s_min,
-                        JobListing.salary_max >= s_min
-                    )
-                )
-            except (ValueError, TypeError):
-                pass
-        
-        if filters_dict.get("keywords"):
-            kws = [k.strip() for k in filters_dict["keywords"].split(",") if k.strip()]
-            if kws:
-                kw_filters = []
-                for kw in kws:
-                    kw_filters.append(
-                        or_(
-                            JobListing.title.ilike(f"%{kw}%"),
-                            JobListing.description.ilike(f"%{kw}%")
-                        )
-                    )
-                db_query = db_query.filter(and_(*kw_filters))
-
-        # Отримуємо 3 випадкові (або просто перші) вакансії що відповідають фільтрам
-        from sqlalchemy.sql import func
-        jobs = db_query.order_by(func.random()).limit(50).all() # Більше ніж 3 для кращого вибору
-        
-        if jobs:
-            # Зберігаємо результати для пагінації
-            if user_id not in user_search_state:
-                user_search_state[user_id] = {"filters": {}}
-            
-            user_search_state[user_id].update({
-                "jobs": [job.id for job in jobs],
-                "current_page": 1
-            })
-            
-            # Показуємо першу вакансію
-            await show_job_page(update, context, user_id, 1)
-            return
+    # Отримуємо фільтри користувача
+    state = user_search_state.get(user_id, {})
+    filters_dict = state.get("filters", {})
+    
+    # Перше вікно випадкових вакансій що відповідають фільтрам
+    job_ids = await run_db(start_result_session, user_id, filters_dict, order=ORDER_RANDOM)
+    
+    if job_ids:
+        # Показуємо першу вакансію
+        await show_job_page(update, context, user_id, 1)
+        return
 
     # Якщо вакансій немає або помилка
     text = "🔍 <b>Пошук вакансій</b>\n\nНа жаль, активних вакансій зараз немає. Спробуйте змінити фільтри або введіть запит вручну."
@@ -107,206 +146,201 @@ async def search_query_handler(update: Update, context: ContextTypes.DEFAULT_TYP
     user_id = update.effective_user.id
     query_text = update.message.text.strip()
     
-    with get_db_session() as db:
-        # Отримуємо стан
-        state = user_search_state.get(user_id, {"filters": {}})
-        
-        # Перевіряємо чи це введення для фільтрів
-        waiting_for = state.get("waiting_for")
-        if waiting_for:
-            if waiting_for == "salary":
-                try:
-                    # Очищаємо текст від зайвого
-                    salary_str = "".join(filter(str.isdigit, query_text))
-                    if salary_str:
-                        state["filters"]["salary_min"] = float(salary_str)
-                        state.pop("waiting_for")
-                        await update.message.reply_text(
-                            f"✅ Мінімальну зарплату встановлено: {salary_str} PLN",
-                            reply_markup=get_back_to_menu_keyboard()
-                        )
-                        return
-                except ValueError:
-                    pass
-                await update.message.reply_text("❌ Будь ласка, введіть число (наприклад: 5000)")
-                return
-                
-            elif waiting_for == "keywords":
-                state["filters"]["keywords"] = query_text
-                state.pop("waiting_for")
-                await update.message.reply_text(
-                    f"✅ Ключові слова встановлено: {query_text}",
-                    reply_markup=get_back_to_menu_keyboard()
-                )
-                return
-
-        # Формуємо запит до БД
-        db_query = db.query(JobListing).filter(JobListing.is_active == True)
-        
-        # Пошук за ключовими словами з повідомлення
-        if query_text:
-            search_filter = or_(
-                JobListing.title.ilike(f"%{query_text}%"),
-                JobListing.description.ilike(f"%{query_text}%"),
-                JobListing.company.ilike(f"%{query_text}%")
-            )
-            db_query = db_query.filter(search_filter)
-        
-        # Застосовуємо збережені фільтри
-        filters_dict = state.get("filters", {})
-        
-        if filters_dict.get("city"):
-            db_query = db_query.filter(JobListing.city == filters_dict["city"])
-        
-        if filters_dict.get("category"):
-            db_query = db_query.filter(JobListing.category == filters_dict["category"])
-        
-        if filters_dict.get("employment_type"):
-            db_query = db_query.filter(JobListing.employment_type == filters_dict["employment_type"])
-        
-        if filters_dict.get("salary_min"):
-            s_min = filters_dict["salary_min"]
-            db_query = db_query.filter(
-                or_(
-                    JobListing.salary_min >= s_min,
-                    JobListing.salary_max >= s_min
-                )
-            )
-            
-        if filters_dict.get("keywords"):
-             kws = [k.strip() for k in filters_dict["keywords"].split(",") if k.strip()]
-             for kw in kws:
-                db_query = db_query.filter(
-                    or_(
-                        JobListing.title.ilike(f"%{kw}%"),
-                        JobListing.description.ilike(f"%{kw}%")
+    # Отримуємо стан
+    state = user_search_state.get(user_id, {"filters": {}})
+    
+    # Перевіряємо чи це введення для фільтрів
+    waiting_for = state.get("waiting_for")
+    if waiting_for:
+        if waiting_for == "salary":
+            try:
+                # Очищаємо текст від зайвого
+                salary_str = "".join(filter(str.isdigit, query_text))
+                if salary_str:
+                    state["filters"]["salary_min"] = float(salary_str)
+                    state.pop("waiting_for")
+                    await update.message.reply_text(
+                        f"✅ Мінімальну зарплату встановлено: {salary_str} PLN",
+                        reply_markup=get_back_to_menu_keyboard()
                     )
-                )
-        
-        # Сортуємо за датою публікації
-        db_query = db_query.order_by(JobListing.published_date.desc())
-        
-        # Отримуємо результати
-        jobs = db_query.limit(50).all()
-        
-        # Зберігаємо результати для пагінації
-        user_search_state[user_id] = {
-            "filters": filters_dict,
-            "jobs": [job.id for job in jobs],
-            "current_page": 1
-        }
-        
-        # Зберігаємо в історію пошуку
-        db_user = db.query(User).filter(User.telegram_id == user_id).first()
-        if db_user:
-            search_history = SearchHistory(
-                user_id=db_user.id,
-                query=query_text,
-                filters=filters_dict,
-                results_count=len(jobs)
-            )
-            db.add(search_history)
-            db.commit()
-        
-        if not jobs:
+                    return
+            except ValueError:
+                pass
+            await update.message.reply_text("❌ Будь ласка, введіть число (наприклад: 5000)")
+            return
+            
+        elif waiting_for == "keywords":
+            state["filters"]["keywords"] = query_text
+            state.pop("waiting_for")
             await update.message.reply_text(
-                MESSAGES["no_results"],
+                f"✅ Ключові слова встановлено: {query_text}",
                 reply_markup=get_back_to_menu_keyboard()
             )
             return
+
+    await run_text_search(update, context, user_id, query_text)
+
+
+def start_text_search(db: Session, user_id: int, filters_dict: dict, query_text: str) -> list:
+    """Сесія результатів за текстом (найрелевантніші першими) із записом в історію"""
+    job_ids = start_result_session(db, user_id, filters_dict, query_text, order=ORDER_RELEVANCE)
+    
+    # Зберігаємо в історію пошуку
+    db_user_id = resolve_user_id(db, user_id)
+    if db_user_id is not None:
+        search_history = SearchHistory(
+            user_id=db_user_id,
+            query=query_text,
+            filters=filters_dict,
+            results_count=len(job_ids)
+        )
+        db.add(search_history)
+        db.commit()
+    return job_ids
+
+
+async def run_text_search(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, query_text: str):
+    """Пошук за текстом + збереженими фільтрами; без результатів - підказки запитів"""
+    # Шукаємо за текстом запиту + збереженими фільтрами
+    filters_dict = user_search_state.get(user_id, {}).get("filters", {})
+    user_search_state[user_id] = {"filters": filters_dict}
+    job_ids = await run_db(start_text_search, user_id, filters_dict, query_text)
+    
+    if not job_ids:
+        # Підказки з пам'яті: схожі популярні запити або просто популярні
+        suggestions_index = get_suggestion_index()
+        suggestions = suggestions_index.did_you_mean(query_text)
+        title = "Можливо, ви мали на увазі:"
+        if not suggestions:
+            suggestions = suggestions_index.popular()
+            title = "Популярні запити:"
+        user_search_state[user_id]["suggestions"] = suggestions
         
-        # Показуємо перший результат
-        await show_job_page(update, context, user_id, 1)
+        text = MESSAGES["no_results"]
+        if suggestions:
+            text += f"\n\n{title}"
+        await update.effective_message.reply_text(
+            text,
+            reply_markup=get_suggestions_keyboard(suggestions)
+        )
+        return
+    
+    # Показуємо перший результат
+    await show_job_page(update, context, user_id, 1)
+
+
+async def suggestion_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Обробник кнопки підказки запиту"""
+    query = update.callback_query
+    user_id = update.effective_user.id
+    
+    suggestions = user_search_state.get(user_id, {}).get("suggestions", [])
+    try:
+        query_text = suggestions[int(query.data.replace("suggest_", ""))]
+    except (ValueError, IndexError):
+        await query.answer("Підказка застаріла. Введіть запит ще раз.")
+        return
+    
+    await query.answer()
+    await run_text_search(update, context, user_id, query_text)
+
+
+async def report_search_end(update: Update, text: str):
+    """Повідомлення замість сторінки: callback уже підтверджено, тому повторний answer() не дійде"""
+    message = update.callback_query.message if update.callback_query else update.message
+    await message.reply_text(text, reply_markup=get_back_to_menu_keyboard(), parse_mode="HTML")
 
 
 async def show_job_page(update: Update, context: ContextTypes.DEFAULT_TYPE, user_id: int, page: int):
-    """Показує сторінку з вакансією"""
+    """Показує сторінку з вакансією (callback підтверджує обробник, що її викликає)"""
     state = user_search_state.get(user_id, {})
     job_ids = state.get("jobs", [])
     
-    if update.callback_query:
-        try:
-            await update.callback_query.answer()
-        except Exception:
-            pass # Ignore if already answered or too old
-
     if not job_ids:
         # Спробуємо відновити стан (наприклад, після перезапуску бота)
-        with get_db_session() as db:
-            from sqlalchemy.sql import func
-            jobs = db.query(JobListing).filter(JobListing.is_active == True).order_by(func.random()).limit(10).all()
-            if jobs:
-                job_ids = [job.id for job in jobs]
-                user_search_state[user_id] = {
-                    "jobs": job_ids,
-                    "current_page": 1,
-                    "filters": {}
-                }
-                total_pages = len(job_ids)
-                if page > total_pages:
-                    page = 1
-            else:
-                if update.callback_query:
-                    await update.callback_query.answer("Сесію пошуку завершено. Почніть новий пошук.")
-                return
-    
-    total_pages = len(job_ids)
-    if page < 1 or page > total_pages:
-        if update.callback_query:
-            await update.callback_query.answer("Невірна сторінка")
-        return
+        user_search_state[user_id] = {"filters": {}}
+        job_ids = await run_db(start_result_session, user_id, {}, order=ORDER_RANDOM)
+        if job_ids:
+            state = user_search_state[user_id]
+            if page > len(job_ids):
+                page = 1
+        else:
+            await report_search_end(update, "Сесію пошуку завершено. Почніть новий пошук.")
+            return
     
-    with get_db_session() as db:
-        job_id = job_ids[page - 1]
-        job = db.query(JobListing).filter(JobListing.id == job_id).first()
+    while True:
+        # Дійшли до кінця завантаженого вікна - завантажуємо наступне з позиції курсора
+        if page > len(job_ids) and state.get("cursor"):
+            await run_db(load_next_window, user_id, state)
+            job_ids = state.get("jobs", [])
         
-        if not job:
-            if update.callback_query:
-                await update.callback_query.answer("Вакансія не знайдена")
+        has_more = bool(state.get("cursor"))
+        total_pages = len(job_ids)
+        if page < 1 or page > total_pages:
+            await report_search_end(update, "Невірна сторінка" if total_pages else "Активних вакансій більше немає")
             return
         
-        # Перевіряємо чи в улюблених
-        from database.models import UserFavorite
-        db_user = db.query(User).filter(User.telegram_id == user_id).first()
-        is_favorite = False
-        if db_user:
-            favorite = db.query(UserFavorite).filter(
-                UserFavorite.user_id == db_user.id,
-                UserFavorite.job_listing_id == job.id
-            ).first()
-            is_favorite = favorite is not None
-        
-        # Оновлюємо стан
-        user_search_state[user_id]["current_page"] = page
+        job_id = job_ids[page - 1]
+        cache = state.get("page_cache") or {}
+        job = cache.get("listings", {}).get(job_id)
         
-        # Форматуємо та відправляємо
-        text = format_job_listing(job)
+        # Вакансії немає у вікні або вона зникла з активних - перечитуємо вікно з БД
+        if job is None or get_search_index().is_active(job_id) is False:
+            await run_db(prefetch_window, user_id, state, page)
+            cache = state["page_cache"]
+            job = cache["listings"].get(job_id)
         
-        keyboard = get_pagination_keyboard(page, total_pages, job.id, is_favorite)
+        if job and job.is_active:
+            break
         
-        # Handle message editing vs sending new message
-        if update.callback_query:
-             # Remove keyboard from the previous message
-             try:
-                 await update.callback_query.edit_message_reply_markup(reply_markup=None)
-             except Exception:
-                 pass
-             
-             # Send new message instead of editing
-             await update.callback_query.message.reply_text(
-                text,
-                reply_markup=keyboard,
-                parse_mode="HTML",
-                disable_web_page_preview=False
-            )
-        else:
-            # If triggered by text message (not callback), send new message
-            await update.message.reply_text(
-                text,
-                reply_markup=keyboard,
-                parse_mode="HTML",
-                disable_web_page_preview=False
-            )
+        # Видалена чи неактивна вакансія прибирається з сесії - на її місці наступна
+        del job_ids[page - 1]
+        state["jobs"] = job_ids
+        cache.get("listings", {}).pop(job_id, None)
+        if page > len(job_ids) and not state.get("cursor"):
+            page = len(job_ids)
+    
+    # Ліниве дозавантаження: детальна сторінка лише при першому перегляді
+    if settings.LAZY_DETAIL_FETCH and DetailEnricher.needs_details(job):
+        fresh_job = await run_db(load_job, job_id)
+        if fresh_job:
+            # Невдала спроба теж зберігається, щоб повтор був не раніше за відстрочку
+            fetched = await get_interactive_enricher().enrich(fresh_job)
+            job = cache["listings"][job_id] = await run_db(save_enriched_job, fresh_job, fetched)
+    
+    is_favorite = job_id in cache["favorites"]
+    
+    # Оновлюємо стан
+    state["current_page"] = page
+    
+    # Форматуємо та відправляємо
+    text = format_job_listing(job)
+    
+    keyboard = get_pagination_keyboard(page, total_pages, job.id, is_favorite, has_more=has_more)
+    
+    # Handle message editing vs sending new message
+    if update.callback_query:
+         # Remove keyboard from the previous message
+         try:
+             await update.callback_query.edit_message_reply_markup(reply_markup=None)
+         except Exception:
+             pass
+         
+         # Send new message instead of editing
+         await update.callback_query.message.reply_text(
+            text,
+            reply_markup=keyboard,
+            parse_mode="HTML",
+            disable_web_page_preview=False
+        )
+    else:
+        # If triggered by text message (not callback), send new message
+        await update.message.reply_text(
+            text,
+            reply_markup=keyboard,
+            parse_mode="HTML",
+            disable_web_page_preview=False
+        )
 
 
 async def page_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -323,13 +357,15 @@ async def page_callback_handler(update: Update, context: ContextTypes.DEFAULT_TY
     if data == "page_info":
         await query.answer("Використовуйте стрілки для навігації")
         return
-        
-    await query.answer()
     
     if data.startswith("page_"):
         try:
             page_num = int(data.split("_")[1])
-            await show_job_page(update, context, user_id, page_num)
         except (ValueError, IndexError) as e:
             logger.error(f"Error parsing page number from {data}: {e}")
             await query.answer("Помилка пагінації")
+            return
+        await query.answer()
+        await show_job_page(update, context, user_id, page_num)
+    else:
+        await query.answer()
@@ -1,12 +1,28 @@
 """Обробники статистики"""
 from telegram import Update
 from telegram.ext import ContextTypes
-from database.models import JobListing, User
 from bot.keyboards.main_menu import get_back_to_menu_keyboard
 from bot.utils.formatters import format_stats
-from bot.utils.db_helpers import get_db_session
+from bot.utils.db_helpers import run_db
+from search.stats import TOTAL, USERS, load_stats_snapshot
 from sqlalchemy.orm import Session
-from sqlalchemy import func
+
+
+def collect_stats(db: Session) -> dict:
+    """Збирає статистику для /stats з готового знімка (search/stats.py)"""
+    snapshot = load_stats_snapshot(db)
+    
+    return {
+        'total_jobs': snapshot.count(TOTAL),
+        'total_users': snapshot.count(USERS),
+        'average_salary': snapshot.average_salary(TOTAL),
+        'jobs_by_city': {city: count for city, count, _ in snapshot.top("city", 10)},
+        'jobs_by_category': {category: count for category, count, _ in snapshot.top("category", 10)},
+        'jobs_by_source': {source: count for source, count, _ in snapshot.top("source", 10)},
+        'salary_by_category': {
+            category: average for category, _, average in snapshot.top("category", 10) if average
+        },
+    }
 
 
 async def stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -16,27 +32,7 @@ async def stats_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if update.callback_query:
         await update.callback_query.answer()
     
-    with get_db_session() as db:
-        # Збираємо статистику
-        total_jobs = db.query(JobListing).filter(JobListing.is_active == True).count()
-        total_users = db.query(User).filter(User.is_active == True).count()
-        
-        # Статистика по містах
-        jobs_by_city = db.query(
-            JobListing.city,
-            func.count(JobListing.id).label('count')
-        ).filter(
-            JobListing.is_active == True,
-            JobListing.city.isnot(None)
-        ).group_by(JobListing.city).order_by(func.count(JobListing.id).desc()).limit(10).all()
-        
-        stats = {
-            'total_jobs': total_jobs,
-            'total_users': total_users,
-            'jobs_by_city': {city: count for city, count in jobs_by_city}
-        }
-        
-        text = format_stats(stats)
+    text = format_stats(await run_db(collect_stats))
     
     if hasattr(query, 'edit_message_text'):
         await query.edit_message_text(
@@ -1,13 +1,122 @@
 """Обробники підписок"""
+from typing import Dict, List, Optional, Tuple
+import json
 from telegram import Update
 from telegram.ext import ContextTypes
 from database.database import get_db
-from database.models import User, UserSubscription
+from database.models import UserSubscription
+from config.constants import NOTIFICATION_FREQUENCIES
 from bot.keyboards.main_menu import get_back_to_menu_keyboard
+from bot.keyboards.subscriptions_keyboard import get_subscriptions_keyboard
+from bot.handlers.search import user_search_state
 from bot.utils.formatters import format_subscription_info
-from bot.utils.db_helpers import get_db_session
+from bot.utils.db_helpers import run_db
+from bot.middlewares.user_middleware import resolve_user_id
+from notifications.matcher import get_subscription_index
+from search.text import parse_keywords
 from sqlalchemy.orm import Session
 
+# Скільки активних підписок може мати користувач
+MAX_SUBSCRIPTIONS = 5
+
+
+def build_subscriptions_text(db: Session, user_id: int) -> Tuple[str, Optional[List[Tuple[int, str]]]]:
+    """Текст зі списком підписок користувача та пари (id, частота) (None - користувача немає)"""
+    # Отримуємо користувача
+    db_user_id = resolve_user_id(db, user_id)
+    
+    if db_user_id is None:
+        return "❌ Помилка: користувач не знайдений", None
+    
+    # Отримуємо підписки
+    subscriptions = db.query(UserSubscription).filter(
+        UserSubscription.user_id == db_user_id,
+        UserSubscription.is_active == True
+    ).order_by(UserSubscription.created_at.desc()).all()
+    
+    if not subscriptions:
+        return (
+            "📢 <b>Підписки</b>\n\n"
+            "У вас поки немає активних підписок.\n\n"
+            "Налаштуйте фільтри та підпишіться, щоб отримувати сповіщення про нові вакансії за вашими критеріями."
+        ), []
+    
+    text = f"📢 <b>Ваші підписки</b>\n\n"
+    for sub in subscriptions[:MAX_SUBSCRIPTIONS]:
+        text += format_subscription_info(sub) + "\n\n"
+    return text, [(sub.id, sub.notification_frequency) for sub in subscriptions[:MAX_SUBSCRIPTIONS]]
+
+
+def create_subscription(db: Session, user_id: int, filters_dict: Dict) -> Optional[str]:
+    """
+    Створює миттєву підписку з фільтрів пошуку
+    
+    Returns:
+        Повідомлення про помилку або None
+    """
+    db_user_id = resolve_user_id(db, user_id)
+    if db_user_id is None:
+        return "❌ Помилка: користувач не знайдений"
+    
+    count = db.query(UserSubscription.id).filter(
+        UserSubscription.user_id == db_user_id,
+        UserSubscription.is_active == True
+    ).count()
+    if count >= MAX_SUBSCRIPTIONS:
+        return f"Можна мати не більше {MAX_SUBSCRIPTIONS} підписок"
+    
+    keywords = parse_keywords(filters_dict.get("keywords"))
+    subscription = UserSubscription(
+        user_id=db_user_id,
+        city=filters_dict.get("city"),
+        category=filters_dict.get("category"),
+        salary_min=filters_dict.get("salary_min"),
+        keywords=json.dumps(keywords, ensure_ascii=False) if keywords else None,
+        notification_frequency="instant",
+        is_active=True
+    )
+    db.add(subscription)
+    db.commit()
+    get_subscription_index().refresh(db, [subscription.id])
+    return None
+
+
+def delete_subscription(db: Session, user_id: int, subscription_id: int) -> bool:
+    """Вимикає підписку користувача"""
+    db_user_id = resolve_user_id(db, user_id)
+    if db_user_id is None:
+        return False
+    
+    updated = db.query(UserSubscription).filter(
+        UserSubscription.id == subscription_id,
+        UserSubscription.user_id == db_user_id
+    ).update({UserSubscription.is_active: False}, synchronize_session=False)
+    db.commit()
+    get_subscription_index().refresh(db, [subscription_id])
+    return bool(updated)
+
+
+def cycle_frequency(db: Session, user_id: int, subscription_id: int) -> Optional[str]:
+    """Перемикає частоту сповіщень підписки (миттєво -> щодня -> щотижня)"""
+    db_user_id = resolve_user_id(db, user_id)
+    if db_user_id is None:
+        return None
+    
+    subscription = db.query(UserSubscription).filter(
+        UserSubscription.id == subscription_id,
+        UserSubscription.user_id == db_user_id
+    ).first()
+    if subscription is None:
+        return None
+    
+    frequencies = list(NOTIFICATION_FREQUENCIES)
+    current = subscription.notification_frequency
+    position = frequencies.index(current) if current in frequencies else -1
+    subscription.notification_frequency = frequencies[(position + 1) % len(frequencies)]
+    db.commit()
+    get_subscription_index().refresh(db, [subscription_id])
+    return subscription.notification_frequency
+
 
 async def subscriptions_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """Обробник команди /subscriptions та кнопки підписок"""
@@ -16,53 +125,65 @@ async def subscriptions_handler(update: Update, context: ContextTypes.DEFAULT_TY
     if update.callback_query:
         await update.callback_query.answer()
     
-    user_id = update.effective_user.id
-    
-    with get_db_session() as db:
-        # Отримуємо користувача
-        db_user = db.query(User).filter(User.telegram_id == user_id).first()
-        
-        if not db_user:
-            text = "❌ Помилка: користувач не знайдений"
-        else:
-            # Отримуємо підписки
-            subscriptions = db.query(UserSubscription).filter(
-                UserSubscription.user_id == db_user.id
-            ).order_by(UserSubscription.created_at.desc()).all()
-            
-            if not subscriptions:
-                text = (
-                    "📢 <b>Підписки</b>\n\n"
-                    "У вас поки немає активних підписок.\n\n"
-                    "Створіть підписку, щоб отримувати сповіщення про нові вакансії за вашими критеріями."
-                )
-            else:
-                text = f"📢 <b>Ваші підписки</b>\n\n"
-                for sub in subscriptions[:5]:  # Показуємо перші 5
-                    text += format_subscription_info(sub) + "\n\n"
+    text, subscriptions = await run_db(build_subscriptions_text, update.effective_user.id)
+    if subscriptions is None:
+        reply_markup = get_back_to_menu_keyboard()
+    else:
+        reply_markup = get_subscriptions_keyboard(
+            subscriptions, can_create=len(subscriptions) < MAX_SUBSCRIPTIONS
+        )
     
     if hasattr(query, 'edit_message_text'):
         await query.edit_message_text(
             text,
-            reply_markup=get_back_to_menu_keyboard(),
+            reply_markup=reply_markup,
             parse_mode="HTML"
         )
     else:
         await query.reply_text(
             text,
-            reply_markup=get_back_to_menu_keyboard(),
+            reply_markup=reply_markup,
             parse_mode="HTML"
         )
 
 
 async def subscription_callback_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    """Обробник callback для підписок"""
+    """Обробник callback для підписок (створення з поточних фільтрів, частота, видалення)"""
     query = update.callback_query
-    await query.answer()
+    user_id = update.effective_user.id
+    data = query.data
+    
+    if data == "subscription_create":
+        filters_dict = user_search_state.get(user_id, {}).get("filters") or {}
+        error = await run_db(create_subscription, user_id, dict(filters_dict))
+        if error:
+            await query.answer(error, show_alert=True)
+            return
+        await query.answer("✅ Підписку створено")
+    
+    elif data.startswith("subscription_frequency_"):
+        subscription_id = int(data.replace("subscription_frequency_", ""))
+        frequency = await run_db(cycle_frequency, user_id, subscription_id)
+        if frequency is None:
+            await query.answer()
+            return
+        await query.answer(f"Частота сповіщень: {NOTIFICATION_FREQUENCIES[frequency]}")
+    
+    elif data.startswith("subscription_delete_"):
+        subscription_id = int(data.replace("subscription_delete_", ""))
+        await run_db(delete_subscription, user_id, subscription_id)
+        await query.answer("➖ Підписку видалено")
+    
+    else:
+        await query.answer()
+        return
     
-    # Тут можна додати логіку створення/редагування/видалення підписок
+    # Оновлюємо список підписок
+    text, subscriptions = await run_db(build_subscriptions_text, user_id)
     await query.edit_message_text(
-        "📢 Функціонал підписок в розробці",
-        reply_markup=get_back_to_menu_keyboard(),
+        text,
+        reply_markup=get_subscriptions_keyboard(
+            subscriptions or [], can_create=len(subscriptions or []) < MAX_SUBSCRIPTIONS
+        ),
         parse_mode="HTML"
     )
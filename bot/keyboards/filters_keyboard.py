@@ -1,6 +1,24 @@
 """Клавіатури для фільтрів"""
+from typing import Dict
 from telegram import InlineKeyboardButton, InlineKeyboardMarkup
 from config.constants import POLISH_CITIES, JOB_CATEGORIES, EMOJIS, EMPLOYMENT_TYPES
+from search.geo import RADIUS_OPTIONS
+
+
+def _with_counts(options: list, selected: str = None, counts: Dict[str, int] = None) -> list:
+    """
+    Залишає варіанти з вакансіями та додає кількість до підпису
+    
+    options - пари (значення, підпис); вибраний варіант показується завжди.
+    Без counts повертає варіанти без змін.
+    """
+    if counts is None:
+        return options
+    return [
+        (value, f"{label} ({counts.get(value, 0)})")
+        for value, label in options
+        if counts.get(value) or value == selected
+    ]
 
 
 def get_filters_keyboard() -> InlineKeyboardMarkup:
@@ -25,25 +43,35 @@ def get_filters_keyboard() -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(keyboard)
 
 
-def get_city_keyboard(selected_city: str = None) -> InlineKeyboardMarkup:
-    """Клавіатура вибору міста"""
+def get_city_keyboard(selected_city: str = None, counts: Dict[str, int] = None,
+                      selected_radius: int = 0) -> InlineKeyboardMarkup:
+    """Клавіатура вибору міста (counts - кількість вакансій по містах, selected_radius - радіус, км)"""
     keyboard = []
+    cities = _with_counts([(city, city) for city in POLISH_CITIES], selected_city, counts)
     
     # Показуємо перші 12 міст у вигляді кнопок 2x2
-    for i in range(0, min(12, len(POLISH_CITIES)), 2):
+    for i in range(0, min(12, len(cities)), 2):
         row = []
         for j in range(2):
-            if i + j < len(POLISH_CITIES):
-                city = POLISH_CITIES[i + j]
+            if i + j < len(cities):
+                city, label = cities[i + j]
                 prefix = "✅ " if city == selected_city else ""
                 row.append(
                     InlineKeyboardButton(
-                        f"{prefix}{city}",
+                        f"{prefix}{label}",
                         callback_data=f"city_{city}"
                     )
                 )
         keyboard.append(row)
     
+    # Радіус навколо вибраного міста
+    radius_row = []
+    for radius in RADIUS_OPTIONS:
+        prefix = "✅ " if radius == (selected_radius or 0) else ""
+        label = f"+{radius} км" if radius else "Лише місто"
+        radius_row.append(InlineKeyboardButton(f"{prefix}{label}", callback_data=f"radius_{radius}"))
+    keyboard.append(radius_row)
+    
     keyboard.append([
         InlineKeyboardButton("Всі міста", callback_data="city_all"),
         InlineKeyboardButton(f"{EMOJIS['back']} Назад", callback_data="filters")
@@ -52,19 +80,20 @@ def get_city_keyboard(selected_city: str = None) -> InlineKeyboardMarkup:
     return InlineKeyboardMarkup(keyboard)
 
 
-def get_category_keyboard(selected_category: str = None) -> InlineKeyboardMarkup:
-    """Клавіатура вибору категорії"""
+def get_category_keyboard(selected_category: str = None, counts: Dict[str, int] = None) -> InlineKeyboardMarkup:
+    """Клавіатура вибору категорії (counts - кількість вакансій по категоріях)"""
     keyboard = []
+    categories = _with_counts([(category, category) for category in JOB_CATEGORIES], selected_category, counts)
     
-    for i in range(0, len(JOB_CATEGORIES), 2):
+    for i in range(0, len(categories), 2):
         row = []
         for j in range(2):
-            if i + j < len(JOB_CATEGORIES):
-                category = JOB_CATEGORIES[i + j]
+            if i + j < len(categories):
+                category, label = categories[i + j]
                 prefix = "✅ " if category == selected_category else ""
                 row.append(
                     InlineKeyboardButton(
-                        f"{prefix}{category}",
+                        f"{prefix}{label}",
                         callback_data=f"category_{category}"
                     )
                 )
@@ -78,10 +107,10 @@ def get_category_keyboard(selected_category: str = None) -> InlineKeyboardMarkup
     return InlineKeyboardMarkup(keyboard)
 
 
-def get_employment_type_keyboard(selected_type: str = None) -> InlineKeyboardMarkup:
-    """Клавіатура вибору типу зайнятості"""
+def get_employment_type_keyboard(selected_type: str = None, counts: Dict[str, int] = None) -> InlineKeyboardMarkup:
+    """Клавіатура вибору типу зайнятості (counts - кількість вакансій по типах)"""
     keyboard = []
-    types_list = list(EMPLOYMENT_TYPES.items())
+    types_list = _with_counts(list(EMPLOYMENT_TYPES.items()), selected_type, counts)
     
     for i in range(0, len(types_list), 2):
         row = []
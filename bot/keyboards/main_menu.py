@@ -27,3 +27,18 @@ def get_back_to_menu_keyboard() -> InlineKeyboardMarkup:
         )
     ]]
     return InlineKeyboardMarkup(keyboard)
+
+
+def get_suggestions_keyboard(suggestions: list) -> InlineKeyboardMarkup:
+    """Кнопки підказок запитів (по одній у рядку) та повернення до меню"""
+    keyboard = [
+        [InlineKeyboardButton(f"{EMOJIS['search']} {suggestion}", callback_data=f"suggest_{i}")]
+        for i, suggestion in enumerate(suggestions)
+    ]
+    keyboard.append([
+        InlineKeyboardButton(
+            f"{EMOJIS['back']} Головне меню",
+            callback_data="main_menu"
+        )
+    ])
+    return InlineKeyboardMarkup(keyboard)
@@ -7,13 +7,26 @@ def get_pagination_keyboard(
     page: int,
     total_pages: int,
     job_id: int = None,
-    is_favorite: bool = False
+    is_favorite: bool = False,
+    has_more: bool = False
 ) -> InlineKeyboardMarkup:
-    """Створює клавіатуру для пагінації"""
+    """
+    Створює клавіатуру для пагінації
+    
+    has_more - результати ще не завантажені повністю (загальна кількість
+    невідома), тому навігація йде лише вперед/назад без переходу по колу
+    """
     keyboard = []
     
+    if has_more:
+        nav_row = []
+        if page > 1:
+            nav_row.append(InlineKeyboardButton("⬅️ Попередня", callback_data=f"page_{page - 1}"))
+        nav_row.append(InlineKeyboardButton("Наступна ➡️", callback_data=f"page_{page + 1}"))
+        keyboard.append(nav_row)
+    
     # Навігація (тільки якщо є більше однієї сторінки)
-    if total_pages > 1:
+    elif total_pages > 1:
         prev_page = page - 1 if page > 1 else total_pages
         next_page = page + 1 if page < total_pages else 1
         
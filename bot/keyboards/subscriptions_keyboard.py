@@ -0,0 +1,27 @@
+"""Клавіатура підписок"""
+from typing import List, Tuple
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from config.constants import EMOJIS, NOTIFICATION_FREQUENCIES
+
+
+def get_subscriptions_keyboard(subscriptions: List[Tuple[int, str]], can_create: bool = True) -> InlineKeyboardMarkup:
+    """
+    Кнопки створення підписки з поточних фільтрів, зміни частоти та видалення
+
+    subscriptions - пари (id підписки, частота сповіщень)
+    """
+    keyboard = []
+    if can_create:
+        keyboard.append([
+            InlineKeyboardButton("➕ Підписатися на поточні фільтри", callback_data="subscription_create")
+        ])
+    for subscription_id, frequency in subscriptions:
+        keyboard.append([
+            InlineKeyboardButton(f"⏰ #{subscription_id}: {NOTIFICATION_FREQUENCIES.get(frequency, frequency)}",
+                                 callback_data=f"subscription_frequency_{subscription_id}"),
+            InlineKeyboardButton("🗑 Видалити", callback_data=f"subscription_delete_{subscription_id}")
+        ])
+    keyboard.append([
+        InlineKeyboardButton(f"{EMOJIS['back']} Головне меню", callback_data="main_menu")
+    ])
+    return InlineKeyboardMarkup(keyboard)
@@ -1,3 +1,3 @@
-from .user_middleware import UserMiddleware
+from .user_middleware import UserMiddleware, ensure_user, resolve_user_id
 
-__all__ = ['UserMiddleware']
+__all__ = ['UserMiddleware', 'ensure_user', 'resolve_user_id']
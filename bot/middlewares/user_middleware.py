@@ -1,30 +1,134 @@
-"""Middleware для автоматичної реєстрації користувачів"""
+"""Middleware для автоматичної реєстрації користувачів
+
+Обробники працюють з внутрішнім users.id, а Telegram дає telegram_id, тому
+відповідність кешується в пам'яті процесу (з TTL). Відсутні користувачі теж
+кешуються (коротше), щоб повторні звернення не йшли в БД. Middleware
+реєструє користувача одним upsert при першому оновленні від нього.
+"""
+from typing import Optional, Tuple
+from collections import OrderedDict
+from datetime import datetime
+import asyncio
+import threading
+import time
 from telegram import Update
-from telegram.ext import ContextTypes, BaseHandler
-from database.database import get_db
-from database.models import User
+from telegram.ext import ContextTypes
+from sqlalchemy.dialects import postgresql, sqlite
 from sqlalchemy.orm import Session
+from config import settings
+from database.models import User
+from bot.utils.db_helpers import get_db_executor, get_db_session
+from search.stats import increment_user_count
+
+
+class UserIdCache:
+    """telegram_id -> users.id (None - користувача немає) з TTL та LRU"""
+
+    def __init__(self, max_size: int = None, ttl: int = None, negative_ttl: int = None):
+        self.max_size = max_size or settings.USER_CACHE_SIZE
+        self.ttl = ttl or settings.USER_CACHE_TTL_SECONDS
+        self.negative_ttl = negative_ttl or settings.USER_CACHE_NEGATIVE_TTL_SECONDS
+        self._entries: "OrderedDict[int, Tuple[float, Optional[int]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, telegram_id: int) -> Tuple[bool, Optional[int]]:
+        """(чи є запис у кеші, users.id або None)"""
+        with self._lock:
+            entry = self._entries.get(telegram_id)
+            if entry is None:
+                return False, None
+            expires_at, user_id = entry
+            if expires_at < time.monotonic():
+                del self._entries[telegram_id]
+                return False, None
+            self._entries.move_to_end(telegram_id)
+            return True, user_id
+
+    def set(self, telegram_id: int, user_id: Optional[int]):
+        ttl = self.ttl if user_id is not None else self.negative_ttl
+        with self._lock:
+            self._entries[telegram_id] = (time.monotonic() + ttl, user_id)
+            self._entries.move_to_end(telegram_id)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, telegram_id: int):
+        with self._lock:
+            self._entries.pop(telegram_id, None)
+
+
+_user_cache = UserIdCache()
+
+
+def get_user_cache() -> UserIdCache:
+    """Повертає кеш користувачів процесу"""
+    return _user_cache
+
+
+def resolve_user_id(db: Session, telegram_id: int) -> Optional[int]:
+    """users.id за telegram_id (з кешу; запит до БД лише при промаху)"""
+    cached, user_id = _user_cache.get(telegram_id)
+    if cached:
+        return user_id
+    user_id = db.query(User.id).filter(User.telegram_id == telegram_id).scalar()
+    _user_cache.set(telegram_id, user_id)
+    return user_id
+
+
+def upsert_user(db: Session, user) -> int:
+    """
+    Створює користувача або оновлює його ім'я одним запитом
+
+    Returns:
+        users.id
+    """
+    now = datetime.utcnow()
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(User).values(
+        telegram_id=user.id,
+        username=user.username,
+        first_name=user.first_name,
+        language_code=user.language_code or "uk",
+        created_at=now,
+        updated_at=now,
+        is_active=True,
+    )
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[User.telegram_id],
+        set_={
+            "username": stmt.excluded.username,
+            "first_name": stmt.excluded.first_name,
+            "updated_at": now,
+        }
+    ).returning(User.id, User.created_at)
+    user_id, created_at = db.execute(stmt).one()
+    if created_at == now:
+        # Рядок щойно вставлено (при конфлікті created_at не змінюється)
+        increment_user_count(db)
+    db.commit()
+    _user_cache.set(user.id, user_id)
+    return user_id
+
+
+def _register(user) -> int:
+    with get_db_session() as db:
+        return upsert_user(db, user)
+
+
+async def ensure_user(user) -> int:
+    """users.id користувача Telegram; при першому зверненні - реєстрація (поза event loop)"""
+    cached, user_id = _user_cache.get(user.id)
+    if cached and user_id is not None:
+        return user_id
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_db_executor(), _register, user)
 
 
 class UserMiddleware:
-    """Middleware для автоматичної реєстрації користувачів"""
-    
+    """Middleware для автоматичної реєстрації користувачів (TypeHandler у групі -2)"""
+
     async def __call__(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Обробка оновлення"""
         if update.effective_user:
-            user = update.effective_user
-            db: Session = next(get_db())
-            
-            # Перевіряємо чи користувач вже є в БД
-            db_user = db.query(User).filter(User.telegram_id == user.id).first()
-            
-            if not db_user:
-                # Створюємо нового користувача
-                db_user = User(
-                    telegram_id=user.id,
-                    username=user.username,
-                    first_name=user.first_name,
-                    language_code=user.language_code or "uk"
-                )
-                db.add(db_user)
-                db.commit()
+            await ensure_user(update.effective_user)
@@ -1,8 +1,20 @@
 """Допоміжні функції для роботи з БД"""
+from concurrent.futures import ThreadPoolExecutor
 from contextlib import contextmanager
+from functools import partial
+from typing import Callable, Optional, TypeVar
+import asyncio
+from config import settings
 from database.database import get_db
+from database.models import JobListing
 from sqlalchemy.orm import Session
 
+T = TypeVar("T")
+
+# Окремий пул потоків для БД: запити не блокують event loop і не конкурують
+# з asyncio.to_thread (скрапінг, мережеві запити) за потоки
+_db_executor: Optional[ThreadPoolExecutor] = None
+
 
 @contextmanager
 def get_db_session():
@@ -16,3 +28,48 @@ def get_db_session():
             next(db_gen, None)
         except StopIteration:
             pass
+
+
+def get_db_executor() -> ThreadPoolExecutor:
+    """Пул потоків для запитів до БД (створюється при першому зверненні)"""
+    global _db_executor
+    if _db_executor is None:
+        _db_executor = ThreadPoolExecutor(
+            max_workers=settings.DB_EXECUTOR_WORKERS, thread_name_prefix="db"
+        )
+    return _db_executor
+
+
+def _call_with_session(func: Callable[..., T], *args, **kwargs) -> T:
+    with get_db_session() as db:
+        return func(db, *args, **kwargs)
+
+
+async def run_db(func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Виконує func(db, *args, **kwargs) у пулі потоків БД з окремою сесією
+    
+    Обробники не тримають сесію між await: об'єкти, що повертаються в
+    обробник, мають бути від'єднані від сесії (expunge) або бути простими
+    значеннями.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        get_db_executor(), partial(_call_with_session, func, *args, **kwargs)
+    )
+
+
+def load_job(db: Session, job_id: int):
+    """Вакансія, від'єднана від сесії (для показу після закриття сесії)"""
+    job = db.get(JobListing, job_id)
+    if job is not None:
+        db.expunge(job)
+    return job
+
+
+def shutdown_db_executor():
+    """Зупиняє пул потоків БД (при зупинці бота)"""
+    global _db_executor
+    if _db_executor is not None:
+        _db_executor.shutdown(wait=True)
+        _db_executor = None
@@ -1,7 +1,7 @@
 """Форматування повідомлень для бота"""
 from datetime import datetime
 from database.models import JobListing
-from config.constants import EMOJIS
+from config.constants import EMOJIS, JOB_SOURCES
 
 
 def format_job_listing(job: JobListing, include_url: bool = True) -> str:
@@ -72,5 +72,19 @@ def format_stats(stats: dict) -> str:
         text += "\nВакансії по містах:\n"
         for city, count in list(stats['jobs_by_city'].items())[:10]:
             text += f"• {city}: {count}\n"
+    if stats.get('average_salary'):
+        text += f"\nСередня зарплата: {int(stats['average_salary'])}\n"
+    if stats.get('jobs_by_category'):
+        text += "\nВакансії за категоріями:\n"
+        salaries = stats.get('salary_by_category', {})
+        for category, count in list(stats['jobs_by_category'].items())[:10]:
+            line = f"• {category}: {count}"
+            if salaries.get(category):
+                line += f" (≈{int(salaries[category])})"
+            text += line + "\n"
+    if stats.get('jobs_by_source'):
+        text += "\nДжерела:\n"
+        for source, count in stats['jobs_by_source'].items():
+            text += f"• {JOB_SOURCES.get(source, source)}: {count}\n"
     
     return text
@@ -0,0 +1,51 @@
+"""Перевірки готовності бота для /readyz (monitoring/http_server.py)"""
+from typing import Dict, Optional
+import time
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from telegram.ext import Application
+from config import settings
+from bot.utils.db_helpers import run_db
+from bot.utils.update_processor import ChatOrderedUpdateProcessor
+from monitoring.http_server import ReadinessCheck
+from scraper.scheduler import HEARTBEAT_SECONDS
+
+
+def _ping(db: Session):
+    db.execute(text("SELECT 1"))
+
+
+def build_readiness_checks(application: Application) -> Dict[str, ReadinessCheck]:
+    """Перевірки: запуск, БД (через пул потоків обробників), лідер і планувальник, затримка оновлень"""
+
+    async def startup() -> Optional[str]:
+        if not application.bot_data.get('started'):
+            return "запуск ще триває"
+        return None
+
+    async def database() -> Optional[str]:
+        await run_db(_ping)
+        return None
+
+    async def scheduler() -> Optional[str]:
+        leader = application.bot_data.get('leader')
+        if leader is None:
+            return "вибір лідера ще не запущено"
+        now = time.monotonic()
+        if leader.last_check is None or now - leader.last_check > 2 * settings.LEADER_LEASE_SECONDS:
+            return "оренда лідера давно не перевірялась"
+        running = application.bot_data.get('scheduler')
+        if running is not None and (running.heartbeat is None or now - running.heartbeat > 3 * HEARTBEAT_SECONDS):
+            return "планувальник не відмічався вчасно"
+        return None
+
+    async def updates() -> Optional[str]:
+        processor = application.update_processor
+        if not isinstance(processor, ChatOrderedUpdateProcessor):
+            return None
+        lag = processor.oldest_wait()
+        if lag > settings.READY_MAX_UPDATE_LAG_SECONDS:
+            return f"оновлення чекає обробки {lag:.0f} с"
+        return None
+
+    return {"startup": startup, "database": database, "scheduler": scheduler, "updates": updates}
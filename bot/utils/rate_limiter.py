@@ -0,0 +1,230 @@
+"""Черга вихідних запитів до Telegram з пріоритетами та лімітами
+
+Telegram обмежує бота приблизно 30 повідомленнями на секунду загалом та
+1 повідомленням на секунду в одному чаті (20 на хвилину в групах), а при
+перевищенні відповідає 429 (RetryAfter). Усі запити бота проходять через
+PriorityRateLimiter (ApplicationBuilder.rate_limiter): запит стає в чергу,
+диспетчер видає дозволи за пріоритетом (відповіді користувачам раніше за
+сповіщення) з урахуванням глобального та per-chat token bucket-ів, і лише
+тоді запит виконується. Масова розсилка стає в ту ж чергу з нижчим
+пріоритетом і йде з максимально дозволеною швидкістю.
+
+Пріоритет передається через rate_limit_args:
+    await bot.send_message(chat_id, text, rate_limit_args=notification_priority())
+"""
+from typing import Any, Callable, Coroutine, Dict, List, Optional, Union
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from telegram.error import RetryAfter
+from telegram.ext import BaseRateLimiter
+from config import settings
+from monitoring.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Пріоритети (менше - раніше)
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NOTIFICATION = 1
+PRIORITY_BULK = 2
+PRIORITY_NAMES = {
+    PRIORITY_INTERACTIVE: "interactive",
+    PRIORITY_NOTIFICATION: "notification",
+    PRIORITY_BULK: "bulk",
+}
+# Скільки bucket-ів чатів тримати до очищення повних (неактивних)
+MAX_CHAT_BUCKETS = 10000
+
+_granted = registry.counter("telegram_send_granted_total", "Запити до Telegram, що пройшли чергу")
+_wait_seconds = registry.counter("telegram_send_wait_seconds_total", "Сумарний час очікування в черзі, с")
+_retry_after = registry.counter("telegram_send_retry_after_total", "Відповіді 429 (RetryAfter) від Telegram")
+
+
+class TokenBucket:
+    """Token bucket: rate токенів на секунду, не більше capacity"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.paused_until = 0.0
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self) -> float:
+        """Скільки секунд чекати до наступного токена (0 - можна зараз)"""
+        now = time.monotonic()
+        self._refill(now)
+        if now < self.paused_until:
+            return self.paused_until - now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+    def pause(self, seconds: float):
+        """Не видавати токени seconds секунд (після RetryAfter)"""
+        self.paused_until = max(self.paused_until, time.monotonic() + seconds)
+        self.tokens = 0
+
+    @property
+    def idle(self) -> bool:
+        self._refill(time.monotonic())
+        return self.tokens >= self.capacity and self.paused_until <= time.monotonic()
+
+
+def notification_priority() -> Dict[str, int]:
+    """rate_limit_args для сповіщень"""
+    return {"priority": PRIORITY_NOTIFICATION}
+
+
+def bulk_priority() -> Dict[str, int]:
+    """rate_limit_args для масових розсилок"""
+    return {"priority": PRIORITY_BULK}
+
+
+class PriorityRateLimiter(BaseRateLimiter[Dict[str, Any]]):
+    """Rate limiter PTB з пріоритетною чергою та token bucket-ами"""
+
+    def __init__(self, global_rate: float = None, chat_rate: float = None, chat_burst: int = None):
+        self.global_rate = global_rate or settings.SEND_GLOBAL_RATE
+        self.chat_rate = chat_rate or settings.SEND_CHAT_RATE
+        self.chat_burst = chat_burst or settings.SEND_CHAT_BURST
+        self._global = TokenBucket(self.global_rate, self.global_rate)
+        self._chats: Dict[Union[int, str], TokenBucket] = {}
+        self._queue: List[list] = []  # купа [priority, seq, chat_id, future, enqueued_at]
+        self._deferred: Dict[Union[int, str], List[list]] = {}  # чати, що чекають на свій bucket
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+        for priority, name in PRIORITY_NAMES.items():
+            registry.gauge(
+                f"telegram_send_queue_depth_{name}", f"Запити в черзі до Telegram ({name})",
+                lambda priority=priority: self.depth(priority)
+            )
+        registry.gauge("telegram_send_queue_depth", "Запити в черзі до Telegram", self.depth)
+
+    def depth(self, priority: int = None) -> int:
+        """Кількість запитів, що чекають на дозвіл"""
+        entries = self._queue + [entry for waiting in self._deferred.values() for entry in waiting]
+        return sum(1 for entry in entries if priority is None or entry[0] == priority)
+
+    # --- Життєвий цикл ---
+
+    async def initialize(self) -> None:
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch())
+
+    async def shutdown(self) -> None:
+        if self._dispatcher is not None:
+            self._dispatcher.cancel()
+            try:
+                await self._dispatcher
+            except asyncio.CancelledError:
+                pass
+            self._dispatcher = None
+
+    # --- Черга ---
+
+    def _chat_bucket(self, chat_id: Union[int, str]) -> TokenBucket:
+        bucket = self._chats.get(chat_id)
+        if bucket is None:
+            if len(self._chats) >= MAX_CHAT_BUCKETS:
+                for key in [key for key, b in self._chats.items() if b.idle and key not in self._deferred]:
+                    del self._chats[key]
+            # Групи та канали (від'ємний id або @username) мають нижчий ліміт
+            is_group = isinstance(chat_id, str) or chat_id < 0
+            rate = settings.SEND_GROUP_RATE_PER_MINUTE / 60 if is_group else self.chat_rate
+            bucket = self._chats[chat_id] = TokenBucket(rate, self.chat_burst)
+        return bucket
+
+    def _push(self, entry: list):
+        chat_id = entry[2]
+        if chat_id is not None and chat_id in self._deferred:
+            # Чат уже чекає на ліміт - порядок його запитів зберігається
+            heapq.heappush(self._deferred[chat_id], entry)
+        else:
+            heapq.heappush(self._queue, entry)
+        self._wakeup.set()
+
+    def _defer(self, entry: list, delay: float):
+        chat_id = entry[2]
+        waiting = self._deferred.get(chat_id)
+        if waiting is None:
+            waiting = self._deferred[chat_id] = []
+            asyncio.get_running_loop().call_later(delay, self._release, chat_id)
+        heapq.heappush(waiting, entry)
+
+    def _release(self, chat_id: Union[int, str]):
+        """Повертає запити чату в загальну чергу (його bucket поповнився)"""
+        for entry in self._deferred.pop(chat_id, []):
+            heapq.heappush(self._queue, entry)
+        self._wakeup.set()
+
+    async def _dispatch(self):
+        """Видає дозволи: найвищий пріоритет, для якого є токени чату та глобальні"""
+        while True:
+            if not self._queue:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            entry = heapq.heappop(self._queue)
+            priority, _, chat_id, future, enqueued_at = entry
+            if future.done():  # запит скасовано
+                continue
+
+            if chat_id is not None:
+                delay = self._chat_bucket(chat_id).delay()
+                if delay > 0:
+                    self._defer(entry, delay)
+                    continue
+
+            delay = self._global.delay()
+            if delay > 0:
+                # Поки чекаємо, може прийти запит з вищим пріоритетом
+                heapq.heappush(self._queue, entry)
+                await asyncio.sleep(delay)
+                continue
+
+            self._global.consume()
+            if chat_id is not None:
+                self._chat_bucket(chat_id).consume()
+            _granted.inc()
+            _wait_seconds.inc(time.monotonic() - enqueued_at)
+            future.set_result(None)
+
+    async def _acquire(self, priority: int, chat_id: Optional[Union[int, str]], seq: int):
+        future = asyncio.get_running_loop().create_future()
+        self._push([priority, seq, chat_id, future, time.monotonic()])
+        await future
+
+    async def process_request(
+        self,
+        callback: Callable[..., Coroutine[Any, Any, Union[bool, Dict[str, Any], List[Dict[str, Any]]]]],
+        args: Any,
+        kwargs: Dict[str, Any],
+        endpoint: str,
+        data: Dict[str, Any],
+        rate_limit_args: Optional[Dict[str, Any]],
+    ) -> Union[bool, Dict[str, Any], List[Dict[str, Any]]]:
+        priority = (rate_limit_args or {}).get("priority", PRIORITY_INTERACTIVE)
+        chat_id = data.get("chat_id")
+        # Повтор після RetryAfter зберігає місце в черзі (той самий seq)
+        seq = next(self._seq)
+        while True:
+            await self._acquire(priority, chat_id, seq)
+            try:
+                return await callback(*args, **kwargs)
+            except RetryAfter as e:
+                _retry_after.inc()
+                retry_after = e.retry_after.total_seconds() if hasattr(e.retry_after, "total_seconds") else float(e.retry_after)
+                logger.warning(f"Telegram RetryAfter {retry_after}с для {endpoint} (чат {chat_id})")
+                # 429 у чаті зупиняє лише цей чат, інакше - всі запити
+                bucket = self._chat_bucket(chat_id) if chat_id is not None else self._global
+                bucket.pause(retry_after)
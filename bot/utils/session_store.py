@@ -0,0 +1,460 @@
+"""Сховище стану пошуку користувачів (user_search_state)
+
+Стан (фільтри, очікуване введення, id результатів, курсор) тримається в
+обмеженому LRU + TTL кеші процесу і зберігається в Redis (з REDIS_URL) або в
+таблиці user_sessions. Запис відкладений: фоновий потік раз на
+SESSION_FLUSH_SECONDS пише змінені стани однією пачкою, тому обробники не
+чекають на сховище. Стан переживає перезапуск.
+
+Кілька реплік: збережений стан має версію, і запис умовний (compare-and-set
+з версією, яку бачив процес). Копія в пам'яті перевіряється у сховищі перед
+обробкою оновлення, якщо її не перевіряли SESSION_REVALIDATE_SECONDS, і
+замінюється новішою. Тобто інша репліка бачить зміни не раніше їх запису і
+не пізніше інтервалу перевірки; якщо ж дві репліки змінили стан одночасно,
+записується лише перший запис, а незаписані зміни другої відкидаються (вона
+перечитає стан зі сховища).
+
+Обробники змінюють словник стану на місці, тому кожне звернення позначає
+стан як змінений; при записі закодований стан порівнюється з останнім
+записаним, і незмінені стани не пишуться.
+"""
+from typing import Dict, Iterable, Iterator, Optional, Set, Tuple
+from array import array
+from collections import OrderedDict
+from collections.abc import MutableMapping
+from datetime import datetime, timedelta
+import asyncio
+import base64
+import json
+import logging
+import sys
+import threading
+import time
+from telegram import Update
+from telegram.ext import ContextTypes
+from config import settings
+from sqlalchemy.dialects import postgresql, sqlite
+from database.models import UserSession
+from database.redis_client import get_redis
+from bot.utils.db_helpers import get_db_executor, get_db_session
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "session:"
+# Поля, що не зберігаються: кеш сторінок містить від'єднані ORM-об'єкти
+TRANSIENT_FIELDS = ("page_cache",)
+# id вакансій зберігаються масивом 4-байтових чисел, а не списком int
+JOB_IDS_TYPECODE = "I"
+# Як часто видаляються застарілі стани з таблиці
+PURGE_INTERVAL_SECONDS = 3600
+# Версія стану, записаного до появи версій (0 - стану у сховищі немає)
+LEGACY_VERSION = 1
+
+# Збережений стан: (закодований стан, версія)
+Stored = Tuple[str, int]
+
+# Умовний запис у Redis: значення "версія:стан", пише лише якщо версія збігається
+REDIS_CAS_SCRIPT = """
+local current = redis.call('GET', KEYS[1])
+local version = '0'
+if current then
+    version = string.match(current, '^(%d+):') or '1'
+end
+if version ~= ARGV[1] then
+    return 0
+end
+redis.call('SETEX', KEYS[1], ARGV[3], ARGV[2])
+return 1
+"""
+
+
+def pack_ids(job_ids: Iterable[int]) -> array:
+    """Компактний масив id вакансій"""
+    return array(JOB_IDS_TYPECODE, job_ids)
+
+
+def encode_state(state: Dict) -> str:
+    """Кодує стан для сховища (id вакансій - base64 упакованого масиву)"""
+    data = {key: value for key, value in state.items() if key not in TRANSIENT_FIELDS}
+    if "jobs" in data:
+        job_ids = pack_ids(data["jobs"])
+        if sys.byteorder == "big":
+            job_ids.byteswap()
+        data["jobs"] = base64.b64encode(job_ids.tobytes()).decode("ascii")
+    return json.dumps(data, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+
+
+def decode_state(raw: str) -> Dict:
+    """Розкодовує стан зі сховища"""
+    state = json.loads(raw)
+    if "jobs" in state:
+        job_ids = array(JOB_IDS_TYPECODE)
+        job_ids.frombytes(base64.b64decode(state["jobs"]))
+        if sys.byteorder == "big":
+            job_ids.byteswap()
+        state["jobs"] = job_ids
+    return state
+
+
+class SqlSessionBackend:
+    """Стани в таблиці user_sessions"""
+
+    def load(self, user_id: int) -> Optional[Stored]:
+        with get_db_session() as db:
+            row = db.get(UserSession, user_id)
+            return (row.state, row.version or LEGACY_VERSION) if row else None
+
+    def save(self, changes: Dict[int, Optional[str]], versions: Dict[int, int]) -> Dict[int, int]:
+        """
+        Записує пачку змін (None - видалити стан) однією транзакцією
+
+        Стан пишеться, лише якщо версія у сховищі дорівнює versions[user_id]
+        (0 - стану ще немає). Повертає нові версії записаних станів.
+        """
+        now = datetime.utcnow()
+        saved = {}
+        with get_db_session() as db:
+            deleted = [user_id for user_id, raw in changes.items() if raw is None]
+            if deleted:
+                db.query(UserSession).filter(
+                    UserSession.user_id.in_(deleted)
+                ).delete(synchronize_session=False)
+
+            dialect = db.get_bind().dialect.name
+            insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+            for user_id, raw in changes.items():
+                if raw is None:
+                    continue
+                expected = versions.get(user_id, 0)
+                if expected:
+                    updated = db.query(UserSession).filter(
+                        UserSession.user_id == user_id, UserSession.version == expected
+                    ).update({
+                        UserSession.state: raw, UserSession.version: expected + 1, UserSession.updated_at: now
+                    }, synchronize_session=False)
+                else:
+                    updated = db.execute(insert(UserSession).values(
+                        user_id=user_id, state=raw, version=1, updated_at=now
+                    ).on_conflict_do_nothing(index_elements=[UserSession.user_id])).rowcount
+                if updated:
+                    saved[user_id] = expected + 1
+            db.commit()
+        return saved
+
+    def purge(self, before: datetime) -> int:
+        """Видаляє стани, що не змінювались з before"""
+        with get_db_session() as db:
+            deleted = db.query(UserSession).filter(
+                UserSession.updated_at < before
+            ).delete(synchronize_session=False)
+            db.commit()
+            return deleted
+
+
+class RedisSessionBackend:
+    """Стани в Redis (застарілі видаляє TTL)"""
+
+    def __init__(self, client):
+        self.client = client
+        self.ttl = settings.SESSION_RETENTION_DAYS * 86400
+        self._cas = client.register_script(REDIS_CAS_SCRIPT)
+
+    def load(self, user_id: int) -> Optional[Stored]:
+        value = self.client.get(f"{REDIS_PREFIX}{user_id}")
+        if not value:
+            return None
+        value = value.decode("utf-8")
+        version, _, raw = value.partition(":")
+        if not version.isdigit():
+            # Стан без версії (JSON починається з "{")
+            return value, LEGACY_VERSION
+        return raw, int(version)
+
+    def save(self, changes: Dict[int, Optional[str]], versions: Dict[int, int]) -> Dict[int, int]:
+        """Як SqlSessionBackend.save: умовний запис кожного стану скриптом"""
+        pipeline = self.client.pipeline(transaction=False)
+        written = []
+        for user_id, raw in changes.items():
+            key = f"{REDIS_PREFIX}{user_id}"
+            if raw is None:
+                pipeline.delete(key)
+                continue
+            expected = versions.get(user_id, 0)
+            self._cas(keys=[key], args=[expected, f"{expected + 1}:{raw}", self.ttl], client=pipeline)
+            written.append((user_id, expected + 1))
+        results = [result for (user_id, raw), result in zip(changes.items(), pipeline.execute()) if raw is not None]
+        return {user_id: version for (user_id, version), ok in zip(written, results) if ok}
+
+    def purge(self, before: datetime) -> int:
+        return 0
+
+
+class SessionStore(MutableMapping):
+    """
+    Словник user_id -> стан з обмеженим кешем у пам'яті та відкладеним записом
+
+    Ітерація та len() охоплюють лише стани в пам'яті процесу.
+    """
+
+    def __init__(self, backend=None, max_size: int = None, ttl: int = None):
+        self._backend = backend
+        self.max_size = max_size or settings.SESSION_CACHE_SIZE
+        self.ttl = ttl or settings.SESSION_IDLE_SECONDS
+        self._entries: "OrderedDict[int, list]" = OrderedDict()  # user_id -> [expires_at, state, checked_at]
+        self._dirty: Set[int] = set()
+        self._pending: Dict[int, Optional[str]] = {}  # витіснені/видалені, ще не записані
+        self._written: Dict[int, int] = {}  # user_id -> хеш останнього записаного стану
+        self._versions: Dict[int, int] = {}  # user_id -> версія стану у сховищі, від якої він змінюється
+        self._lock = threading.RLock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._last_purge = 0.0
+
+    @property
+    def backend(self):
+        if self._backend is None:
+            redis = get_redis()
+            self._backend = RedisSessionBackend(redis) if redis is not None else SqlSessionBackend()
+        return self._backend
+
+    # --- Словник ---
+
+    def __getitem__(self, user_id: int) -> Dict:
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                if entry[0] >= time.monotonic():
+                    return self._touch(user_id, entry)
+                self._evict(user_id)
+            raw = self._pending.get(user_id)
+            if user_id in self._pending and raw is None:
+                raise KeyError(user_id)
+
+        version = None
+        if raw is None:
+            stored = self._load(user_id)
+            if stored is None:
+                raise KeyError(user_id)
+            raw, version = stored
+
+        with self._lock:
+            # Поки завантажували, стан міг з'явитись з іншого потоку
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                return self._touch(user_id, entry)
+            state = decode_state(raw)
+            self._written[user_id] = hash(raw)
+            if version is not None:
+                self._versions[user_id] = version
+            self._put(user_id, state)
+            return state
+
+    def __setitem__(self, user_id: int, state: Dict):
+        with self._lock:
+            self._put(user_id, state)
+            self._dirty.add(user_id)
+
+    def __delitem__(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+            self._dirty.discard(user_id)
+            self._written.pop(user_id, None)
+            self._versions.pop(user_id, None)
+            self._pending[user_id] = None
+
+    def __iter__(self) -> Iterator[int]:
+        with self._lock:
+            return iter(list(self._entries))
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _touch(self, user_id: int, entry: list) -> Dict:
+        """Продовжує TTL і позначає стан зміненим (його можуть змінити на місці)"""
+        entry[0] = time.monotonic() + self.ttl
+        self._entries.move_to_end(user_id)
+        self._dirty.add(user_id)
+        return entry[1]
+
+    def _put(self, user_id: int, state: Dict):
+        now = time.monotonic()
+        self._entries[user_id] = [now + self.ttl, state, now]
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_size:
+            self._evict(next(iter(self._entries)))
+
+    def _evict(self, user_id: int):
+        """Прибирає стан з пам'яті; змінений - ставить у чергу на запис"""
+        state = self._entries.pop(user_id)[1]
+        written = self._written.pop(user_id, None)
+        if user_id in self._dirty:
+            self._dirty.discard(user_id)
+            try:
+                raw = encode_state(state)
+            except (RuntimeError, TypeError, ValueError) as e:
+                logger.warning(f"Не вдалося закодувати стан користувача {user_id}: {e}")
+                raw = None
+            if raw is not None and hash(raw) != written:
+                # Версія лишається до запису: він умовний
+                self._pending[user_id] = raw
+                return
+        if user_id not in self._pending:
+            self._versions.pop(user_id, None)
+
+    def _load(self, user_id: int) -> Optional[Stored]:
+        try:
+            return self.backend.load(user_id)
+        except Exception as e:
+            logger.warning(f"Помилка читання стану користувача {user_id}: {e}")
+            return None
+
+    def _load_or_default(self, user_id: int):
+        if self.get(user_id) is None:
+            with self._lock:
+                if user_id not in self._entries:
+                    # Порожній стан не позначається зміненим, поки його не використають
+                    self._put(user_id, {"filters": {}})
+
+    def _revalidate(self, user_id: int):
+        """Замінює копію в пам'яті станом зі сховища, якщо інша репліка записала новіший"""
+        stored = self._load(user_id)
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return
+            entry[2] = time.monotonic()
+            if stored is None:
+                return
+            raw, version = stored
+            if version == self._versions.get(user_id, 0):
+                return
+            logger.debug(f"Стан користувача {user_id} змінено іншою реплікою, перечитано")
+            entry[1] = decode_state(raw)
+            self._written[user_id] = hash(raw)
+            self._versions[user_id] = version
+            self._dirty.discard(user_id)
+            self._pending.pop(user_id, None)
+
+    def _sync(self, user_id: int):
+        with self._lock:
+            cached = user_id in self._entries
+        if cached:
+            self._revalidate(user_id)
+        else:
+            self._load_or_default(user_id)
+
+    async def preload(self, user_id: int):
+        """Завантажує (або перевіряє) стан поза event loop, до обробників оновлення"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None and time.monotonic() - entry[2] < settings.SESSION_REVALIDATE_SECONDS:
+                return
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(get_db_executor(), self._sync, user_id)
+
+    # --- Відкладений запис ---
+
+    def flush(self) -> int:
+        """Записує змінені та витіснені стани однією пачкою"""
+        now = time.monotonic()
+        with self._lock:
+            for user_id in [uid for uid, entry in self._entries.items() if entry[0] < now]:
+                self._evict(user_id)
+            dirty = {user_id: self._entries[user_id][1] for user_id in self._dirty}
+            self._dirty.clear()
+            changes, self._pending = self._pending, {}
+            versions = dict(self._versions)
+
+        written = {}
+        for user_id, state in dirty.items():
+            try:
+                raw = encode_state(state)
+            except RuntimeError:
+                # Стан змінюється паралельно - запишемо наступного разу
+                with self._lock:
+                    self._dirty.add(user_id)
+                continue
+            except (TypeError, ValueError) as e:
+                logger.warning(f"Не вдалося закодувати стан користувача {user_id}: {e}")
+                continue
+            digest = hash(raw)
+            if self._written.get(user_id) != digest:
+                changes[user_id] = raw
+                written[user_id] = digest
+
+        if not changes:
+            return 0
+        try:
+            saved = self.backend.save(changes, versions)
+        except Exception as e:
+            logger.warning(f"Помилка запису станів користувачів: {e}")
+            with self._lock:
+                for user_id, raw in changes.items():
+                    # Новіші зміни з черги мають пріоритет
+                    self._pending.setdefault(user_id, raw)
+            return 0
+
+        conflicts = 0
+        with self._lock:
+            for user_id, raw in changes.items():
+                if raw is None:
+                    continue
+                version = saved.get(user_id)
+                if version is None:
+                    # Інша репліка записала стан раніше: її версія перемагає,
+                    # локальна копія відкидається і перечитується при зверненні
+                    conflicts += 1
+                    self._entries.pop(user_id, None)
+                    self._dirty.discard(user_id)
+                    self._written.pop(user_id, None)
+                    self._versions.pop(user_id, None)
+                    continue
+                if user_id in self._entries or user_id in self._pending:
+                    self._versions[user_id] = version
+                if user_id in written and user_id in self._entries:
+                    self._written[user_id] = written[user_id]
+        if conflicts:
+            logger.info(f"Стани {conflicts} користувачів змінено іншою реплікою, локальні зміни відкинуто")
+        return len(changes) - conflicts
+
+    def _run(self):
+        while not self._stop.wait(settings.SESSION_FLUSH_SECONDS):
+            self.flush()
+            if time.monotonic() - self._last_purge > PURGE_INTERVAL_SECONDS:
+                self._last_purge = time.monotonic()
+                try:
+                    before = datetime.utcnow() - timedelta(days=settings.SESSION_RETENTION_DAYS)
+                    purged = self.backend.purge(before)
+                    if purged:
+                        logger.info(f"Видалено {purged} застарілих станів користувачів")
+                except Exception as e:
+                    logger.warning(f"Помилка видалення застарілих станів: {e}")
+
+    def start(self):
+        """Запускає фоновий запис"""
+        if self._thread is None:
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="session-flush", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Зупиняє фоновий запис і записує все, що залишилось"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+
+_session_store = SessionStore()
+
+
+def get_session_store() -> SessionStore:
+    """Повертає сховище станів процесу"""
+    return _session_store
+
+
+async def preload_session(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Завантажує стан користувача до обробки оновлення (група -1)"""
+    if update.effective_user:
+        await _session_store.preload(update.effective_user.id)
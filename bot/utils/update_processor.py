@@ -0,0 +1,116 @@
+"""Паралельна обробка оновлень з порядком у межах чату
+
+Оновлення різних чатів обробляються одночасно (не більше
+CONCURRENT_UPDATES обробників), а оновлення одного чату - строго в порядку
+надходження: наступне чекає завершення попереднього. Тому повільний пошук
+одного користувача не затримує інших, а подвійне натискання "Наступна ➡️"
+не змагається за user_search_state.
+
+Оновлення, що чекає своєї черги в чаті, не займає обробника. Час очікування
+та обробки пишеться в гістограми (monitoring.metrics).
+"""
+from typing import Any, Awaitable, Dict, Optional
+import asyncio
+import itertools
+import logging
+import time
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+from config import settings
+from monitoring.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+_wait_seconds = registry.histogram(
+    "telegram_update_wait_seconds", "Очікування оновлення до початку обробки (черга чату та обробника), с"
+)
+_handle_seconds = registry.histogram("telegram_update_handle_seconds", "Тривалість обробки оновлення, с")
+_latency_seconds = registry.histogram(
+    "telegram_update_latency_seconds", "Від надходження оновлення до завершення обробки, с"
+)
+
+
+def chat_key(update: object) -> Optional[int]:
+    """Ключ впорядкування: чат (без чату - користувач); None - оновлення не впорядковується"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat is not None:
+        return update.effective_chat.id
+    if update.effective_user is not None:
+        return update.effective_user.id
+    return None
+
+
+class ChatOrderedUpdateProcessor(BaseUpdateProcessor):
+    """
+    Обробник оновлень для ApplicationBuilder.concurrent_updates
+
+    max_concurrent_updates (межа базового класу) - скільки оновлень може
+    бути прийнято одночасно разом з тими, що чекають; кількість одночасних
+    обробників - workers.
+    """
+
+    def __init__(self, workers: int = None, max_pending: int = None):
+        super().__init__(max_pending or settings.MAX_PENDING_UPDATES)
+        self.workers = workers or settings.CONCURRENT_UPDATES
+        self._worker_slots = asyncio.Semaphore(self.workers)
+        self._tails: Dict[int, asyncio.Future] = {}  # чат -> завершення останнього прийнятого оновлення
+        self._waiting: Dict[int, float] = {}  # оновлення, що чекають обробки -> час надходження
+        self._tickets = itertools.count()
+        self._active = 0
+        registry.gauge("telegram_updates_waiting", "Оновлення, що чекають обробки", lambda: len(self._waiting))
+        registry.gauge("telegram_updates_active", "Оновлення в обробці", lambda: self._active)
+        registry.gauge(
+            "telegram_update_oldest_wait_seconds", "Як довго чекає найстаріше необроблене оновлення, с",
+            self.oldest_wait
+        )
+
+    def oldest_wait(self) -> float:
+        """Скільки секунд чекає найстаріше оновлення, обробка якого ще не почалась"""
+        waiting = list(self._waiting.values())
+        return time.monotonic() - min(waiting) if waiting else 0.0
+
+    async def _handle(self, coroutine: Awaitable[Any], received_at: float):
+        started = time.monotonic()
+        _wait_seconds.observe(started - received_at)
+        self._active += 1
+        try:
+            await coroutine
+        finally:
+            finished = time.monotonic()
+            self._active -= 1
+            _handle_seconds.observe(finished - started)
+            _latency_seconds.observe(finished - received_at)
+
+    async def do_process_update(self, update: object, coroutine: Awaitable[Any]):
+        received_at = time.monotonic()
+
+        # Ланцюжок оновлень чату: кожне чекає завершення попереднього
+        key = chat_key(update)
+        previous = turn = None
+        if key is not None:
+            previous = self._tails.get(key)
+            turn = asyncio.get_running_loop().create_future()
+            self._tails[key] = turn
+
+        ticket = next(self._tickets)
+        self._waiting[ticket] = received_at
+        try:
+            if previous is not None:
+                await asyncio.shield(previous)
+            async with self._worker_slots:
+                del self._waiting[ticket]
+                await self._handle(coroutine, received_at)
+        finally:
+            self._waiting.pop(ticket, None)
+            if turn is not None:
+                if not turn.done():
+                    turn.set_result(None)
+                if self._tails.get(key) is turn:
+                    del self._tails[key]
+
+    async def initialize(self):
+        logger.info(f"Обробка оновлень: {self.workers} одночасно, з порядком у межах чату")
+
+    async def shutdown(self):
+        self._tails.clear()
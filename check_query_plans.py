@@ -0,0 +1,113 @@
+"""
+Перевірка планів гарячих запитів пошуку
+
+Виконує запити вікон результатів (ті самі функції, що й бот), перехоплює
+згенерований SQL та показує план (EXPLAIN QUERY PLAN для SQLite, EXPLAIN з
+enable_seqscan = off для PostgreSQL). Завершується з кодом 1, якщо запит не
+використовує очікуваний індекс.
+
+Використання (після застосування міграцій):
+    python check_query_plans.py
+"""
+import sys
+from sqlalchemy import event
+from database.database import SessionLocal, engine
+from database.models import UserFavorite
+from search.cursor import ORDER_RANDOM, ORDER_RECENT, ResultCursor
+from search.query import build_search_query, recent_window
+from search.sampling import random_window
+
+WINDOW = 11
+
+# (назва, фільтри, порядок, допустимі індекси)
+CHECKS = [
+    ("Найновіші", {}, ORDER_RECENT, {"ix_job_listings_active_recent"}),
+    ("Місто", {"city": "Warszawa"}, ORDER_RECENT, {"ix_job_listings_active_city_recent"}),
+    (
+        "Місто + категорія + тип",
+        {"city": "Warszawa", "category": "IT", "employment_type": "full-time"},
+        ORDER_RECENT,
+        {"ix_job_listings_active_filters", "ix_job_listings_active_city_recent"},
+    ),
+    ("Випадкові", {}, ORDER_RANDOM, {"ix_job_listings_active_shuffle"}),
+]
+
+
+class StatementCapture:
+    """Збирає SELECT-запити, виконані через engine"""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            self.statements.append((statement, parameters))
+
+
+def explain(db, statement, parameters) -> str:
+    """Повертає план запиту одним рядком тексту"""
+    conn = db.connection()
+    if engine.dialect.name == "sqlite":
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+        return "\n".join(row[-1] for row in rows)
+    rows = conn.exec_driver_sql(f"EXPLAIN {statement}", parameters).fetchall()
+    return "\n".join(row[0] for row in rows)
+
+
+def run_check(db, capture, name, run_query, expected) -> bool:
+    """Виконує запит, показує план та перевіряє використаний індекс"""
+    capture.statements.clear()
+    run_query()
+
+    ok = bool(capture.statements)
+    for statement, parameters in capture.statements:
+        plan = explain(db, statement, parameters)
+        used = any(index in plan for index in expected)
+        ok = ok and used
+        print(f"\n[{'OK' if used else 'FAIL'}] {name}")
+        print(plan)
+    return ok
+
+
+def main():
+    db = SessionLocal()
+    capture = StatementCapture()
+    event.listen(engine, "before_cursor_execute", capture)
+    try:
+        if engine.dialect.name == "postgresql":
+            # На маленькій таблиці seq scan дешевший - перевіряємо лише придатність індексу
+            db.connection().exec_driver_sql("SET enable_seqscan = off")
+
+        results = []
+
+        for name, filters, order, expected in CHECKS:
+            db_query = build_search_query(db, filters)
+            cursor = ResultCursor.start(order)
+            if order == ORDER_RANDOM:
+                def run_query():
+                    random_window(db_query, cursor.pivot, limit=WINDOW)
+            else:
+                def run_query():
+                    recent_window(db_query, cursor, WINDOW)
+            results.append(run_check(db, capture, name, run_query, expected))
+
+        results.append(run_check(
+            db, capture, "Улюблене (user_id, job_listing_id)",
+            lambda: db.query(UserFavorite).filter(
+                UserFavorite.user_id == 1, UserFavorite.job_listing_id == 1
+            ).first(),
+            {"uq_user_favorites_user_job"},
+        ))
+    finally:
+        event.remove(engine, "before_cursor_execute", capture)
+        db.rollback()
+        db.close()
+
+    if not all(results):
+        print("\nДеякі запити не використовують очікувані індекси")
+        sys.exit(1)
+    print("\nУсі запити використовують очікувані індекси")
+
+
+if __name__ == "__main__":
+    main()
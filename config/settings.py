@@ -17,6 +17,12 @@ class Settings(BaseSettings):
         "DATABASE_URL", 
         "sqlite:///./worksearchbot.db"
     )
+    # Пул з'єднань та пул потоків, у якому обробники виконують запити
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "10"))
+    DB_MAX_OVERFLOW: int = int(os.getenv("DB_MAX_OVERFLOW", "5"))
+    DB_POOL_TIMEOUT_SECONDS: int = int(os.getenv("DB_POOL_TIMEOUT_SECONDS", "10"))
+    DB_POOL_RECYCLE_SECONDS: int = int(os.getenv("DB_POOL_RECYCLE_SECONDS", "1800"))
+    DB_EXECUTOR_WORKERS: int = int(os.getenv("DB_EXECUTOR_WORKERS", "10"))
     
     # Redis (опціонально)
     REDIS_URL: str = os.getenv("REDIS_URL", "")
@@ -35,10 +41,80 @@ class Settings(BaseSettings):
     SCRAPING_INTERVAL_MINUTES: int = int(os.getenv("SCRAPING_INTERVAL_MINUTES", "60"))
     SCRAPING_ENABLED: bool = os.getenv("SCRAPING_ENABLED", "true").lower() == "true"
     
+    # Вибір лідера: скрапінг і розсилки виконує лише інстанс з неминулою орендою
+    INSTANCE_ID: str = os.getenv("INSTANCE_ID", "")  # порожньо - hostname-pid
+    LEADER_LEASE_SECONDS: int = int(os.getenv("LEADER_LEASE_SECONDS", "15"))
+    LEADER_RENEW_SECONDS: int = int(os.getenv("LEADER_RENEW_SECONDS", "5"))
+    
+    # Архів сирих сторінок (для офлайн-перепарсингу)
+    ARCHIVE_ENABLED: bool = os.getenv("ARCHIVE_ENABLED", "false").lower() == "true"
+    ARCHIVE_DIR: str = os.getenv("ARCHIVE_DIR", "data/archive")
+    ARCHIVE_RETENTION_DAYS: int = int(os.getenv("ARCHIVE_RETENTION_DAYS", "30"))
+    
+    # Ліниве завантаження деталей (детальна сторінка лише при першому перегляді)
+    LAZY_DETAIL_FETCH: bool = os.getenv("LAZY_DETAIL_FETCH", "false").lower() == "true"
+    DETAIL_FILL_INTERVAL_MINUTES: int = int(os.getenv("DETAIL_FILL_INTERVAL_MINUTES", "10"))
+    DETAIL_FILL_BATCH_SIZE: int = int(os.getenv("DETAIL_FILL_BATCH_SIZE", "20"))
+    DETAIL_FETCH_TIMEOUT_SECONDS: int = int(os.getenv("DETAIL_FETCH_TIMEOUT_SECONDS", "8"))
+    DETAIL_MAX_ATTEMPTS: int = int(os.getenv("DETAIL_MAX_ATTEMPTS", "5"))
+    DETAIL_RETRY_MINUTES: int = int(os.getenv("DETAIL_RETRY_MINUTES", "30"))
+    
+    # Кеш результатів пошуку (з REDIS_URL - спільний для всіх процесів)
+    SEARCH_CACHE_SIZE: int = int(os.getenv("SEARCH_CACHE_SIZE", "2048"))
+    SEARCH_CACHE_TTL_SECONDS: int = int(os.getenv("SEARCH_CACHE_TTL_SECONDS", "300"))
+    
+    # Підказки запитів (перебудова з історії пошуку)
+    SUGGESTIONS_REBUILD_MINUTES: int = int(os.getenv("SUGGESTIONS_REBUILD_MINUTES", "30"))
+    
+    # Як довго /stats віддає знімок статистики з пам'яті
+    STATS_CACHE_TTL_SECONDS: int = int(os.getenv("STATS_CACHE_TTL_SECONDS", "60"))
+    
+    # Сповіщення за підписками
+    SUBSCRIPTION_INDEX_TTL_SECONDS: int = int(os.getenv("SUBSCRIPTION_INDEX_TTL_SECONDS", "300"))
+    NOTIFY_DELIVERY_INTERVAL_SECONDS: int = int(os.getenv("NOTIFY_DELIVERY_INTERVAL_SECONDS", "60"))
+    NOTIFY_BATCH_SIZE: int = int(os.getenv("NOTIFY_BATCH_SIZE", "100"))
+    NOTIFY_MAX_ATTEMPTS: int = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "3"))
+    # Журнал відправлених сповіщень (захист від повторів)
+    LEDGER_RETENTION_DAYS: int = int(os.getenv("LEDGER_RETENTION_DAYS", "60"))
+    LEDGER_BLOOM_CAPACITY: int = int(os.getenv("LEDGER_BLOOM_CAPACITY", "1000000"))
+    LEDGER_BLOOM_ERROR_RATE: float = float(os.getenv("LEDGER_BLOOM_ERROR_RATE", "0.01"))
+    # Щоденні та щотижневі добірки (вікно відправки - у часовому поясі DIGEST_TIMEZONE)
+    DIGEST_TIMEZONE: str = os.getenv("DIGEST_TIMEZONE", "Europe/Warsaw")
+    DIGEST_WINDOW_START_HOUR: int = int(os.getenv("DIGEST_WINDOW_START_HOUR", "9"))
+    DIGEST_WINDOW_HOURS: int = int(os.getenv("DIGEST_WINDOW_HOURS", "3"))
+    DIGEST_WEEKLY_DAY: int = int(os.getenv("DIGEST_WEEKLY_DAY", "0"))  # 0 - понеділок
+    DIGEST_TOP_N: int = int(os.getenv("DIGEST_TOP_N", "10"))
+    DIGEST_CHECK_MINUTES: int = int(os.getenv("DIGEST_CHECK_MINUTES", "5"))
+    
     # Logging
     LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
     LOG_FILE: str = os.getenv("LOG_FILE", "logs/bot.log")
     
+    # Стан пошуку користувачів: кеш у пам'яті + Redis/таблиця user_sessions
+    SESSION_CACHE_SIZE: int = int(os.getenv("SESSION_CACHE_SIZE", "5000"))
+    SESSION_IDLE_SECONDS: int = int(os.getenv("SESSION_IDLE_SECONDS", "1800"))
+    SESSION_FLUSH_SECONDS: int = int(os.getenv("SESSION_FLUSH_SECONDS", "5"))
+    SESSION_REVALIDATE_SECONDS: int = int(os.getenv("SESSION_REVALIDATE_SECONDS", "30"))
+    SESSION_RETENTION_DAYS: int = int(os.getenv("SESSION_RETENTION_DAYS", "14"))
+    
+    # Кеш telegram_id -> users.id (відсутні користувачі кешуються коротше)
+    USER_CACHE_SIZE: int = int(os.getenv("USER_CACHE_SIZE", "50000"))
+    USER_CACHE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_TTL_SECONDS", "3600"))
+    USER_CACHE_NEGATIVE_TTL_SECONDS: int = int(os.getenv("USER_CACHE_NEGATIVE_TTL_SECONDS", "60"))
+    
+    # Скільки оновлень Telegram обробляються одночасно (оновлення одного чату - по черзі)
+    CONCURRENT_UPDATES: int = int(os.getenv("CONCURRENT_UPDATES", "16"))
+    # Скільки прийнятих оновлень може чекати обробки, далі нові не приймаються
+    MAX_PENDING_UPDATES: int = int(os.getenv("MAX_PENDING_UPDATES", "1024"))
+    # /readyz повертає 503, якщо оновлення чекає обробки довше
+    READY_MAX_UPDATE_LAG_SECONDS: int = int(os.getenv("READY_MAX_UPDATE_LAG_SECONDS", "30"))
+    
+    # Ліміти вихідних запитів до Telegram (глобально, на чат, на групу)
+    SEND_GLOBAL_RATE: float = float(os.getenv("SEND_GLOBAL_RATE", "30"))
+    SEND_CHAT_RATE: float = float(os.getenv("SEND_CHAT_RATE", "1"))
+    SEND_CHAT_BURST: int = int(os.getenv("SEND_CHAT_BURST", "3"))
+    SEND_GROUP_RATE_PER_MINUTE: int = int(os.getenv("SEND_GROUP_RATE_PER_MINUTE", "20"))
+    
     # Rate Limiting
     MAX_REQUESTS_PER_MINUTE: int = int(os.getenv("MAX_REQUESTS_PER_MINUTE", "30"))
     MAX_REQUESTS_PER_HOUR: int = int(os.getenv("MAX_REQUESTS_PER_HOUR", "200"))
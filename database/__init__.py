@@ -1,4 +1,4 @@
-from .models import Base, User, JobListing, UserSubscription, UserFavorite, SearchHistory
+from .models import Base, User, JobListing, UserSubscription, UserFavorite, SearchHistory, JobFacetCount, UserSession
 from .database import get_db, init_db
 
 __all__ = [
@@ -8,6 +8,8 @@ __all__ = [
     'UserSubscription',
     'UserFavorite',
     'SearchHistory',
+    'JobFacetCount',
+    'UserSession',
     'get_db',
     'init_db'
 ]
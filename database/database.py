@@ -1,8 +1,7 @@
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, Session
 from sqlalchemy.pool import StaticPool
 from config import settings
-from .models import Base
 import os
 
 # Створюємо движок БД
@@ -10,14 +9,40 @@ db_url = settings.DATABASE_URL
 if db_url.startswith("postgres://"):
     db_url = db_url.replace("postgres://", "postgresql://", 1)
 
-if db_url.startswith("sqlite"):
+# Пул розрахований на паралельні запити з пулу потоків обробників
+# (bot.utils.db_helpers.run_db): pre_ping відкидає розірвані з'єднання,
+# recycle - з'єднання, які сервер міг закрити за тайм-аутом
+_pool_options = dict(
+    pool_size=settings.DB_POOL_SIZE,
+    max_overflow=settings.DB_MAX_OVERFLOW,
+    pool_timeout=settings.DB_POOL_TIMEOUT_SECONDS,
+    pool_recycle=settings.DB_POOL_RECYCLE_SECONDS,
+    pool_pre_ping=True,
+)
+
+if db_url.startswith("sqlite") and ":memory:" in db_url:
+    # БД у пам'яті існує лише в межах одного з'єднання
     engine = create_engine(
         db_url,
         connect_args={"check_same_thread": False},
         poolclass=StaticPool,
     )
+elif db_url.startswith("sqlite"):
+    engine = create_engine(
+        db_url,
+        connect_args={"check_same_thread": False, "timeout": settings.DB_POOL_TIMEOUT_SECONDS},
+        **_pool_options,
+    )
+
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        """WAL: читання з інших потоків не чекають на запис"""
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
 else:
-    engine = create_engine(db_url)
+    engine = create_engine(db_url, **_pool_options)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -31,8 +56,22 @@ def get_db() -> Session:
         db.close()
 
 
+def run_migrations():
+    """Застосовує міграції Alembic до останньої ревізії"""
+    from alembic import command
+    from alembic.config import Config
+    
+    migrations_dir = os.path.join(os.path.dirname(os.path.abspath(__file__)), "migrations")
+    cfg = Config()
+    cfg.set_main_option("script_location", migrations_dir)
+    with engine.begin() as connection:
+        # env.py використовує це з'єднання замість створення власного движка
+        cfg.attributes["connection"] = connection
+        command.upgrade(cfg, "head")
+
+
 def init_db():
-    """Ініціалізувати БД (створити таблиці)"""
+    """Ініціалізувати БД (застосувати міграції)"""
     # Створюємо папку для логів якщо не існує
     os.makedirs("logs", exist_ok=True)
     
@@ -42,8 +81,28 @@ def init_db():
     logger.info(f"Ініціалізація бази даних: {safe_url}")
     
     try:
-        # Створюємо всі таблиці
-        Base.metadata.create_all(bind=engine)
+        # Схема (таблиці, колонки, індекси, FTS) керується міграціями
+        run_migrations()
+        
+        # Дані для нових колонок: повнотекстовий індекс, ключі випадкової вибірки, міста
+        from search.fts import is_fts_available, backfill_index
+        from search.sampling import backfill_shuffle_keys
+        from search.geo import backfill_city_ids
+        from search.facets import rebuild_facet_counts
+        from search.stats import job_stats_empty, rebuild_job_stats
+        db = SessionLocal()
+        try:
+            if is_fts_available(db):
+                backfill_index(db)
+            backfill_shuffle_keys(db)
+            # Геокодування змінює назви міст, тому лічильники фасетів перераховуються
+            if backfill_city_ids(db):
+                rebuild_facet_counts(db)
+                rebuild_job_stats(db)
+            elif job_stats_empty(db):
+                rebuild_job_stats(db)
+        finally:
+            db.close()
         logger.info("База даних ініціалізована успішно!")
     except Exception as e:
         logger.error(f"Помилка ініціалізації бази даних: {e}")
@@ -0,0 +1,179 @@
+"""Core schema
+
+Створює всі таблиці та колонки моделей. Міграція ідемпотентна: бази, які
+раніше створювались через create_all, отримують лише відсутні таблиці та
+колонки (details_fetched_at, search_text, shuffle_key) і повнотекстовий індекс.
+
+Revision ID: 7a3c9e1f2b40
+Revises: 456786feae33
+Create Date: 2026-10-19 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a3c9e1f2b40'
+down_revision = '456786feae33'
+branch_labels = None
+depends_on = None
+
+
+def _has_table(name: str) -> bool:
+    return sa.inspect(op.get_bind()).has_table(name)
+
+
+def _has_column(table: str, column: str) -> bool:
+    return column in {c["name"] for c in sa.inspect(op.get_bind()).get_columns(table)}
+
+
+def _has_index(table: str, index: str) -> bool:
+    return index in {i["name"] for i in sa.inspect(op.get_bind()).get_indexes(table)}
+
+
+def upgrade() -> None:
+    if not _has_table('users'):
+        op.create_table(
+            'users',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('telegram_id', sa.Integer(), nullable=False),
+            sa.Column('username', sa.String(length=255), nullable=True),
+            sa.Column('first_name', sa.String(length=255), nullable=True),
+            sa.Column('language_code', sa.String(length=10), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.Column('updated_at', sa.DateTime(), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_users_id', 'users', ['id'])
+        op.create_index('ix_users_telegram_id', 'users', ['telegram_id'], unique=True)
+
+    if not _has_table('job_listings'):
+        op.create_table(
+            'job_listings',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('source', sa.String(length=50), nullable=False),
+            sa.Column('source_id', sa.String(length=255), nullable=True),
+            sa.Column('title', sa.String(length=500), nullable=False),
+            sa.Column('description', sa.Text(), nullable=True),
+            sa.Column('company', sa.String(length=255), nullable=True),
+            sa.Column('location', sa.String(length=255), nullable=True),
+            sa.Column('city', sa.String(length=100), nullable=True),
+            sa.Column('salary_min', sa.DECIMAL(precision=10, scale=2), nullable=True),
+            sa.Column('salary_max', sa.DECIMAL(precision=10, scale=2), nullable=True),
+            sa.Column('salary_currency', sa.String(length=10), nullable=True),
+            sa.Column('employment_type', sa.String(length=50), nullable=True),
+            sa.Column('category', sa.String(length=100), nullable=True),
+            sa.Column('url', sa.String(length=1000), nullable=False),
+            sa.Column('published_date', sa.DateTime(), nullable=True),
+            sa.Column('scraped_at', sa.DateTime(), nullable=True),
+            sa.Column('details_fetched_at', sa.DateTime(), nullable=True),
+            sa.Column('shuffle_key', sa.Integer(), nullable=True),
+            sa.Column('search_text', sa.Text(), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.PrimaryKeyConstraint('id'),
+            sa.UniqueConstraint('url')
+        )
+        op.create_index('ix_job_listings_id', 'job_listings', ['id'])
+        op.create_index('ix_job_listings_source', 'job_listings', ['source'])
+        op.create_index('ix_job_listings_city', 'job_listings', ['city'])
+        op.create_index('ix_job_listings_category', 'job_listings', ['category'])
+        op.create_index('ix_job_listings_is_active', 'job_listings', ['is_active'])
+    else:
+        # Колонки, додані після першої версії моделі
+        for column in (
+            sa.Column('details_fetched_at', sa.DateTime(), nullable=True),
+            sa.Column('shuffle_key', sa.Integer(), nullable=True),
+            sa.Column('search_text', sa.Text(), nullable=True),
+        ):
+            if not _has_column('job_listings', column.name):
+                op.add_column('job_listings', column)
+
+    if not _has_index('job_listings', 'ix_job_listings_shuffle_key'):
+        op.create_index('ix_job_listings_shuffle_key', 'job_listings', ['shuffle_key'])
+
+    if not _has_table('user_subscriptions'):
+        op.create_table(
+            'user_subscriptions',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('city', sa.String(length=100), nullable=True),
+            sa.Column('category', sa.String(length=100), nullable=True),
+            sa.Column('salary_min', sa.DECIMAL(precision=10, scale=2), nullable=True),
+            sa.Column('keywords', sa.Text(), nullable=True),
+            sa.Column('notification_frequency', sa.String(length=20), nullable=True),
+            sa.Column('is_active', sa.Boolean(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_user_subscriptions_id', 'user_subscriptions', ['id'])
+        op.create_index('ix_user_subscriptions_user_id', 'user_subscriptions', ['user_id'])
+
+    if not _has_table('user_favorites'):
+        op.create_table(
+            'user_favorites',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('job_listing_id', sa.Integer(), nullable=False),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['job_listing_id'], ['job_listings.id']),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_user_favorites_id', 'user_favorites', ['id'])
+        op.create_index('ix_user_favorites_user_id', 'user_favorites', ['user_id'])
+        op.create_index('ix_user_favorites_job_listing_id', 'user_favorites', ['job_listing_id'])
+
+    if not _has_table('search_history'):
+        op.create_table(
+            'search_history',
+            sa.Column('id', sa.Integer(), nullable=False),
+            sa.Column('user_id', sa.Integer(), nullable=False),
+            sa.Column('query', sa.String(length=500), nullable=True),
+            sa.Column('filters', sa.JSON(), nullable=True),
+            sa.Column('results_count', sa.Integer(), nullable=True),
+            sa.Column('created_at', sa.DateTime(), nullable=True),
+            sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+            sa.PrimaryKeyConstraint('id')
+        )
+        op.create_index('ix_search_history_id', 'search_history', ['id'])
+        op.create_index('ix_search_history_user_id', 'search_history', ['user_id'])
+        op.create_index('ix_search_history_created_at', 'search_history', ['created_at'])
+
+    # Повнотекстовий індекс (див. search/fts.py)
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            "ALTER TABLE job_listings ADD COLUMN IF NOT EXISTS search_vector tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('simple', coalesce(search_text, ''))) STORED"
+        )
+        op.execute(
+            "CREATE INDEX IF NOT EXISTS ix_job_listings_search_vector "
+            "ON job_listings USING GIN (search_vector)"
+        )
+    elif dialect == 'sqlite':
+        try:
+            op.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS job_listings_fts "
+                "USING fts5(search_text, tokenize = 'unicode61 remove_diacritics 2')"
+            )
+        except Exception:
+            # SQLite без FTS5 - пошук працює через ILIKE
+            pass
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX IF EXISTS ix_job_listings_search_vector")
+        op.execute("ALTER TABLE job_listings DROP COLUMN IF EXISTS search_vector")
+    elif dialect == 'sqlite':
+        op.execute("DROP TABLE IF EXISTS job_listings_fts")
+
+    op.drop_table('search_history')
+    op.drop_table('user_favorites')
+    op.drop_table('user_subscriptions')
+    op.drop_table('job_listings')
+    op.drop_table('users')
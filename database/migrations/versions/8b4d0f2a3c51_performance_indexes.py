@@ -0,0 +1,67 @@
+"""Performance indexes
+
+Часткові індекси (WHERE is_active) для гарячих запитів пошуку та унікальний
+індекс (user_id, job_listing_id) для улюблених. Окремий індекс is_active
+прибирається. Перевірка планів запитів:
+python check_query_plans.py
+
+Revision ID: 8b4d0f2a3c51
+Revises: 7a3c9e1f2b40
+Create Date: 2026-10-19 09:40:02.532871
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b4d0f2a3c51'
+down_revision = '7a3c9e1f2b40'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        active = sa.text('is_active = true')
+        # NULLS LAST відповідає порядку "найновіші" в search/query.py
+        recent = [sa.text('published_date DESC NULLS LAST'), sa.text('id DESC')]
+        where = {'postgresql_where': active}
+    else:
+        active = sa.text('is_active = 1')
+        recent = [sa.text('published_date DESC'), sa.text('id DESC')]
+        where = {'sqlite_where': active}
+
+    op.create_index('ix_job_listings_active_recent', 'job_listings', recent, **where)
+    op.create_index(
+        'ix_job_listings_active_city_recent', 'job_listings', [sa.text('city')] + recent, **where
+    )
+    op.create_index(
+        'ix_job_listings_active_filters', 'job_listings',
+        ['city', 'category', 'employment_type'], **where
+    )
+    op.create_index(
+        'ix_job_listings_active_shuffle', 'job_listings', ['shuffle_key', 'id'], **where
+    )
+    # Індекс за булевою колонкою малоселективний, але планувальник обирає його
+    # замість часткових індексів і сортує результат у тимчасовому B-tree
+    op.drop_index('ix_job_listings_is_active', table_name='job_listings')
+
+    # Прибираємо дублікати улюблених перед створенням унікального індексу
+    op.execute(
+        "DELETE FROM user_favorites WHERE id NOT IN ("
+        "SELECT MIN(id) FROM user_favorites GROUP BY user_id, job_listing_id)"
+    )
+    op.create_index(
+        'uq_user_favorites_user_job', 'user_favorites', ['user_id', 'job_listing_id'], unique=True
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_user_favorites_user_job', table_name='user_favorites')
+    op.create_index('ix_job_listings_is_active', 'job_listings', ['is_active'])
+    op.drop_index('ix_job_listings_active_shuffle', table_name='job_listings')
+    op.drop_index('ix_job_listings_active_filters', table_name='job_listings')
+    op.drop_index('ix_job_listings_active_city_recent', table_name='job_listings')
+    op.drop_index('ix_job_listings_active_recent', table_name='job_listings')
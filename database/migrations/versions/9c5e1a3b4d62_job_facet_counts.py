@@ -0,0 +1,42 @@
+"""Job facet counts
+
+Матеріалізовані лічильники активних вакансій за (місто, категорія, тип
+зайнятості) для клавіатур фільтрів. Далі оновлюються ingest-ом
+(search/facets.py).
+
+Revision ID: 9c5e1a3b4d62
+Revises: 8b4d0f2a3c51
+Create Date: 2026-10-19 13:05:47.204518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c5e1a3b4d62'
+down_revision = '8b4d0f2a3c51'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'job_facet_counts',
+        sa.Column('city', sa.String(length=100), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('employment_type', sa.String(length=50), nullable=False),
+        sa.Column('job_count', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('city', 'category', 'employment_type')
+    )
+    active = 'true' if op.get_bind().dialect.name == 'postgresql' else '1'
+    op.execute(
+        "INSERT INTO job_facet_counts (city, category, employment_type, job_count) "
+        "SELECT coalesce(city, ''), coalesce(category, ''), coalesce(employment_type, ''), count(*) "
+        f"FROM job_listings WHERE is_active = {active} "
+        "GROUP BY coalesce(city, ''), coalesce(category, ''), coalesce(employment_type, '')"
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_facet_counts')
@@ -0,0 +1,30 @@
+"""Job listing city id
+
+Канонічне місто вакансії з довідника search/data/pl_cities.csv для фільтра
+за радіусом. Наявні вакансії геокодує init_db (search.geo.backfill_city_ids).
+
+Revision ID: a1d6f3b5c724
+Revises: 9c5e1a3b4d62
+Create Date: 2026-10-19 14:22:10.871350
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a1d6f3b5c724'
+down_revision = '9c5e1a3b4d62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('job_listings', sa.Column('city_id', sa.Integer(), nullable=True))
+    op.create_index('ix_job_listings_city_id', 'job_listings', ['city_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_job_listings_city_id', table_name='job_listings')
+    with op.batch_alter_table('job_listings') as batch_op:
+        batch_op.drop_column('city_id')
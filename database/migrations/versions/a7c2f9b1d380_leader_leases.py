@@ -0,0 +1,36 @@
+"""Leader leases
+
+Рядок оренди ролі лідера: лише інстанс, що тримає неминулу оренду,
+запускає планувальник скрапінгу (scraper/leader.py).
+
+Revision ID: a7c2f9b1d380
+Revises: f6c1e8a0b279
+Create Date: 2026-10-19 21:02:37.418206
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a7c2f9b1d380'
+down_revision = 'f6c1e8a0b279'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'leader_leases',
+        sa.Column('name', sa.String(length=50), nullable=False),
+        sa.Column('holder', sa.String(length=255), nullable=True),
+        sa.Column('expires_at', sa.DateTime(), nullable=True),
+        sa.Column('acquired_at', sa.DateTime(), nullable=True),
+        sa.Column('data_version', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('scrape_requested_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('leader_leases')
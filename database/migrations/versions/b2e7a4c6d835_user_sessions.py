@@ -0,0 +1,35 @@
+"""User sessions
+
+Стан пошуку користувачів (фільтри, результати, курсор), що переживає
+перезапуск бота і спільний для реплік. Пише bot/utils/session_store.py.
+
+Revision ID: b2e7a4c6d835
+Revises: a1d6f3b5c724
+Create Date: 2026-10-19 15:41:03.552917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b2e7a4c6d835'
+down_revision = 'a1d6f3b5c724'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'user_sessions',
+        sa.Column('user_id', sa.BigInteger(), nullable=False),
+        sa.Column('state', sa.Text(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id')
+    )
+    op.create_index('ix_user_sessions_updated_at', 'user_sessions', ['updated_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_user_sessions_updated_at', table_name='user_sessions')
+    op.drop_table('user_sessions')
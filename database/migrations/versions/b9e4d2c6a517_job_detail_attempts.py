@@ -0,0 +1,31 @@
+"""Job detail attempts
+
+Лічильник невдалих спроб завантажити детальну сторінку та час наступної
+спроби (scraper/enrichment.py): без них вакансія з невдалою спробою
+позначалась дозавантаженою і більше не оброблялась.
+
+Revision ID: b9e4d2c6a517
+Revises: a7c2f9b1d380
+Create Date: 2026-10-19 23:41:05.263914
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b9e4d2c6a517'
+down_revision = 'a7c2f9b1d380'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('job_listings', sa.Column('details_attempts', sa.Integer(), nullable=False, server_default='0'))
+    op.add_column('job_listings', sa.Column('details_retry_at', sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('job_listings') as batch_op:
+        batch_op.drop_column('details_retry_at')
+        batch_op.drop_column('details_attempts')
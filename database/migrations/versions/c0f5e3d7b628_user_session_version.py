@@ -0,0 +1,28 @@
+"""User session version
+
+Версія збереженого стану для умовного запису (compare-and-set) з кількох
+реплік (bot/utils/session_store.py). Наявні стани отримують версію 1.
+
+Revision ID: c0f5e3d7b628
+Revises: b9e4d2c6a517
+Create Date: 2026-10-20 00:12:47.590318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c0f5e3d7b628'
+down_revision = 'b9e4d2c6a517'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column('user_sessions', sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('user_sessions') as batch_op:
+        batch_op.drop_column('version')
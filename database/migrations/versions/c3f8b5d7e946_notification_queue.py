@@ -0,0 +1,40 @@
+"""Notification queue
+
+Збіги нових вакансій з підписками, що чекають на відправку. Пише й
+розбирає notifications/delivery.py.
+
+Revision ID: c3f8b5d7e946
+Revises: b2e7a4c6d835
+Create Date: 2026-10-19 17:12:44.081236
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c3f8b5d7e946'
+down_revision = 'b2e7a4c6d835'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'notification_queue',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('job_listing_id', sa.Integer(), nullable=False),
+        sa.Column('subscription_id', sa.Integer(), nullable=True),
+        sa.Column('attempts', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['job_listing_id'], ['job_listings.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_notification_queue_user_id', 'notification_queue', ['user_id'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_notification_queue_user_id', table_name='notification_queue')
+    op.drop_table('notification_queue')
@@ -0,0 +1,42 @@
+"""Subscription digest items
+
+Збіги з щоденними та щотижневими підписками, що накопичуються до
+відправки добірки (notifications/digest.py).
+
+Revision ID: d4a9c6e8f057
+Revises: c3f8b5d7e946
+Create Date: 2026-10-19 18:40:27.519304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a9c6e8f057'
+down_revision = 'c3f8b5d7e946'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'subscription_digest_items',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('job_listing_id', sa.Integer(), nullable=False),
+        sa.Column('subscription_id', sa.Integer(), nullable=True),
+        sa.Column('frequency', sa.String(length=20), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.ForeignKeyConstraint(['job_listing_id'], ['job_listings.id']),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(
+        'ix_subscription_digest_items_frequency_user', 'subscription_digest_items', ['frequency', 'user_id']
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('ix_subscription_digest_items_frequency_user', table_name='subscription_digest_items')
+    op.drop_table('subscription_digest_items')
@@ -0,0 +1,36 @@
+"""Sent notifications
+
+Журнал відправлених сповіщень (користувач, вакансія), щоб одна вакансія
+не надсилалась користувачу повторно. Первинний ключ - сама пара, тому
+запис пачкою йде через insert-or-ignore.
+
+Revision ID: e5b0d7f9a168
+Revises: d4a9c6e8f057
+Create Date: 2026-10-19 19:26:51.730482
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5b0d7f9a168'
+down_revision = 'd4a9c6e8f057'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'sent_notifications',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('job_listing_id', sa.Integer(), nullable=False),
+        sa.Column('sent_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'job_listing_id')
+    )
+    op.create_index('ix_sent_notifications_sent_at', 'sent_notifications', ['sent_at'])
+
+
+def downgrade() -> None:
+    op.drop_index('ix_sent_notifications_sent_at', table_name='sent_notifications')
+    op.drop_table('sent_notifications')
@@ -0,0 +1,35 @@
+"""Job stats
+
+Знімок статистики ринку для /stats (search/stats.py). Таблиця
+заповнюється при старті (init_db), далі лічильники коригує ingest.
+
+Revision ID: f6c1e8a0b279
+Revises: e5b0d7f9a168
+Create Date: 2026-10-19 20:08:15.264913
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6c1e8a0b279'
+down_revision = 'e5b0d7f9a168'
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        'job_stats',
+        sa.Column('dimension', sa.String(length=20), nullable=False),
+        sa.Column('key', sa.String(length=255), nullable=False, server_default=''),
+        sa.Column('item_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.Column('salary_sum', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('salary_count', sa.Integer(), nullable=False, server_default='0'),
+        sa.PrimaryKeyConstraint('dimension', 'key')
+    )
+
+
+def downgrade() -> None:
+    op.drop_table('job_stats')
@@ -1,7 +1,8 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, Boolean, ForeignKey, DECIMAL, JSON
+from sqlalchemy import Column, Integer, BigInteger, String, Text, DateTime, Boolean, Float, ForeignKey, DECIMAL, JSON, Index
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import relationship
+from sqlalchemy.orm import relationship, deferred
 from datetime import datetime
+import random
 
 Base = declarative_base()
 
@@ -37,6 +38,7 @@ class JobListing(Base):
     company = Column(String(255), nullable=True)
     location = Column(String(255), nullable=True)
     city = Column(String(100), nullable=True, index=True)
+    city_id = Column(Integer, nullable=True, index=True)  # id з довідника міст (search/geo.py), 0 - невідоме
     salary_min = Column(DECIMAL(10, 2), nullable=True)
     salary_max = Column(DECIMAL(10, 2), nullable=True)
     salary_currency = Column(String(10), default="PLN")
@@ -45,12 +47,57 @@ class JobListing(Base):
     url = Column(String(1000), unique=True, nullable=False)
     published_date = Column(DateTime, nullable=True)
     scraped_at = Column(DateTime, default=datetime.utcnow)
-    is_active = Column(Boolean, default=True, index=True)
+    details_fetched_at = Column(DateTime, nullable=True)  # Коли завантажено детальну сторінку
+    details_attempts = Column(Integer, default=0, server_default="0", nullable=False)  # Невдалі спроби завантаження
+    details_retry_at = Column(DateTime, nullable=True)  # Не раніше якого часу повторювати спробу
+    shuffle_key = Column(Integer, default=lambda: random.randint(0, 2 ** 31 - 1), index=True)  # Для випадкової вибірки
+    search_text = deferred(Column(Text, nullable=True))  # Нормалізований текст для повнотекстового індексу
+    # Окремий індекс не потрібен: активні вакансії покриті частковими індексами нижче
+    is_active = Column(Boolean, default=True)
     
     # Зв'язки
     favorites = relationship("UserFavorite", back_populates="job_listing", cascade="all, delete-orphan")
 
 
+# Часткові індекси для гарячих запитів пошуку (лише активні вакансії).
+# Порядок "найновіші" - published_date DESC NULLS LAST; SQLite не підтримує
+# NULLS LAST в індексах, але там NULL і так йдуть останніми при DESC.
+_active_job = JobListing.is_active == True
+
+Index(
+    "ix_job_listings_active_recent",
+    JobListing.published_date.desc().nullslast(), JobListing.id.desc(),
+    postgresql_where=_active_job
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_job_listings_active_recent",
+    JobListing.published_date.desc(), JobListing.id.desc(),
+    sqlite_where=_active_job
+).ddl_if(dialect="sqlite")
+
+Index(
+    "ix_job_listings_active_city_recent",
+    JobListing.city, JobListing.published_date.desc().nullslast(), JobListing.id.desc(),
+    postgresql_where=_active_job
+).ddl_if(dialect="postgresql")
+Index(
+    "ix_job_listings_active_city_recent",
+    JobListing.city, JobListing.published_date.desc(), JobListing.id.desc(),
+    sqlite_where=_active_job
+).ddl_if(dialect="sqlite")
+
+Index(
+    "ix_job_listings_active_filters",
+    JobListing.city, JobListing.category, JobListing.employment_type,
+    postgresql_where=_active_job, sqlite_where=_active_job
+)
+Index(
+    "ix_job_listings_active_shuffle",
+    JobListing.shuffle_key, JobListing.id,
+    postgresql_where=_active_job, sqlite_where=_active_job
+)
+
+
 class UserSubscription(Base):
     """Модель підписки користувача"""
     __tablename__ = "user_subscriptions"
@@ -81,6 +128,10 @@ class UserFavorite(Base):
     # Зв'язки
     user = relationship("User", back_populates="favorites")
     job_listing = relationship("JobListing", back_populates="favorites")
+    
+    __table_args__ = (
+        Index("uq_user_favorites_user_job", "user_id", "job_listing_id", unique=True),
+    )
 
 
 class SearchHistory(Base):
@@ -96,3 +147,84 @@ class SearchHistory(Base):
     
     # Зв'язки
     user = relationship("User", back_populates="search_history")
+
+
+class JobFacetCount(Base):
+    """Кількість активних вакансій для комбінації місто × категорія × тип зайнятості"""
+    __tablename__ = "job_facet_counts"
+    
+    # Порожній рядок замість NULL, щоб комбінація могла бути первинним ключем
+    city = Column(String(100), primary_key=True, default="")
+    category = Column(String(100), primary_key=True, default="")
+    employment_type = Column(String(50), primary_key=True, default="")
+    job_count = Column(Integer, nullable=False, default=0)
+
+
+class JobStat(Base):
+    """Лічильник статистики ринку: вимір (total, city, category, source, users) × значення"""
+    __tablename__ = "job_stats"
+    
+    dimension = Column(String(20), primary_key=True)
+    key = Column(String(255), primary_key=True, default="")
+    item_count = Column(Integer, nullable=False, default=0)
+    salary_sum = Column(Float, nullable=False, default=0)  # Сума середин вилок зарплат
+    salary_count = Column(Integer, nullable=False, default=0)
+
+
+class UserSession(Base):
+    """Збережений стан пошуку користувача (bot/utils/session_store.py)"""
+    __tablename__ = "user_sessions"
+    
+    user_id = Column(BigInteger, primary_key=True)  # Telegram ID
+    state = Column(Text, nullable=False)  # Закодований стан (JSON, id вакансій - упаковані)
+    version = Column(Integer, default=1, server_default="1", nullable=False)  # Для умовного запису з кількох реплік
+    updated_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class PendingNotification(Base):
+    """Сповіщення про нову вакансію, що чекає на відправку (notifications/delivery.py)"""
+    __tablename__ = "notification_queue"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False, index=True)
+    job_listing_id = Column(Integer, ForeignKey("job_listings.id"), nullable=False)
+    subscription_id = Column(Integer, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+
+class SubscriptionDigestItem(Base):
+    """Вакансія, що чекає на щоденну/щотижневу добірку (notifications/digest.py)"""
+    __tablename__ = "subscription_digest_items"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    job_listing_id = Column(Integer, ForeignKey("job_listings.id"), nullable=False)
+    subscription_id = Column(Integer, nullable=True)
+    frequency = Column(String(20), nullable=False)  # daily, weekly
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    __table_args__ = (
+        Index("ix_subscription_digest_items_frequency_user", "frequency", "user_id"),
+    )
+
+
+class SentNotification(Base):
+    """Відправлене сповіщення про вакансію (журнал проти повторів, notifications/ledger.py)"""
+    __tablename__ = "sent_notifications"
+    
+    user_id = Column(Integer, primary_key=True)
+    job_listing_id = Column(Integer, primary_key=True)
+    sent_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class LeaderLease(Base):
+    """Оренда ролі лідера між інстансами бота (scraper/leader.py)"""
+    __tablename__ = "leader_leases"
+    
+    name = Column(String(50), primary_key=True)
+    holder = Column(String(255), nullable=True)  # ідентифікатор інстансу-лідера
+    expires_at = Column(DateTime, nullable=True)
+    acquired_at = Column(DateTime, nullable=True)
+    data_version = Column(Integer, nullable=False, default=0)  # збільшується лідером після змін вакансій
+    scrape_requested_at = Column(DateTime, nullable=True)  # /update_jobs на іншому інстансі
@@ -0,0 +1,36 @@
+"""Спільне (опціональне) підключення до Redis"""
+import logging
+from config import settings
+
+try:
+    import redis
+except ImportError:  # Redis опціональний, без нього все працює в пам'яті процесу
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+# None - ще не підключались, False - Redis недоступний
+_client = None
+
+
+def get_redis():
+    """
+    Повертає клієнт Redis або None, якщо REDIS_URL не задано чи Redis недоступний
+
+    Підключення створюється один раз на процес (клієнт потокобезпечний).
+    """
+    global _client
+    if _client is None:
+        _client = False
+        if settings.REDIS_URL:
+            if redis is None:
+                logger.warning("REDIS_URL задано, але пакет redis не встановлено")
+            else:
+                try:
+                    client = redis.Redis.from_url(settings.REDIS_URL, socket_timeout=2)
+                    client.ping()
+                    _client = client
+                    logger.info("Підключено до Redis")
+                except Exception as e:
+                    logger.warning(f"Redis недоступний, використовується кеш у пам'яті: {e}")
+    return _client or None
@@ -8,10 +8,11 @@ from telegram.ext import (
     MessageHandler,
     CallbackQueryHandler,
     ContextTypes,
+    TypeHandler,
     filters
 )
 from config import settings
-from database.database import init_db
+from database.database import init_db, SessionLocal
 from bot.handlers import (
     start_handler,
     help_handler,
@@ -26,13 +27,25 @@ from bot.handlers import (
     stats_handler,
     update_jobs_handler
 )
-from bot.handlers.search import page_callback_handler
+from bot.handlers.search import page_callback_handler, suggestion_callback_handler
+from bot.middlewares import UserMiddleware
+from bot.utils.db_helpers import shutdown_db_executor
+from bot.utils.health import build_readiness_checks
+from bot.utils.rate_limiter import PriorityRateLimiter
+from bot.utils.session_store import get_session_store, preload_session
+from bot.utils.update_processor import ChatOrderedUpdateProcessor
+from monitoring.http_server import HttpServer
+from notifications.ledger import get_delivery_ledger
+from notifications.matcher import get_subscription_index
+from scraper.leader import LeaderElection
 from scraper.scheduler import ScrapingScheduler
+from search.cache import bump_search_generation
+from search.index import rebuild_search_index
+from search.lexicon import get_lexicon
+from search.suggest import rebuild_suggestion_index
 from loguru import logger
-import http.server
-import socketserver
-import threading
 import os
+import signal
 
 # Налаштування логування
 logging.basicConfig(
@@ -40,26 +53,6 @@ logging.basicConfig(
     level=logging.INFO
 )
 
-class HealthHandler(http.server.BaseHTTPRequestHandler):
-    def do_GET(self):
-        self.send_response(200)
-        self.send_header('Content-type', 'text/plain')
-        self.end_headers()
-        self.wfile.write(b"OK")
-    
-    def log_message(self, format, *args):
-        return # Вимикаємо логи для health check
-
-def run_health_server():
-    """Запускає простий HTTP-сервер для health check на Render"""
-    port = int(os.environ.get("PORT", 8000))
-    try:
-        httpd = http.server.HTTPServer(("0.0.0.0", port), HealthHandler)
-        logger.info(f"Health check server started on port {port}")
-        httpd.serve_forever()
-    except Exception as e:
-        logger.error(f"Failed to start health check server: {e}")
-
 # Вимикаємо стандартні логи loguru до налаштування у main
 logger.remove()
 
@@ -73,6 +66,11 @@ LOG_FORMAT = (
 def setup_handlers(application: Application):
     """Налаштовує обробники команд та повідомлень"""
     
+    # Реєстрація користувача (upsert, далі - з кешу) та завантаження його стану
+    # пошуку до обробників; у кожній групі спрацьовує лише один обробник
+    application.add_handler(TypeHandler(Update, UserMiddleware()), group=-2)
+    application.add_handler(TypeHandler(Update, preload_session), group=-1)
+    
     # Команди
     application.add_handler(CommandHandler("start", start_handler))
     application.add_handler(CommandHandler("help", help_handler))
@@ -85,13 +83,14 @@ def setup_handlers(application: Application):
     
     # Callback queries (кнопки) - спочатку специфічні паттерни
     application.add_handler(CallbackQueryHandler(page_callback_handler, pattern="^page_"))
+    application.add_handler(CallbackQueryHandler(suggestion_callback_handler, pattern="^suggest_"))
     application.add_handler(CallbackQueryHandler(start_handler, pattern="^main_menu$"))
     application.add_handler(CallbackQueryHandler(search_handler, pattern="^search$"))
     application.add_handler(CallbackQueryHandler(stats_handler, pattern="^stats$"))
     
     # Фільтри
     application.add_handler(CallbackQueryHandler(filters_handler, pattern="^filters$"))
-    application.add_handler(CallbackQueryHandler(filter_callback_handler, pattern="^(filter_|city_|category_|employment_)"))
+    application.add_handler(CallbackQueryHandler(filter_callback_handler, pattern="^(filter_|city_|radius_|category_|employment_)"))
     
     # Улюблені
     application.add_handler(CallbackQueryHandler(favorites_handler, pattern="^favorites$"))
@@ -107,24 +106,156 @@ def setup_handlers(application: Application):
     )
 
 
+def build_search_index():
+    """Будує пошуковий індекс, підказки з історії пошуку та словник перекладів"""
+    db = SessionLocal()
+    try:
+        rebuild_search_index(db)
+        rebuild_suggestion_index(db)
+    finally:
+        db.close()
+    # Словник перекладів компілюється заздалегідь, а не на першому запиті
+    get_lexicon()
+
+
+async def start_scheduler(application: Application):
+    """Інстанс став лідером: запускає скрапінг і розсилки"""
+    # Поки інстанс не лідирував, сповіщення надсилав і підписки оновлював інший
+    get_delivery_ledger().reset()
+    get_subscription_index().reset()
+    
+    leader = application.bot_data['leader']
+    scheduler = ScrapingScheduler(
+        application.bot, on_scraped=leader.publish_data_version, is_leader=leader.holds_lease
+    )
+    scheduler.start()
+    application.bot_data['scheduler'] = scheduler
+
+
+async def stop_scheduler(application: Application):
+    """Інстанс більше не лідер: зупиняє планувальник"""
+    scheduler = application.bot_data.pop('scheduler', None)
+    if scheduler is not None:
+        scheduler.stop()
+
+
+async def run_requested_scrape(application: Application):
+    """/update_jobs, надісланий на іншу репліку"""
+    scheduler = application.bot_data.get('scheduler')
+    if scheduler is not None:
+        scheduler.run_scrape()
+
+
+async def refresh_search_index():
+    """Вакансії змінив інший процес: перебудовує індекси (і підказки) та скидає кеш результатів"""
+    await asyncio.to_thread(build_search_index)
+    bump_search_generation()
+
+
 async def post_init(application: Application):
     """Виконується після ініціалізації бота"""
     logger.info("Бот ініціалізовано")
     
-    # Запускаємо планувальник скрапінгу
-    if settings.SCRAPING_ENABLED:
-        scheduler = ScrapingScheduler()
-        scheduler.start()
-        application.bot_data['scheduler'] = scheduler
+    # Будуємо in-memory пошуковий індекс (у потоці, щоб не блокувати event loop)
+    try:
+        await asyncio.to_thread(build_search_index)
+    except Exception as e:
+        logger.error(f"Не вдалося побудувати пошуковий індекс: {e}")
+    
+    # Відкладений запис станів пошуку користувачів
+    get_session_store().start()
+    
+    # Планувальник скрапінгу запускає лише лідер серед реплік
+    leader = LeaderElection(
+        candidate=settings.SCRAPING_ENABLED,
+        on_elected=lambda: start_scheduler(application),
+        on_deposed=lambda: stop_scheduler(application),
+        on_scrape_requested=lambda: run_requested_scrape(application),
+        on_data_changed=refresh_search_index,
+    )
+    application.bot_data['leader'] = leader
+    leader.start()
+    
+    # /readyz: запуск завершено (далі готовність визначають інші перевірки)
+    application.bot_data['started'] = True
 
 
 async def post_shutdown(application: Application):
     """Виконується при зупинці бота"""
     logger.info("Зупинка бота...")
     
-    # Зупиняємо планувальник
-    if 'scheduler' in application.bot_data:
-        application.bot_data['scheduler'].stop()
+    if 'http_server' in application.bot_data:
+        await application.bot_data['http_server'].stop()
+    
+    # Зупиняємо планувальник і звільняємо роль лідера для інших реплік
+    if 'leader' in application.bot_data:
+        await application.bot_data['leader'].stop()
+    
+    # Записуємо стани користувачів і дочікуємось запитів до БД, що ще виконуються
+    get_session_store().stop()
+    shutdown_db_executor()
+
+
+async def run_bot(application: Application):
+    """
+    Запуск бота на одному event loop з HTTP-сервером проб
+
+    Порт відкривається першим, ще до міграцій і бекфілів init_db, щоб
+    платформа (Render) бачила його одразу; /readyz віддає 503, доки запуск
+    не завершиться. У режимі webhook той самий сервер приймає оновлення від
+    Telegram, тому в розгортанні один порт і одна проба.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+    
+    http_server = HttpServer(
+        port=int(os.environ.get("PORT", 8000)),
+        checks=build_readiness_checks(application),
+        webhook_path=settings.WEBHOOK_SECRET_TOKEN if settings.USE_WEBHOOKS else None,
+        on_webhook=lambda data: application.update_queue.put(Update.de_json(data, application.bot)),
+    )
+    application.bot_data['started'] = False
+    await http_server.start()
+    application.bot_data['http_server'] = http_server
+    
+    try:
+        # Ініціалізуємо БД (міграції та бекфіли можуть бути довгими - поза event loop)
+        try:
+            logger.info("Ініціалізація бази даних...")
+            await asyncio.to_thread(init_db)
+        except Exception as e:
+            logger.error(f"Критична помилка при ініціалізації БД: {e}")
+            # Не зупиняємось, можливо БД підніметься пізніше
+        
+        await application.initialize()
+        try:
+            await post_init(application)
+            if settings.USE_WEBHOOKS:
+                await application.bot.set_webhook(
+                    url=f"{settings.WEBHOOK_URL.rstrip('/')}/{settings.WEBHOOK_SECRET_TOKEN}",
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True
+                )
+            else:
+                await application.updater.start_polling(
+                    allowed_updates=Update.ALL_TYPES,
+                    drop_pending_updates=True
+                )
+            await application.start()
+            await stop.wait()
+            # Спочатку перестаємо приймати оновлення, потім дообробляємо прийняті
+            await http_server.stop()
+            if application.updater.running:
+                await application.updater.stop()
+            await application.stop()
+        finally:
+            await application.shutdown()
+            await post_shutdown(application)
+    finally:
+        # Порт звільняється й тоді, коли запуск не вдався (повторна спроба в main)
+        await http_server.stop()
 
 
 def main():
@@ -132,11 +263,7 @@ def main():
     # 1. Початкове логування у консоль
     logging.info("Початок запуску бота...")
 
-    # 2. Відкриваємо порт для Render (Health Check) якнайшвидше (тільки для Polling)
-    if not settings.USE_WEBHOOKS:
-        threading.Thread(target=run_health_server, daemon=True).start()
-    else:
-        logger.info("Webhook mode enabled: health check server will be handled by webhook port")
+    # 2. Порт для Render (проби, метрики, webhook) відкривається першим у run_bot
 
     # 3. Створюємо папки та налаштовуємо логування
     os.makedirs("logs", exist_ok=True)
@@ -163,20 +290,17 @@ def main():
         logger.error("TELEGRAM_BOT_TOKEN не встановлено! Бот не може запуститись.")
         return
     
-    # 5. Ініціалізуємо БД
-    try:
-        logger.info("Ініціалізація бази даних...")
-        init_db()
-    except Exception as e:
-        logger.error(f"Критична помилка при ініціалізації БД: {e}")
-        # Не зупиняємось, можливо БД підніметься пізніше
-    
-    # 6. Створюємо додаток
+    # 5. Створюємо додаток (БД ініціалізується в run_bot, коли порт уже відкрито)
     application = (
         Application.builder()
         .token(settings.TELEGRAM_BOT_TOKEN)
         .post_init(post_init)
         .post_shutdown(post_shutdown)
+        # Запити до БД виконуються поза event loop, тому оновлення різних
+        # чатів обробляються паралельно, а одного чату - по черзі
+        .concurrent_updates(ChatOrderedUpdateProcessor())
+        # Усі запити до Telegram проходять через чергу з лімітами та пріоритетами
+        .rate_limiter(PriorityRateLimiter())
         .build()
     )
     
@@ -190,25 +314,12 @@ def main():
             return
             
         logger.info(f"Запуск у режимі Webhook: {settings.WEBHOOK_URL}")
-        port = int(os.environ.get("PORT", 8000))
-        
-        application.run_webhook(
-            listen="0.0.0.0",
-            port=port,
-            url_path=settings.WEBHOOK_SECRET_TOKEN,
-            webhook_url=f"{settings.WEBHOOK_URL.rstrip('/')}/{settings.WEBHOOK_SECRET_TOKEN}",
-            allowed_updates=Update.ALL_TYPES,
-            drop_pending_updates=True
-        )
+        asyncio.run(run_bot(application))
     else:
         logger.info("Запуск у режимі Polling...")
         while True:
             try:
-                application.run_polling(
-                    allowed_updates=Update.ALL_TYPES,
-                    drop_pending_updates=True,
-                    close_loop=False # Важливо для рестарту
-                )
+                asyncio.run(run_bot(application))
             except Exception as e:
                 logger.error(f"⚠️ Критична помилка у циклі polling: {e}")
                 logger.info("Спроба перезапуску через 5 секунд...")
@@ -0,0 +1,4 @@
+"""Метрики процесу бота"""
+from .metrics import Counter, Gauge, registry
+
+__all__ = ['Counter', 'Gauge', 'registry']
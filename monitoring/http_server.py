@@ -0,0 +1,159 @@
+"""HTTP-сервер проб, метрик і webhook на event loop бота
+
+Один порт (PORT) обслуговує:
+    /healthz  - liveness: відповідь приходить, отже event loop живий
+    /readyz   - readiness: перевірки (БД, планувальник, затримка оновлень);
+                503, якщо хоч одна не пройшла
+    /metrics  - метрики процесу у форматі Prometheus (monitoring.metrics)
+    POST /<шлях webhook> - оновлення від Telegram (у режимі webhook)
+
+Сервер мінімальний (asyncio.start_server, одне звернення на з'єднання):
+запитів мало і вони короткі, а окремий веб-фреймворк не потрібен.
+"""
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+import asyncio
+import json
+import logging
+from monitoring.metrics import registry
+
+logger = logging.getLogger(__name__)
+
+# Перевірка готовності: None - гаразд, інакше опис проблеми
+ReadinessCheck = Callable[[], Awaitable[Optional[str]]]
+Response = Tuple[int, str, bytes]
+
+REQUEST_TIMEOUT_SECONDS = 10
+CHECK_TIMEOUT_SECONDS = 5
+MAX_BODY_BYTES = 1024 * 1024
+
+STATUS_TEXT = {
+    200: "OK",
+    400: "Bad Request",
+    404: "Not Found",
+    405: "Method Not Allowed",
+    413: "Payload Too Large",
+    500: "Internal Server Error",
+    503: "Service Unavailable",
+}
+
+_requests = registry.counter("http_requests_total", "Запити до HTTP-сервера проб, метрик і webhook")
+
+
+def _text(status: int, text: str) -> Response:
+    return status, "text/plain; charset=utf-8", text.encode()
+
+
+class HttpServer:
+    """Сервер /healthz, /readyz, /metrics та (опціонально) webhook"""
+
+    def __init__(
+        self,
+        port: int,
+        checks: Dict[str, ReadinessCheck] = None,
+        webhook_path: str = None,
+        on_webhook: Callable[[dict], Awaitable[None]] = None,
+        host: str = "0.0.0.0",
+    ):
+        self.host = host
+        self.port = port
+        self.checks = checks or {}
+        self.webhook_path = "/" + webhook_path.strip("/") if webhook_path else None
+        self.on_webhook = on_webhook
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        logger.info(f"HTTP-сервер проб і метрик слухає порт {self.port}")
+
+    async def stop(self):
+        """Перестає приймати з'єднання (повторний виклик нічого не робить)"""
+        if self._server is None:
+            return
+        self._server.close()
+        await self._server.wait_closed()
+        self._server = None
+
+    async def readiness(self) -> Tuple[bool, Dict[str, str]]:
+        """Виконує перевірки одночасно: (все гаразд, результат кожної)"""
+        names = list(self.checks)
+        results = await asyncio.gather(
+            *(asyncio.wait_for(self.checks[name](), CHECK_TIMEOUT_SECONDS) for name in names),
+            return_exceptions=True
+        )
+        report = {}
+        for name, result in zip(names, results):
+            if isinstance(result, asyncio.TimeoutError):
+                report[name] = f"немає відповіді за {CHECK_TIMEOUT_SECONDS} с"
+            elif isinstance(result, Exception):
+                report[name] = f"помилка: {result}"
+            else:
+                report[name] = result or "ok"
+        ready = all(result is None for result in results)
+        return ready, report
+
+    async def _route(self, method: str, path: str, body: bytes) -> Response:
+        if self.webhook_path and path == self.webhook_path:
+            if method != "POST":
+                return _text(405, "method not allowed")
+            try:
+                data = json.loads(body)
+            except ValueError:
+                return _text(400, "invalid json")
+            await self.on_webhook(data)
+            return _text(200, "ok")
+
+        if method not in ("GET", "HEAD"):
+            return _text(405, "method not allowed")
+        if path in ("/", "/healthz"):
+            return _text(200, "ok")
+        if path == "/readyz":
+            ready, report = await self.readiness()
+            payload = json.dumps({"ready": ready, "checks": report}, ensure_ascii=False)
+            return 200 if ready else 503, "application/json; charset=utf-8", payload.encode()
+        if path == "/metrics":
+            return 200, "text/plain; version=0.0.4; charset=utf-8", registry.render().encode()
+        return _text(404, "not found")
+
+    async def _read_request(self, reader: asyncio.StreamReader) -> Tuple[str, str, bytes]:
+        request_line = (await reader.readline()).decode("latin-1")
+        method, target, _ = request_line.split(" ", 2)
+        headers = {}
+        while True:
+            line = await reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length") or 0)
+        if length > MAX_BODY_BYTES:
+            raise OverflowError
+        body = await reader.readexactly(length) if length else b""
+        return method.upper(), target.split("?", 1)[0], body
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        _requests.inc()
+        method = "GET"
+        try:
+            try:
+                method, path, body = await asyncio.wait_for(self._read_request(reader), REQUEST_TIMEOUT_SECONDS)
+                status, content_type, payload = await self._route(method, path, body)
+            except OverflowError:
+                status, content_type, payload = _text(413, "payload too large")
+            except (ValueError, asyncio.IncompleteReadError, asyncio.TimeoutError):
+                status, content_type, payload = _text(400, "bad request")
+            except Exception as e:
+                logger.error(f"Помилка обробки HTTP-запиту: {e}")
+                status, content_type, payload = _text(500, "internal error")
+
+            head = (
+                f"HTTP/1.1 {status} {STATUS_TEXT.get(status, '')}\r\n"
+                f"Content-Type: {content_type}\r\n"
+                f"Content-Length: {len(payload)}\r\n"
+                "Connection: close\r\n\r\n"
+            )
+            writer.write(head.encode("latin-1") + (b"" if method == "HEAD" else payload))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
@@ -0,0 +1,162 @@
+"""
+Простий реєстр метрик процесу
+
+Лічильники, gauge-и та гістограми живуть у пам'яті процесу і віддаються у текстовому
+форматі Prometheus (registry.render()). Зовнішня бібліотека не потрібна:
+метрик небагато, а оновлення - це додавання до числа під локом.
+"""
+from typing import Callable, Dict, List, Optional, Sequence
+import bisect
+import threading
+
+# Межі кошиків гістограм за замовчуванням (секунди)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """Монотонний лічильник"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: int = 1):
+        with self._lock:
+            self._value += amount
+
+    @property
+    def value(self):
+        return self._value
+
+
+class Gauge:
+    """Поточне значення (встановлюється явно або обчислюється функцією)"""
+
+    kind = "gauge"
+
+    def __init__(self, name: str, description: str, func: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.description = description
+        self._value = 0
+        self._func = func
+
+    def set(self, value: float):
+        self._value = value
+
+    @property
+    def value(self):
+        return self._func() if self._func else self._value
+
+
+class Histogram:
+    """Розподіл значень (тривалостей) за кошиками"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets))
+        self._counts: List[int] = [0] * (len(self.buckets) + 1)  # останній - понад найбільшу межу
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        with self._lock:
+            self._counts[bisect.bisect_left(self.buckets, value)] += 1
+            self._sum += value
+            self._count += 1
+
+    @property
+    def value(self):
+        return self._count
+
+    @property
+    def sum(self) -> float:
+        return self._sum
+
+    def cumulative(self) -> List[int]:
+        """Кількість значень <= кожної межі (та загальна в кінці)"""
+        with self._lock:
+            counts = list(self._counts)
+        total = 0
+        result = []
+        for count in counts:
+            total += count
+            result.append(total)
+        return result
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Оцінка квантиля (лінійна інтерполяція всередині кошика); None - значень ще немає"""
+        cumulative = self.cumulative()
+        total = cumulative[-1]
+        if not total:
+            return None
+        rank = q * total
+        lower_count = 0
+        for i, count in enumerate(cumulative):
+            if count >= rank:
+                if i == len(self.buckets):
+                    # Понад найбільшу межу - точніше оцінити неможливо
+                    return self.buckets[-1] if self.buckets else None
+                lower = self.buckets[i - 1] if i else 0.0
+                in_bucket = count - lower_count
+                fraction = (rank - lower_count) / in_bucket if in_bucket else 1.0
+                return lower + (self.buckets[i] - lower) * fraction
+            lower_count = count
+        return None
+
+
+class MetricsRegistry:
+    """Реєстр метрик за назвою"""
+
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, *args):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, *args)
+                self._metrics[name] = metric
+            return metric
+
+    def counter(self, name: str, description: str) -> Counter:
+        """Повертає лічильник (створює при першому зверненні)"""
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str, func: Callable[[], float] = None) -> Gauge:
+        """Повертає gauge (створює при першому зверненні)"""
+        return self._get_or_create(Gauge, name, description, func)
+
+    def histogram(self, name: str, description: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        """Повертає гістограму (створює при першому зверненні)"""
+        return self._get_or_create(Histogram, name, description, buckets)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Поточні значення всіх метрик (для гістограм - кількість значень)"""
+        return {name: metric.value for name, metric in sorted(self._metrics.items())}
+
+    def render(self) -> str:
+        """Метрики у текстовому форматі Prometheus"""
+        lines = []
+        for name, metric in sorted(self._metrics.items()):
+            lines.append(f"# HELP {name} {metric.description}")
+            lines.append(f"# TYPE {name} {metric.kind}")
+            if metric.kind == "histogram":
+                for bound, count in zip(metric.buckets + ("+Inf",), metric.cumulative()):
+                    lines.append(f'{name}_bucket{{le="{bound}"}} {count}')
+                lines.append(f"{name}_sum {metric.sum}")
+                lines.append(f"{name}_count {metric.value}")
+            else:
+                lines.append(f"{name} {metric.value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,15 @@
+"""Сповіщення за підписками: зіставлення нових вакансій, відправка та добірки"""
+from .matcher import SubscriptionIndex, get_subscription_index, match_new_jobs
+from .delivery import NotificationSender, append_digest_items, queue_matches, queue_new_job_notifications
+from .digest import DigestSender
+
+__all__ = [
+    'SubscriptionIndex',
+    'get_subscription_index',
+    'match_new_jobs',
+    'NotificationSender',
+    'DigestSender',
+    'append_digest_items',
+    'queue_matches',
+    'queue_new_job_notifications'
+]
@@ -0,0 +1,240 @@
+"""Черга сповіщень про нові вакансії та їх відправка
+
+Миттєві збіги з підписками записуються в таблицю notification_queue однією
+пачкою, а відправник розбирає її пачками по NOTIFY_BATCH_SIZE. Повідомлення
+йдуть через чергу запитів бота з пріоритетом сповіщень, тому не
+відбирають ліміт у відповідей користувачам. Щоденні та щотижневі збіги
+накопичуються в subscription_digest_items (добірки - notifications/digest.py).
+"""
+from typing import Callable, Dict, Iterable, List, NamedTuple, Optional
+from datetime import datetime
+import asyncio
+import logging
+from telegram.error import BadRequest, Forbidden, TelegramError
+from sqlalchemy.orm import Session
+from config import settings
+from database.models import JobListing, PendingNotification, SubscriptionDigestItem, User, UserSubscription
+from bot.utils.db_helpers import get_db_session
+from bot.utils.formatters import format_job_listing
+from bot.utils.rate_limiter import notification_priority
+from notifications.ledger import filter_unsent, get_delivery_ledger
+from notifications.matcher import SubscriptionMatch, get_subscription_index, match_new_jobs
+
+logger = logging.getLogger(__name__)
+
+# Частоти, для яких збіги накопичуються в добірки
+DIGEST_FREQUENCIES = ("daily", "weekly")
+
+# Результати відправки
+SENT = "sent"
+RETRY = "retry"
+DROP = "drop"  # вакансія вже неактивна або повідомлення не приймається
+BLOCKED = "blocked"  # користувач заблокував бота
+
+
+class QueuedNotification(NamedTuple):
+    """Сповіщення з черги, підготовлене до відправки"""
+    id: int
+    user_id: int
+    telegram_id: int
+    job: Optional[JobListing]
+
+
+def queue_matches(db: Session, matches: Iterable[SubscriptionMatch]) -> int:
+    """
+    Ставить у чергу миттєві сповіщення (одне на користувача і вакансію)
+
+    Returns:
+        Кількість доданих сповіщень
+    """
+    queued: Dict[tuple, dict] = {}
+    now = datetime.utcnow()
+    for match in matches:
+        if match.frequency != "instant":
+            continue
+        queued.setdefault((match.user_id, match.job_id), {
+            'user_id': match.user_id,
+            'job_listing_id': match.job_id,
+            'subscription_id': match.subscription_id,
+            'attempts': 0,
+            'created_at': now,
+        })
+    if queued:
+        db.bulk_insert_mappings(PendingNotification, list(queued.values()))
+        db.commit()
+    return len(queued)
+
+
+def append_digest_items(db: Session, matches: Iterable[SubscriptionMatch]) -> int:
+    """
+    Додає щоденні та щотижневі збіги до добірок (одна пачка вставки)
+
+    Returns:
+        Кількість доданих записів
+    """
+    items: Dict[tuple, dict] = {}
+    now = datetime.utcnow()
+    for match in matches:
+        if match.frequency not in DIGEST_FREQUENCIES:
+            continue
+        items.setdefault((match.user_id, match.job_id, match.frequency), {
+            'user_id': match.user_id,
+            'job_listing_id': match.job_id,
+            'subscription_id': match.subscription_id,
+            'frequency': match.frequency,
+            'created_at': now,
+        })
+    if items:
+        db.bulk_insert_mappings(SubscriptionDigestItem, list(items.values()))
+        db.commit()
+    return len(items)
+
+
+def queue_new_job_notifications(db: Session, job_ids: Iterable[int]) -> int:
+    """
+    Етап після скрапінгу: зіставляє нові вакансії з підписками
+
+    Миттєві збіги стають у чергу сповіщень, щоденні та щотижневі - у добірки.
+    """
+    # Вакансії, які користувач вже отримував, повторно не надсилаються
+    matches = filter_unsent(db, match_new_jobs(db, job_ids))
+    queued = queue_matches(db, matches)
+    collected = append_digest_items(db, matches)
+    if matches:
+        logger.info(
+            f"Збігів з підписками: {len(matches)}, у черзі сповіщень: {queued}, "
+            f"до добірок: {collected}"
+        )
+    return queued
+
+
+def deactivate_subscriptions(db: Session, user_ids: Iterable[int]):
+    """Вимикає підписки користувачів, що заблокували бота, і прибирає їх сповіщення"""
+    user_ids = list(user_ids)
+    subscription_ids = [row.id for row in db.query(UserSubscription.id).filter(
+        UserSubscription.user_id.in_(user_ids), UserSubscription.is_active == True
+    )]
+    if subscription_ids:
+        db.query(UserSubscription).filter(
+            UserSubscription.id.in_(subscription_ids)
+        ).update({UserSubscription.is_active: False}, synchronize_session=False)
+    for model in (PendingNotification, SubscriptionDigestItem):
+        db.query(model).filter(model.user_id.in_(user_ids)).delete(synchronize_session=False)
+    db.commit()
+    if subscription_ids:
+        get_subscription_index().refresh(db, subscription_ids)
+
+
+def load_pending(after_id: int, limit: int) -> List[QueuedNotification]:
+    """Наступна пачка сповіщень з черги (вакансії від'єднані від сесії)"""
+    with get_db_session() as db:
+        rows = db.query(PendingNotification, User.telegram_id, JobListing).join(
+            User, User.id == PendingNotification.user_id
+        ).outerjoin(
+            JobListing, (JobListing.id == PendingNotification.job_listing_id) & (JobListing.is_active == True)
+        ).filter(
+            PendingNotification.id > after_id
+        ).order_by(PendingNotification.id).limit(limit).all()
+        unsent = get_delivery_ledger().unsent(db, ((p.user_id, p.job_listing_id) for p, _, _ in rows))
+        batch = []
+        for pending, telegram_id, job in rows:
+            pair = (pending.user_id, pending.job_listing_id)
+            if pair not in unsent:
+                # Вже надіслано (іншим збігом або в попередній пачці) - лише прибрати з черги
+                job = None
+            unsent.discard(pair)
+            # Одна вакансія може йти кільком користувачам
+            if job is not None and job in db:
+                db.expunge(job)
+            batch.append(QueuedNotification(pending.id, pending.user_id, telegram_id, job))
+        return batch
+
+
+def settle_batch(batch: List[QueuedNotification], outcomes: List[str]):
+    """Прибирає оброблені сповіщення, рахує спроби, вимикає підписки заблокованих"""
+    done = [item.id for item, outcome in zip(batch, outcomes) if outcome != RETRY]
+    retry = [item.id for item, outcome in zip(batch, outcomes) if outcome == RETRY]
+    blocked = {item.user_id for item, outcome in zip(batch, outcomes) if outcome == BLOCKED}
+
+    with get_db_session() as db:
+        get_delivery_ledger().record(db, (
+            (item.user_id, item.job.id) for item, outcome in zip(batch, outcomes) if outcome == SENT
+        ))
+        if done:
+            db.query(PendingNotification).filter(
+                PendingNotification.id.in_(done)
+            ).delete(synchronize_session=False)
+        if retry:
+            db.query(PendingNotification).filter(
+                PendingNotification.id.in_(retry)
+            ).update({PendingNotification.attempts: PendingNotification.attempts + 1}, synchronize_session=False)
+            db.query(PendingNotification).filter(
+                PendingNotification.id.in_(retry),
+                PendingNotification.attempts >= settings.NOTIFY_MAX_ATTEMPTS
+            ).delete(synchronize_session=False)
+        if blocked:
+            deactivate_subscriptions(db, blocked)
+        db.commit()
+
+
+def format_notification(job: JobListing) -> str:
+    """Текст сповіщення про нову вакансію"""
+    return "📢 <b>Нова вакансія за вашою підпискою</b>\n\n" + format_job_listing(job)
+
+
+class NotificationSender:
+    """Відправляє сповіщення з черги"""
+
+    def __init__(self, bot, may_send: Callable[[], bool] = None):
+        self.bot = bot
+        # Перевіряється перед кожною пачкою: чергу розбирає лише лідер
+        self.may_send = may_send or (lambda: True)
+        self._lock = asyncio.Lock()
+
+    async def _send(self, item: QueuedNotification) -> str:
+        if item.job is None:
+            return DROP
+        try:
+            await self.bot.send_message(
+                item.telegram_id,
+                format_notification(item.job),
+                parse_mode="HTML",
+                rate_limit_args=notification_priority()
+            )
+            return SENT
+        except Forbidden:
+            return BLOCKED
+        except BadRequest as e:
+            logger.warning(f"Сповіщення {item.id} не прийнято: {e}")
+            return DROP
+        except TelegramError as e:
+            logger.warning(f"Помилка відправки сповіщення {item.id}: {e}")
+            return RETRY
+
+    async def deliver_pending(self) -> int:
+        """
+        Розбирає чергу сповіщень
+
+        Returns:
+            Кількість відправлених повідомлень
+        """
+        if self._lock.locked():
+            # Черга вже розбирається (після скрапінгу або за розкладом)
+            return 0
+        async with self._lock:
+            sent = 0
+            after_id = 0
+            while True:
+                if not self.may_send():
+                    logger.warning("Інстанс більше не лідер, розсилку сповіщень перервано")
+                    break
+                batch = await asyncio.to_thread(load_pending, after_id, settings.NOTIFY_BATCH_SIZE)
+                if not batch:
+                    break
+                outcomes = await asyncio.gather(*(self._send(item) for item in batch))
+                await asyncio.to_thread(settle_batch, batch, outcomes)
+                sent += outcomes.count(SENT)
+                after_id = batch[-1].id
+            if sent:
+                logger.info(f"Надіслано {sent} сповіщень про нові вакансії")
+            return sent
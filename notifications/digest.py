@@ -0,0 +1,247 @@
+"""Щоденні та щотижневі добірки вакансій за підписками
+
+Збіги з підписками з частотою daily/weekly накопичуються в таблиці
+subscription_digest_items. Раз на DIGEST_CHECK_MINUTES планувальник
+перевіряє, чиї добірки настав час відправити, і кожному користувачу йде
+одне повідомлення з найкращими DIGEST_TOP_N вакансіями за період.
+
+Час відправки кожного користувача зсунутий у межах вікна
+(DIGEST_WINDOW_START_HOUR + DIGEST_WINDOW_HOURS) на сталу величину за
+хешем його id, тому тисячі добірок розподіляються по вікну, а не йдуть в
+одну хвилину.
+"""
+from typing import Callable, Dict, List, NamedTuple, Optional, Tuple
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+import asyncio
+import html
+import logging
+import zlib
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from telegram.error import BadRequest, Forbidden, TelegramError
+from config import settings
+from database.models import JobListing, SubscriptionDigestItem, User
+from bot.utils.db_helpers import get_db_session
+from bot.utils.rate_limiter import bulk_priority
+from notifications.delivery import BLOCKED, DIGEST_FREQUENCIES, DROP, RETRY, SENT, deactivate_subscriptions
+from notifications.ledger import get_delivery_ledger
+from search.text import fold_text
+
+logger = logging.getLogger(__name__)
+
+DIGEST_TITLES = {
+    "daily": "Щоденна добірка вакансій",
+    "weekly": "Щотижнева добірка вакансій",
+}
+PERIODS = {
+    "daily": timedelta(days=1),
+    "weekly": timedelta(weeks=1),
+}
+
+
+class Digest(NamedTuple):
+    """Готова до відправки добірка"""
+    user_id: int
+    telegram_id: int
+    frequency: str
+    before: datetime  # межа періоду (UTC): враховані збіги, додані раніше
+    text: Optional[str]  # None - немає активних вакансій, яких користувач ще не отримував
+    job_ids: Tuple[int, ...]  # показані вакансії
+
+
+def slot_offset(user_id: int) -> timedelta:
+    """Сталий зсув часу відправки користувача у вікні добірок"""
+    window = max(1, settings.DIGEST_WINDOW_HOURS * 3600)
+    return timedelta(seconds=zlib.crc32(str(user_id).encode()) % window)
+
+
+def latest_slot(user_id: int, frequency: str, now: datetime) -> datetime:
+    """
+    Останній час відправки добірки користувача, що вже настав
+
+    now і результат - UTC без часового поясу (як created_at у таблицях).
+    """
+    tz = ZoneInfo(settings.DIGEST_TIMEZONE)
+    local_now = now.replace(tzinfo=timezone.utc).astimezone(tz)
+    start = local_now.replace(hour=settings.DIGEST_WINDOW_START_HOUR, minute=0, second=0, microsecond=0)
+    if frequency == "weekly":
+        start -= timedelta(days=(start.weekday() - settings.DIGEST_WEEKLY_DAY) % 7)
+    slot = start + slot_offset(user_id)
+    if slot > local_now:
+        slot -= PERIODS[frequency]
+    return slot.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def find_due(db: Session, frequency: str, now: datetime) -> List[Tuple[int, datetime]]:
+    """Користувачі, чия добірка має збіги до їхнього часу відправки: (user_id, межа)"""
+    rows = db.query(
+        SubscriptionDigestItem.user_id, func.min(SubscriptionDigestItem.created_at)
+    ).filter(
+        SubscriptionDigestItem.frequency == frequency
+    ).group_by(SubscriptionDigestItem.user_id).all()
+    due = []
+    for user_id, oldest in rows:
+        slot = latest_slot(user_id, frequency, now)
+        if oldest is not None and oldest < slot:
+            due.append((user_id, slot))
+    return due
+
+
+def rank_jobs(jobs: List[JobListing], match_counts: Dict[int, int]) -> List[JobListing]:
+    """
+    Впорядковує вакансії добірки без дублікатів
+
+    Вище - вакансії, що збіглися з більшою кількістю підписок, далі - з
+    вищою зарплатою та новіші. Однакові оголошення (назва + компанія з
+    різних джерел) показуються один раз.
+    """
+    def sort_key(job: JobListing):
+        salaries = [float(s) for s in (job.salary_min, job.salary_max) if s is not None]
+        published = job.published_date or job.scraped_at or datetime.min
+        return (match_counts.get(job.id, 0), max(salaries) if salaries else 0.0, published)
+
+    ranked = []
+    seen = set()
+    for job in sorted(jobs, key=sort_key, reverse=True):
+        key = (fold_text(job.title), fold_text(job.company))
+        if key in seen:
+            continue
+        seen.add(key)
+        ranked.append(job)
+    return ranked
+
+
+def format_digest(frequency: str, jobs: List[JobListing]) -> str:
+    """Текст добірки: найкращі DIGEST_TOP_N вакансій одним повідомленням"""
+    text = f"📬 <b>{DIGEST_TITLES[frequency]}</b>\n\n"
+    text += f"Нових вакансій за вашими підписками: {len(jobs)}\n\n"
+    for i, job in enumerate(jobs[:settings.DIGEST_TOP_N], 1):
+        line = f'{i}. <a href="{html.escape(job.url)}">{html.escape(job.title)}</a>'
+        details = []
+        if job.city:
+            details.append(f"📍 {html.escape(job.city)}")
+        salaries = [s for s in (job.salary_min, job.salary_max) if s is not None]
+        if salaries:
+            details.append(f"💰 від {int(min(salaries))} {job.salary_currency or 'PLN'}")
+        if details:
+            line += "\n    " + ", ".join(details)
+        text += line + "\n"
+    more = len(jobs) - settings.DIGEST_TOP_N
+    if more > 0:
+        text += f"\n…і ще {more}. Усі вакансії - у пошуку /search"
+    return text
+
+
+def build_digest(db: Session, user_id: int, frequency: str, before: datetime) -> Optional[Digest]:
+    """Збирає добірку користувача зі збігів, доданих до before"""
+    telegram_id = db.query(User.telegram_id).filter(User.id == user_id).scalar()
+    if telegram_id is None:
+        return None
+    match_counts = dict(db.query(
+        SubscriptionDigestItem.job_listing_id, func.count(SubscriptionDigestItem.id)
+    ).filter(
+        SubscriptionDigestItem.user_id == user_id,
+        SubscriptionDigestItem.frequency == frequency,
+        SubscriptionDigestItem.created_at < before
+    ).group_by(SubscriptionDigestItem.job_listing_id).all())
+    # Без вакансій, що вже прийшли миттєвим сповіщенням чи попередньою добіркою
+    unsent = get_delivery_ledger().unsent(db, ((user_id, job_id) for job_id in match_counts))
+    jobs = db.query(JobListing).filter(
+        JobListing.id.in_([job_id for _, job_id in unsent]), JobListing.is_active == True
+    ).all() if unsent else []
+    if not jobs:
+        return Digest(user_id, telegram_id, frequency, before, None, ())
+    ranked = rank_jobs(jobs, match_counts)
+    shown = tuple(job.id for job in ranked[:settings.DIGEST_TOP_N])
+    return Digest(user_id, telegram_id, frequency, before, format_digest(frequency, ranked), shown)
+
+
+def collect_due_digests(frequency: str, now: datetime) -> List[Digest]:
+    """Добірки, які настав час відправити"""
+    with get_db_session() as db:
+        digests = []
+        for user_id, before in find_due(db, frequency, now):
+            digest = build_digest(db, user_id, frequency, before)
+            if digest is not None:
+                digests.append(digest)
+        return digests
+
+
+def settle_digests(digests: List[Digest], outcomes: List[str]):
+    """Прибирає відправлені збіги; заблокованим користувачам вимикає підписки"""
+    with get_db_session() as db:
+        get_delivery_ledger().record(db, (
+            (digest.user_id, job_id)
+            for digest, outcome in zip(digests, outcomes) if outcome == SENT
+            for job_id in digest.job_ids
+        ))
+        for digest, outcome in zip(digests, outcomes):
+            if outcome in (SENT, DROP):
+                db.query(SubscriptionDigestItem).filter(
+                    SubscriptionDigestItem.user_id == digest.user_id,
+                    SubscriptionDigestItem.frequency == digest.frequency,
+                    SubscriptionDigestItem.created_at < digest.before
+                ).delete(synchronize_session=False)
+        db.commit()
+        blocked = {digest.user_id for digest, outcome in zip(digests, outcomes) if outcome == BLOCKED}
+        if blocked:
+            deactivate_subscriptions(db, blocked)
+
+
+class DigestSender:
+    """Відправляє добірки, час яких настав"""
+
+    def __init__(self, bot, may_send: Callable[[], bool] = None):
+        self.bot = bot
+        # Перевіряється перед кожною пачкою: добірки розсилає лише лідер
+        self.may_send = may_send or (lambda: True)
+        self._lock = asyncio.Lock()
+
+    async def _send(self, digest: Digest) -> str:
+        if digest.text is None:
+            return DROP
+        try:
+            await self.bot.send_message(
+                digest.telegram_id,
+                digest.text,
+                parse_mode="HTML",
+                disable_web_page_preview=True,
+                rate_limit_args=bulk_priority()
+            )
+            return SENT
+        except Forbidden:
+            return BLOCKED
+        except BadRequest as e:
+            logger.warning(f"Добірку користувача {digest.user_id} не прийнято: {e}")
+            return DROP
+        except TelegramError as e:
+            # Збіги залишаються - добірка піде при наступній перевірці
+            logger.warning(f"Помилка відправки добірки користувачу {digest.user_id}: {e}")
+            return RETRY
+
+    async def send_due_digests(self) -> int:
+        """
+        Відправляє добірки, час яких настав
+
+        Returns:
+            Кількість відправлених добірок
+        """
+        if self._lock.locked():
+            return 0
+        async with self._lock:
+            now = datetime.utcnow()
+            sent = 0
+            for frequency in DIGEST_FREQUENCIES:
+                digests = await asyncio.to_thread(collect_due_digests, frequency, now)
+                for start in range(0, len(digests), settings.NOTIFY_BATCH_SIZE):
+                    if not self.may_send():
+                        logger.warning("Інстанс більше не лідер, розсилку добірок перервано")
+                        return sent
+                    batch = digests[start:start + settings.NOTIFY_BATCH_SIZE]
+                    outcomes = await asyncio.gather(*(self._send(digest) for digest in batch))
+                    await asyncio.to_thread(settle_digests, batch, outcomes)
+                    sent += outcomes.count(SENT)
+            if sent:
+                logger.info(f"Надіслано {sent} добірок вакансій")
+            return sent
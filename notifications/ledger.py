@@ -0,0 +1,162 @@
+"""Журнал відправлених сповіщень (хто яку вакансію вже отримав)
+
+Таблиця sent_notifications зберігає пари (users.id, job_listings.id) з
+часом відправки; запис - пачкою з "insert or ignore". Перед нею стоїть
+фільтр Блума в пам'яті: для пачки пар "чи вже надсилали?" - це одна
+перевірка бітів на пару, і лише пари, які фільтр вважає можливо
+відправленими (реально відправлені та ~LEDGER_BLOOM_ERROR_RATE хибних
+збігів), перевіряються в таблиці одним запитом.
+
+Фільтр будується з таблиці при першому зверненні та після очищення
+старих записів (LEDGER_RETENTION_DAYS). Сповіщення відправляє лише лідер
+(scraper/leader.py), тому поки інстанс лідирує, фільтр відповідає таблиці.
+Поки він не лідирував, пари надсилали інші репліки, тож при обранні
+фільтр скидається (reset) і будується з таблиці заново.
+"""
+from typing import Iterable, List, Set, Tuple
+from datetime import datetime, timedelta
+import hashlib
+import logging
+import math
+import struct
+import threading
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from config import settings
+from database.models import SentNotification
+
+logger = logging.getLogger(__name__)
+
+Pair = Tuple[int, int]  # (users.id, job_listings.id)
+
+# Розмір пачки для запитів до таблиці
+QUERY_BATCH_SIZE = 500
+LOAD_BATCH_SIZE = 10000
+
+
+class BloomFilter:
+    """Фільтр Блума: відповідь "ні" точна, "так" - з ймовірністю помилки error_rate"""
+
+    def __init__(self, capacity: int, error_rate: float):
+        self.capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / self.capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: bytes):
+        # Подвійне хешування: k позицій з двох 64-бітних хешів
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hash_count))
+
+    def add(self, key: bytes):
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def saturated(self) -> bool:
+        """Записів більше, ніж розраховано (ймовірність помилки зростає)"""
+        return self.count > self.capacity
+
+
+def _key(pair: Pair) -> bytes:
+    return struct.pack("<qq", pair[0], pair[1])
+
+
+class DeliveryLedger:
+    """Журнал відправлених сповіщень з фільтром Блума"""
+
+    def __init__(self):
+        self._bloom: BloomFilter = None
+        self._lock = threading.Lock()
+
+    def _build(self, db: Session):
+        """Будує фільтр з таблиці (ємність - із запасом на ріст)"""
+        total = db.query(SentNotification).count()
+        bloom = BloomFilter(max(settings.LEDGER_BLOOM_CAPACITY, total * 2), settings.LEDGER_BLOOM_ERROR_RATE)
+        rows = db.query(SentNotification.user_id, SentNotification.job_listing_id).yield_per(LOAD_BATCH_SIZE)
+        for user_id, job_id in rows:
+            bloom.add(_key((user_id, job_id)))
+        self._bloom = bloom
+        logger.info(f"Журнал сповіщень завантажено: {bloom.count} записів")
+
+    def reset(self):
+        """Скидає фільтр: наступне звернення побудує його з таблиці"""
+        with self._lock:
+            self._bloom = None
+
+    def _ensure(self, db: Session):
+        if self._bloom is None or self._bloom.saturated:
+            self._build(db)
+
+    def unsent(self, db: Session, pairs: Iterable[Pair]) -> Set[Pair]:
+        """Пари, яким сповіщення ще не надсилали"""
+        pairs = set(pairs)
+        with self._lock:
+            self._ensure(db)
+            maybe_sent = [pair for pair in pairs if _key(pair) in self._bloom]
+        if not maybe_sent:
+            return pairs
+
+        # Фільтр каже "можливо" - перевіряємо в таблиці одним запитом на пачку
+        sent = set()
+        for start in range(0, len(maybe_sent), QUERY_BATCH_SIZE):
+            chunk = maybe_sent[start:start + QUERY_BATCH_SIZE]
+            rows = db.query(SentNotification.user_id, SentNotification.job_listing_id).filter(
+                SentNotification.user_id.in_({user_id for user_id, _ in chunk}),
+                SentNotification.job_listing_id.in_({job_id for _, job_id in chunk})
+            ).all()
+            sent.update((user_id, job_id) for user_id, job_id in rows)
+        return pairs - sent
+
+    def record(self, db: Session, pairs: Iterable[Pair]):
+        """Записує відправлені сповіщення (наявні пари ігноруються)"""
+        pairs = list(set(pairs))
+        if not pairs:
+            return
+        now = datetime.utcnow()
+        dialect = db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        for start in range(0, len(pairs), QUERY_BATCH_SIZE):
+            stmt = insert(SentNotification).values([
+                {'user_id': user_id, 'job_listing_id': job_id, 'sent_at': now}
+                for user_id, job_id in pairs[start:start + QUERY_BATCH_SIZE]
+            ]).on_conflict_do_nothing(index_elements=[SentNotification.user_id, SentNotification.job_listing_id])
+            db.execute(stmt)
+        db.commit()
+        with self._lock:
+            if self._bloom is not None:
+                for pair in pairs:
+                    self._bloom.add(_key(pair))
+
+    def prune(self, db: Session) -> int:
+        """Видаляє записи, старші за LEDGER_RETENTION_DAYS, і перебудовує фільтр"""
+        before = datetime.utcnow() - timedelta(days=settings.LEDGER_RETENTION_DAYS)
+        deleted = db.query(SentNotification).filter(
+            SentNotification.sent_at < before
+        ).delete(synchronize_session=False)
+        db.commit()
+        if deleted:
+            with self._lock:
+                self._build(db)
+        return deleted
+
+
+_ledger = DeliveryLedger()
+
+
+def get_delivery_ledger() -> DeliveryLedger:
+    """Повертає журнал сповіщень процесу"""
+    return _ledger
+
+
+def filter_unsent(db: Session, items: List, key=lambda item: (item.user_id, item.job_id)) -> List:
+    """Залишає елементи, пара (користувач, вакансія) яких ще не надсилалась"""
+    unsent = _ledger.unsent(db, (key(item) for item in items))
+    return [item for item in items if key(item) in unsent]
@@ -0,0 +1,263 @@
+"""Зворотний пошук: які підписки збігаються з новими вакансіями
+
+Підписки індексуються в пам'яті за одним "опорним" предикатом - найбільш
+вибірковим з наявних (ключове слово, місто, категорія, мінімальна
+зарплата). Для вакансії збираються лише підписки, опорний предикат яких
+вона задовольняє, і для них перевіряються решта умов. Тому вартість
+зіставлення залежить від кількості кандидатів, а не від кількості підписок.
+
+Умови підписки відповідають фільтрам пошуку: місто (з урахуванням
+довідника міст), категорія, зарплата від (за більшою з вилок вакансії) та
+ключові слова, кожне з яких має збігтися (з перекладом на польську, як у
+пошуку).
+"""
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+from bisect import bisect_left, bisect_right, insort
+import json
+import logging
+import threading
+import time
+from sqlalchemy.orm import Session
+from config import settings
+from database.models import JobListing, UserSubscription
+from search.geo import get_gazetteer
+from search.lexicon import expand_query
+from search.text import build_search_text, fold_text
+
+logger = logging.getLogger(__name__)
+
+
+class SubscriptionMatch(NamedTuple):
+    """Збіг підписки з вакансією"""
+    subscription_id: int
+    user_id: int
+    job_id: int
+    frequency: str
+
+
+class _Subscription:
+    """Умови підписки у нормалізованому вигляді"""
+
+    __slots__ = ("id", "user_id", "frequency", "city", "category", "salary_min", "groups")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.user_id = row.user_id
+        self.frequency = row.notification_frequency or "instant"
+        self.city = city_key(None, row.city) if row.city else None
+        self.category = fold_text(row.category) if row.category else None
+        self.salary_min = float(row.salary_min) if row.salary_min else None
+        # Групи альтернатив усіх ключових слів: кожна має збігтися
+        self.groups: Tuple[Tuple[str, ...], ...] = tuple(
+            group for keyword in parse_subscription_keywords(row.keywords)
+            for group in expand_query(keyword)
+        )
+
+    def matches(self, job: "_Job") -> bool:
+        if self.city is not None and self.city != job.city:
+            return False
+        if self.category is not None and self.category != job.category:
+            return False
+        if self.salary_min is not None and (job.salary is None or job.salary < self.salary_min):
+            return False
+        return all(any(alt in job.prefixes for alt in group) for group in self.groups)
+
+
+class _Job:
+    """Поля вакансії, потрібні для зіставлення"""
+
+    __slots__ = ("id", "city", "category", "salary", "prefixes")
+
+    def __init__(self, row):
+        self.id = row.id
+        self.city = city_key(row.city_id, row.city)
+        self.category = fold_text(row.category) if row.category else None
+        salaries = [float(s) for s in (row.salary_min, row.salary_max) if s is not None]
+        self.salary = max(salaries) if salaries else None
+        # Альтернативи ключових слів - префікси (основи), тому зберігаємо
+        # усі префікси токенів: перевірка групи - це пошук у множині
+        text = row.search_text or build_search_text(row.title, row.company, row.description)
+        self.prefixes: Set[str] = {
+            token[:end] for token in set(text.split()) for end in range(1, len(token) + 1)
+        }
+
+
+def city_key(city_id: Optional[int], city: Optional[str]) -> Optional[str]:
+    """Ключ міста: id з довідника, якщо місто відоме, інакше нормалізована назва"""
+    if not city_id and city:
+        known = get_gazetteer().by_name(city)
+        city_id = known.id if known else None
+    if city_id:
+        return f"id:{city_id}"
+    return f"name:{fold_text(city)}" if city else None
+
+
+def parse_subscription_keywords(keywords: Optional[str]) -> List[str]:
+    """Ключові слова підписки (JSON-масив)"""
+    if not keywords:
+        return []
+    try:
+        parsed = json.loads(keywords)
+    except ValueError:
+        return []
+    return [kw for kw in parsed if isinstance(kw, str) and kw.strip()] if isinstance(parsed, list) else []
+
+
+class SubscriptionIndex:
+    """Інвертований індекс активних підписок за опорним предикатом"""
+
+    def __init__(self):
+        self._subscriptions: Dict[int, _Subscription] = {}
+        self._by_keyword: Dict[str, Set[int]] = {}  # альтернатива опорної групи -> підписки
+        self._by_city: Dict[str, Set[int]] = {}
+        self._by_category: Dict[str, Set[int]] = {}
+        self._by_salary: List[Tuple[float, int]] = []  # (зарплата від, id), впорядковано
+        self._match_all: Set[int] = set()  # підписки без умов
+        self._lock = threading.Lock()
+        self.built_at: Optional[float] = None
+
+    def __len__(self) -> int:
+        return len(self._subscriptions)
+
+    @property
+    def ready(self) -> bool:
+        return self.built_at is not None
+
+    @staticmethod
+    def _load_rows(db: Session, subscription_ids: Optional[List[int]] = None):
+        query = db.query(
+            UserSubscription.id, UserSubscription.user_id, UserSubscription.city,
+            UserSubscription.category, UserSubscription.salary_min, UserSubscription.keywords,
+            UserSubscription.notification_frequency, UserSubscription.is_active
+        )
+        if subscription_ids is None:
+            return query.filter(UserSubscription.is_active == True).all()
+        return query.filter(UserSubscription.id.in_(subscription_ids)).all()
+
+    def _anchor(self, sub: _Subscription) -> Tuple[Optional[Dict[str, Set[int]]], Tuple[str, ...]]:
+        """Опорний предикат підписки: (словник постингів, ключі)"""
+        if sub.groups:
+            # Група з найдовшими альтернативами - найвибірковіша
+            return self._by_keyword, max(sub.groups, key=lambda group: min(len(alt) for alt in group))
+        if sub.city is not None:
+            return self._by_city, (sub.city,)
+        if sub.category is not None:
+            return self._by_category, (sub.category,)
+        return None, ()
+
+    def _add(self, sub: _Subscription):
+        self._subscriptions[sub.id] = sub
+        postings, keys = self._anchor(sub)
+        if postings is not None:
+            for key in keys:
+                postings.setdefault(key, set()).add(sub.id)
+        elif sub.salary_min is not None:
+            insort(self._by_salary, (sub.salary_min, sub.id))
+        else:
+            self._match_all.add(sub.id)
+
+    def _remove(self, subscription_id: int):
+        sub = self._subscriptions.pop(subscription_id, None)
+        if sub is None:
+            return
+        postings, keys = self._anchor(sub)
+        if postings is not None:
+            for key in keys:
+                ids = postings.get(key)
+                if ids is not None:
+                    ids.discard(subscription_id)
+                    if not ids:
+                        del postings[key]
+        elif sub.salary_min is not None:
+            position = bisect_left(self._by_salary, (sub.salary_min, subscription_id))
+            if position < len(self._by_salary) and self._by_salary[position][1] == subscription_id:
+                del self._by_salary[position]
+        else:
+            self._match_all.discard(subscription_id)
+
+    def build(self, db: Session):
+        """Будує індекс з усіх активних підписок"""
+        subscriptions = [_Subscription(row) for row in self._load_rows(db)]
+        with self._lock:
+            self._subscriptions = {}
+            self._by_keyword, self._by_city, self._by_category = {}, {}, {}
+            self._by_salary = []
+            self._match_all = set()
+            for sub in subscriptions:
+                self._add(sub)
+            self.built_at = time.monotonic()
+        logger.info(f"Індекс підписок побудовано: {len(subscriptions)} підписок")
+
+    def reset(self):
+        """Позначає індекс застарілим: наступний збіг перебудує його з таблиці"""
+        with self._lock:
+            self.built_at = None
+
+    def refresh(self, db: Session, subscription_ids: Iterable[int]):
+        """Оновлює підписки після створення, зміни чи видалення"""
+        subscription_ids = list(subscription_ids)
+        rows = self._load_rows(db, subscription_ids)
+        with self._lock:
+            for subscription_id in subscription_ids:
+                self._remove(subscription_id)
+            for row in rows:
+                if row.is_active:
+                    self._add(_Subscription(row))
+
+    def _candidates(self, job: _Job) -> Set[int]:
+        candidates = set(self._match_all)
+        for prefix in job.prefixes:
+            ids = self._by_keyword.get(prefix)
+            if ids:
+                candidates |= ids
+        if job.city is not None:
+            candidates |= self._by_city.get(job.city, set())
+        if job.category is not None:
+            candidates |= self._by_category.get(job.category, set())
+        if job.salary is not None:
+            end = bisect_right(self._by_salary, (job.salary, float("inf")))
+            candidates.update(sub_id for _, sub_id in self._by_salary[:end])
+        return candidates
+
+    def match(self, jobs: Iterable) -> List[SubscriptionMatch]:
+        """Збіги підписок з вакансіями (рядки з полями JobListing)"""
+        matches = []
+        with self._lock:
+            for row in jobs:
+                job = _Job(row)
+                for subscription_id in self._candidates(job):
+                    sub = self._subscriptions[subscription_id]
+                    if sub.matches(job):
+                        matches.append(SubscriptionMatch(sub.id, sub.user_id, job.id, sub.frequency))
+        return matches
+
+
+_subscription_index = SubscriptionIndex()
+
+
+def get_subscription_index() -> SubscriptionIndex:
+    """Повертає індекс підписок процесу"""
+    return _subscription_index
+
+
+def match_new_jobs(db: Session, job_ids: Iterable[int]) -> List[SubscriptionMatch]:
+    """
+    Підписки, що збігаються з новими вакансіями
+
+    Підписки могли змінитись в іншому процесі, тому застарілий індекс
+    (старший за SUBSCRIPTION_INDEX_TTL_SECONDS) перебудовується.
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return []
+    index = _subscription_index
+    if not index.ready or time.monotonic() - index.built_at > settings.SUBSCRIPTION_INDEX_TTL_SECONDS:
+        index.build(db)
+    if not len(index):
+        return []
+    rows = db.query(
+        JobListing.id, JobListing.title, JobListing.company, JobListing.description,
+        JobListing.search_text, JobListing.city, JobListing.city_id, JobListing.category,
+        JobListing.salary_min, JobListing.salary_max
+    ).filter(JobListing.id.in_(job_ids), JobListing.is_active == True).all()
+    return index.match(rows)
@@ -1,4 +1,5 @@
 from .base_scraper import BaseScraper
 from .scheduler import ScrapingScheduler
+from .archive import PageArchive
 
-__all__ = ['BaseScraper', 'ScrapingScheduler']
+__all__ = ['BaseScraper', 'ScrapingScheduler', 'PageArchive']
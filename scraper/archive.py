@@ -0,0 +1,215 @@
+"""Архів сирих сторінок (list/detail HTML) для офлайн-перепарсингу"""
+from typing import Iterator, Optional, Tuple
+from datetime import datetime, timedelta
+from contextlib import contextmanager
+from config import settings
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+import zlib
+
+try:
+    import zstandard
+except ImportError:  # zstd опціональний, без нього використовуємо zlib
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# Розширення файлів для різних алгоритмів стиснення
+ZSTD_EXT = ".zst"
+ZLIB_EXT = ".zz"
+
+
+class PageArchive:
+    """
+    Content-addressed архів сторінок.
+
+    Тіла сторінок зберігаються стиснутими у файлах, назва яких - SHA-256 вмісту,
+    тому однакові сторінки займають місце лише один раз. Журнал завантажень
+    (url, тип, хеш, час) ведеться в окремому SQLite-файлі поруч з архівом, щоб
+    не змішувати його з транзакціями основної БД.
+    """
+
+    def __init__(self, root: str = None, retention_days: int = None):
+        self.root = root or settings.ARCHIVE_DIR
+        self.retention_days = retention_days or settings.ARCHIVE_RETENTION_DAYS
+        self.index_path = os.path.join(self.root, "index.sqlite3")
+        self._lock = threading.Lock()
+        os.makedirs(self.root, exist_ok=True)
+        self._init_index()
+
+    @contextmanager
+    def _connect(self):
+        """Підключення до журналу архіву"""
+        with self._lock:
+            conn = sqlite3.connect(self.index_path)
+            try:
+                yield conn
+                conn.commit()
+            finally:
+                conn.close()
+
+    def _init_index(self):
+        """Створює таблицю журналу якщо її немає"""
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS pages ("
+                "id INTEGER PRIMARY KEY, source TEXT NOT NULL, url TEXT NOT NULL, "
+                "kind TEXT NOT NULL, content_hash TEXT NOT NULL, fetched_at TEXT NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_url ON pages (url, fetched_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_source ON pages (source, kind, fetched_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_pages_hash ON pages (content_hash)")
+
+    def _blob_path(self, content_hash: str, ext: str) -> str:
+        """Шлях до файлу з тілом сторінки (розкладаємо по підпапках за префіксом)"""
+        return os.path.join(self.root, content_hash[:2], content_hash + ext)
+
+    def _find_blob(self, content_hash: str) -> Optional[str]:
+        """Шукає файл з тілом сторінки незалежно від алгоритму стиснення"""
+        for ext in (ZSTD_EXT, ZLIB_EXT):
+            path = self._blob_path(content_hash, ext)
+            if os.path.exists(path):
+                return path
+        return None
+
+    def _write_blob(self, content_hash: str, data: bytes):
+        """Стискає та атомарно записує тіло сторінки"""
+        if zstandard is not None:
+            path = self._blob_path(content_hash, ZSTD_EXT)
+            payload = zstandard.ZstdCompressor(level=10).compress(data)
+        else:
+            path = self._blob_path(content_hash, ZLIB_EXT)
+            payload = zlib.compress(data, 9)
+
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+
+    def _read_blob(self, content_hash: str) -> Optional[str]:
+        """Читає та розпаковує тіло сторінки"""
+        path = self._find_blob(content_hash)
+        if not path:
+            return None
+
+        with open(path, "rb") as f:
+            payload = f.read()
+
+        if path.endswith(ZSTD_EXT):
+            if zstandard is None:
+                logger.error(f"Сторінка {content_hash} стиснута zstd, але пакет zstandard не встановлено")
+                return None
+            data = zstandard.ZstdDecompressor().decompress(payload)
+        else:
+            data = zlib.decompress(payload)
+        return data.decode("utf-8")
+
+    def store(self, source: str, url: str, kind: str, html: str) -> str:
+        """
+        Зберігає сторінку в архів
+
+        Args:
+            source: Назва джерела (olx, pracuj)
+            url: URL сторінки
+            kind: Тип сторінки (list або detail)
+            html: Вміст сторінки
+
+        Returns:
+            SHA-256 хеш вмісту
+        """
+        data = html.encode("utf-8")
+        content_hash = hashlib.sha256(data).hexdigest()
+
+        if not self._find_blob(content_hash):
+            self._write_blob(content_hash, data)
+
+        now = datetime.utcnow().isoformat()
+        with self._connect() as conn:
+            # Якщо остання версія цього URL не змінилась - лише оновлюємо час
+            row = conn.execute(
+                "SELECT id, content_hash FROM pages WHERE url = ? ORDER BY fetched_at DESC LIMIT 1",
+                (url,)
+            ).fetchone()
+            if row and row[1] == content_hash:
+                conn.execute("UPDATE pages SET fetched_at = ? WHERE id = ?", (now, row[0]))
+            else:
+                conn.execute(
+                    "INSERT INTO pages (source, url, kind, content_hash, fetched_at) VALUES (?, ?, ?, ?, ?)",
+                    (source, url, kind, content_hash, now)
+                )
+
+        return content_hash
+
+    def latest(self, url: str) -> Optional[str]:
+        """Повертає останню збережену версію сторінки"""
+        with self._connect() as conn:
+            row = conn.execute(
+                "SELECT content_hash FROM pages WHERE url = ? ORDER BY fetched_at DESC LIMIT 1",
+                (url,)
+            ).fetchone()
+
+        if not row:
+            return None
+        return self._read_blob(row[0])
+
+    def iter_pages(self, source: str, kind: str, since: datetime = None) -> Iterator[Tuple[str, str]]:
+        """
+        Перебирає збережені сторінки джерела (від нових до старих)
+
+        Yields:
+            Пари (url, html)
+        """
+        query = "SELECT url, content_hash FROM pages WHERE source = ? AND kind = ?"
+        params = [source, kind]
+        if since:
+            query += " AND fetched_at >= ?"
+            params.append(since.isoformat())
+        query += " ORDER BY fetched_at DESC"
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        for url, content_hash in rows:
+            html = self._read_blob(content_hash)
+            if html is not None:
+                yield url, html
+
+    def prune(self, retention_days: int = None) -> int:
+        """
+        Видаляє записи старші за термін зберігання та файли, на які більше
+        ніхто не посилається
+
+        Returns:
+            Кількість видалених файлів
+        """
+        days = retention_days or self.retention_days
+        cutoff = (datetime.utcnow() - timedelta(days=days)).isoformat()
+
+        with self._connect() as conn:
+            stale_hashes = {
+                row[0] for row in conn.execute(
+                    "SELECT DISTINCT content_hash FROM pages WHERE fetched_at < ?", (cutoff,)
+                )
+            }
+            conn.execute("DELETE FROM pages WHERE fetched_at < ?", (cutoff,))
+            still_used = {
+                row[0] for row in conn.execute("SELECT DISTINCT content_hash FROM pages")
+            } if stale_hashes else set()
+
+        removed = 0
+        for content_hash in stale_hashes - still_used:
+            path = self._find_blob(content_hash)
+            if path:
+                try:
+                    os.remove(path)
+                    removed += 1
+                except OSError as e:
+                    logger.warning(f"Не вдалося видалити {path}: {e}")
+
+        if removed:
+            logger.info(f"Архів сторінок: видалено {removed} застарілих файлів")
+        return removed
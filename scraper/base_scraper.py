@@ -5,6 +5,8 @@ from datetime import datetime
 import requests
 from bs4 import BeautifulSoup
 from config import settings
+from scraper.archive import PageArchive
+from search.geo import UNKNOWN_CITY_ID, get_gazetteer
 import time
 import logging
 
@@ -26,17 +28,41 @@ class BaseScraper(ABC):
             'Connection': 'keep-alive',
             'Cache-Control': 'max-age=0',
         })
+        # Архів сирих сторінок (опціонально)
+        self.archive: Optional[PageArchive] = PageArchive() if settings.ARCHIVE_ENABLED else None
+        # Офлайн-режим: сторінки беруться лише з архіву, без звернень до мережі
+        self.offline = False
+        # Затримка після запиту (секунди, від-до); None - без затримки
+        self.request_delay = (2, 5)
+        self.request_timeout = 30
     
-    def fetch_page(self, url: str, retries: int = 3) -> Optional[str]:
-        """Отримує HTML сторінку з retry логікою"""
+    def fetch_page(self, url: str, retries: int = 3, kind: str = "detail") -> Optional[str]:
+        """
+        Отримує HTML сторінку з retry логікою
+        
+        Args:
+            url: URL сторінки
+            retries: Кількість спроб
+            kind: Тип сторінки для архіву (list або detail)
+        """
+        if self.offline:
+            return self.archive.latest(url) if self.archive else None
+        
         for attempt in range(retries):
             try:
-                response = self.session.get(url, timeout=30)
+                response = self.session.get(url, timeout=self.request_timeout)
                 response.raise_for_status()
                 
+                if self.archive:
+                    try:
+                        self.archive.store(self.source_name, url, kind, response.text)
+                    except Exception as e:
+                        logger.warning(f"Не вдалося зберегти {url} в архів: {e}")
+                
                 # Додаємо випадкову затримку щоб не блокували (2-5 секунд)
-                import random
-                time.sleep(random.uniform(2, 5))
+                if self.request_delay:
+                    import random
+                    time.sleep(random.uniform(*self.request_delay))
                 
                 return response.text
             except Exception as e:
@@ -65,12 +91,26 @@ class BaseScraper(ABC):
         pass
     
     @abstractmethod
-    def parse_job(self, job_data: Dict) -> Dict:
+    def parse_list_page(self, html: str) -> List[Dict]:
+        """
+        Витягує вакансії зі сторінки списку
+        
+        Args:
+            html: HTML сторінки списку
+            
+        Returns:
+            Список словників з даними вакансій
+        """
+        pass
+    
+    @abstractmethod
+    def parse_job(self, job_data: Dict, html: str = None) -> Dict:
         """
         Парсить окрему вакансію
         
         Args:
             job_data: Дані вакансії зі списку
+            html: Вже завантажена детальна сторінка (інакше завантажується за url)
             
         Returns:
             Словник з нормалізованими даними вакансії
@@ -87,6 +127,8 @@ class BaseScraper(ABC):
         Returns:
             Нормалізовані дані
         """
+        # Канонічне місто з довідника; без збігу - як і раніше, з тексту локації
+        geo_city = get_gazetteer().geocode(job_data.get('location', ''))
         normalized = {
             'source': self.source_name,
             'source_id': job_data.get('source_id'),
@@ -94,7 +136,8 @@ class BaseScraper(ABC):
             'description': self._clean_text(job_data.get('description', '')),
             'company': self._clean_text(job_data.get('company', '')),
             'location': self._clean_text(job_data.get('location', '')),
-            'city': self._extract_city(job_data.get('location', '')),
+            'city': geo_city.name_uk if geo_city else self._extract_city(job_data.get('location', '')),
+            'city_id': geo_city.id if geo_city else UNKNOWN_CITY_ID,
             'salary_min': self._parse_salary(job_data.get('salary', ''), 'min'),
             'salary_max': self._parse_salary(job_data.get('salary', ''), 'max'),
             'salary_currency': job_data.get('salary_currency', 'PLN'),
@@ -0,0 +1,177 @@
+"""Ліниве дозавантаження деталей вакансій (детальна сторінка на вимогу)
+
+Вакансія позначається дозавантаженою (details_fetched_at) лише коли детальну
+сторінку справді отримано. Невдала спроба збільшує details_attempts і
+відкладає наступну на DETAIL_RETRY_MINUTES з подвоєнням; після
+DETAIL_MAX_ATTEMPTS вакансія лишається з даними картки.
+"""
+from typing import Dict, List, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+from config import settings
+from database.database import SessionLocal
+from sqlalchemy import or_
+from database.models import JobListing
+from scraper.scrapers.olx_scraper import OLXScraper
+from scraper.scrapers.pracuj_scraper import PracujScraper
+from search.ingest import on_jobs_changed
+
+logger = logging.getLogger(__name__)
+
+# Поля, які беремо з детальної сторінки (решта вже є з картки)
+DETAIL_FIELDS = ('description', 'company')
+
+
+class DetailEnricher:
+    """
+    Завантажує детальні сторінки для вакансій, збережених лише з даних картки.
+
+    Інтерактивний режим (polite=False) - без затримок між запитами та з коротким
+    таймаутом, для показу вакансії користувачу. Фоновий режим - з тими ж
+    затримками, що й звичайний скрапінг.
+    """
+
+    def __init__(self, polite: bool = True):
+        self.scrapers = {scraper.source_name: scraper for scraper in (OLXScraper(), PracujScraper())}
+        if not polite:
+            for scraper in self.scrapers.values():
+                scraper.request_delay = None
+                scraper.request_timeout = settings.DETAIL_FETCH_TIMEOUT_SECONDS
+
+    def fetch_details(self, job_data: Dict) -> Optional[Dict]:
+        """
+        Завантажує детальну сторінку (блокуючий виклик, виконувати в потоці)
+
+        Args:
+            job_data: Дані вакансії (source, url, title, ...)
+
+        Returns:
+            Словник з полями детальної сторінки або None, якщо джерело невідоме
+            чи сторінку не вдалося отримати
+        """
+        scraper = self.scrapers.get(job_data.get('source'))
+        if not scraper:
+            return None
+
+        html = scraper.fetch_page(job_data['url'])
+        if not html:
+            return None
+
+        normalized = scraper.parse_job(dict(job_data), html)
+        return {key: normalized.get(key) for key in DETAIL_FIELDS}
+
+    @staticmethod
+    def needs_details(job: JobListing) -> bool:
+        """Чи варто зараз пробувати завантажити детальну сторінку"""
+        if job.details_fetched_at is not None or (job.details_attempts or 0) >= settings.DETAIL_MAX_ATTEMPTS:
+            return False
+        return job.details_retry_at is None or job.details_retry_at <= datetime.utcnow()
+
+    @staticmethod
+    def job_data_from_listing(job: JobListing) -> Dict:
+        """Будує дані картки з рядка БД"""
+        return {
+            'source': job.source,
+            'source_id': job.source_id,
+            'title': job.title,
+            'company': job.company,
+            'location': job.location,
+            'url': job.url,
+            'description': job.description,
+        }
+
+    @staticmethod
+    def apply_details(job: JobListing, details: Optional[Dict]):
+        """Записує деталі у вакансію; None - невдала спроба, яку буде повторено пізніше"""
+        if details is None:
+            job.details_attempts = (job.details_attempts or 0) + 1
+            delay = settings.DETAIL_RETRY_MINUTES * 2 ** (job.details_attempts - 1)
+            job.details_retry_at = datetime.utcnow() + timedelta(minutes=delay)
+            return
+
+        # Довший опис з детальної сторінки замінює короткий опис з картки
+        description = details.get('description')
+        if description and len(description) > len(job.description or ''):
+            job.description = description
+        if details.get('company') and not job.company:
+            job.company = details['company']
+        job.details_fetched_at = datetime.utcnow()
+        job.details_retry_at = None
+
+    async def enrich(self, job: JobListing) -> bool:
+        """
+        Дозавантажує деталі для вакансії, яку зараз показують користувачу
+
+        Невдала спроба теж записується у вакансію (лічильник і час повтору).
+
+        Returns:
+            True якщо деталі завантажено
+        """
+        try:
+            details = await asyncio.wait_for(
+                asyncio.to_thread(self.fetch_details, self.job_data_from_listing(job)),
+                timeout=settings.DETAIL_FETCH_TIMEOUT_SECONDS
+            )
+        except asyncio.TimeoutError:
+            logger.warning(f"Таймаут при завантаженні деталей вакансії {job.id}")
+            details = None
+        except Exception as e:
+            logger.error(f"Помилка при завантаженні деталей вакансії {job.id}: {e}")
+            details = None
+
+        self.apply_details(job, details)
+        return details is not None
+
+    async def fill_backlog(self, limit: int = None) -> int:
+        """
+        Фоново дозавантажує деталі для найновіших вакансій без деталей
+
+        Returns:
+            Кількість оброблених вакансій
+        """
+        limit = limit or settings.DETAIL_FILL_BATCH_SIZE
+        db = SessionLocal()
+        try:
+            jobs: List[JobListing] = db.query(JobListing).filter(
+                JobListing.is_active == True,
+                JobListing.details_fetched_at.is_(None),
+                JobListing.details_attempts < settings.DETAIL_MAX_ATTEMPTS,
+                or_(JobListing.details_retry_at.is_(None), JobListing.details_retry_at <= datetime.utcnow())
+            ).order_by(JobListing.id.desc()).limit(limit).all()
+
+            fetched = 0
+
+            for job in jobs:
+                try:
+                    details = await asyncio.to_thread(self.fetch_details, self.job_data_from_listing(job))
+                except Exception as e:
+                    logger.error(f"Помилка при завантаженні деталей вакансії {job.id}: {e}")
+                    details = None
+                self.apply_details(job, details)
+                # Комітимо по одній, щоб не тримати транзакцію під час мережевих запитів
+                db.commit()
+                if details is not None:
+                    fetched += 1
+                    on_jobs_changed(db, [job.id])
+
+            if jobs:
+                logger.info(f"Фоново дозавантажено деталі для {fetched} з {len(jobs)} вакансій")
+            return len(jobs)
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Помилка при фоновому дозавантаженні деталей: {e}")
+            return 0
+        finally:
+            db.close()
+
+
+_interactive_enricher: Optional[DetailEnricher] = None
+
+
+def get_interactive_enricher() -> DetailEnricher:
+    """Повертає спільний enricher для показу вакансій користувачам"""
+    global _interactive_enricher
+    if _interactive_enricher is None:
+        _interactive_enricher = DetailEnricher(polite=False)
+    return _interactive_enricher
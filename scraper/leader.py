@@ -0,0 +1,256 @@
+"""Вибір лідера між репліками бота
+
+Скрапінг, черга сповіщень і добірки мають виконуватись в одному процесі,
+інакше репліки вдвічі навантажують сайти та змагаються за унікальний url.
+Роль лідера - це оренда рядка leader_leases: інстанс продовжує її кожні
+LEADER_RENEW_SECONDS умовним UPDATE (лише якщо рядок його або оренда
+минула), тому лідер завжди один. Якщо лідер зупиняється, він звільняє
+оренду одразу, а якщо падає - її перебирає інша репліка після
+LEADER_LEASE_SECONDS.
+
+Через той самий рядок лідер повідомляє репліки про нові вакансії
+(data_version - вони перебудовують пошуковий індекс), а репліки передають
+лідеру /update_jobs (scrape_requested_at). Версію збільшують і скрипти, що
+змінюють вакансії поза ботом (scraper/reparse.py) - тоді індекс перебудовує
+і лідер.
+
+Оренда живе в БД, а не в Redis: базу гарантовано спільно бачать усі
+репліки, а Redis опціональний - репліка, що не змогла до нього
+підключитись, обрала б себе лідером окремо.
+"""
+from typing import Awaitable, Callable, NamedTuple, Optional
+from datetime import datetime, timedelta
+import asyncio
+import logging
+import os
+import socket
+import time
+from sqlalchemy import case, or_
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from config import settings
+from database.database import SessionLocal
+from database.models import LeaderLease
+
+logger = logging.getLogger(__name__)
+
+SCRAPING_LEASE = "scraping"
+
+Callback = Optional[Callable[[], Awaitable[None]]]
+
+
+class LeaseState(NamedTuple):
+    """Стан оренди після перевірки"""
+    holder: Optional[str]
+    data_version: int
+    scrape_requested: bool  # запит передано цьому інстансу (лише лідеру)
+
+
+def instance_id() -> str:
+    """Ідентифікатор інстансу (INSTANCE_ID або hostname-pid)"""
+    return settings.INSTANCE_ID or f"{socket.gethostname()}-{os.getpid()}"
+
+
+def try_acquire(db: Session, name: str, holder: str, ttl_seconds: float) -> LeaseState:
+    """Продовжує свою оренду або бере вільну/минулу; повертає стан рядка"""
+    now = datetime.utcnow()
+    expires_at = now + timedelta(seconds=ttl_seconds)
+    updated = db.query(LeaderLease).filter(
+        LeaderLease.name == name,
+        or_(LeaderLease.holder == holder, LeaderLease.holder.is_(None), LeaderLease.expires_at < now)
+    ).update({
+        LeaderLease.acquired_at: case((LeaderLease.holder == holder, LeaderLease.acquired_at), else_=now),
+        LeaderLease.holder: holder,
+        LeaderLease.expires_at: expires_at,
+    }, synchronize_session=False)
+    if not updated:
+        # Рядка ще немає (перший запуск) - створює той, хто встигне
+        dialect = db.get_bind().dialect.name
+        insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+        db.execute(insert(LeaderLease).values(
+            name=name, holder=holder, expires_at=expires_at, acquired_at=now, data_version=0
+        ).on_conflict_do_nothing(index_elements=[LeaderLease.name]))
+    db.commit()
+    return _read_state(db, name, holder)
+
+
+def read_lease(db: Session, name: str, holder: str) -> LeaseState:
+    """Стан оренди без спроби її взяти"""
+    return _read_state(db, name, holder)
+
+
+def _read_state(db: Session, name: str, holder: str) -> LeaseState:
+    lease = db.query(LeaderLease).filter(LeaderLease.name == name).first()
+    if lease is None:
+        return LeaseState(None, 0, False)
+    if lease.expires_at is not None and lease.expires_at < datetime.utcnow():
+        current_holder = None
+    else:
+        current_holder = lease.holder
+    requested = current_holder == holder and lease.scrape_requested_at is not None
+    if requested:
+        # Запит забирає лідер, і він виконується один раз
+        lease.scrape_requested_at = None
+        db.commit()
+    return LeaseState(current_holder, lease.data_version or 0, requested)
+
+
+def release_lease(db: Session, name: str, holder: str):
+    """Звільняє оренду, щоб інша репліка взяла її при наступній перевірці"""
+    db.query(LeaderLease).filter(
+        LeaderLease.name == name, LeaderLease.holder == holder
+    ).update({LeaderLease.holder: None, LeaderLease.expires_at: None}, synchronize_session=False)
+    db.commit()
+
+
+def request_scrape(db: Session, name: str = SCRAPING_LEASE):
+    """Передає лідеру запит на позачерговий скрапінг"""
+    db.query(LeaderLease).filter(LeaderLease.name == name).update(
+        {LeaderLease.scrape_requested_at: datetime.utcnow()}, synchronize_session=False
+    )
+    db.commit()
+
+
+def bump_data_version(db: Session, name: str = SCRAPING_LEASE) -> Optional[int]:
+    """Позначає, що вакансії змінились (репліки перебудують індекси); повертає нову версію"""
+    db.query(LeaderLease).filter(LeaderLease.name == name).update(
+        {LeaderLease.data_version: LeaderLease.data_version + 1}, synchronize_session=False
+    )
+    version = db.query(LeaderLease.data_version).filter(LeaderLease.name == name).scalar()
+    db.commit()
+    return version
+
+
+def _with_session(func, *args):
+    db = SessionLocal()
+    try:
+        return func(db, *args)
+    finally:
+        db.close()
+
+
+class LeaderElection:
+    """
+    Цикл перевірки оренди одного інстансу
+
+    candidate=False - інстанс лише стежить за лідером (SCRAPING_ENABLED=false).
+    Колбеки викликаються в event loop: on_elected/on_deposed - при зміні ролі,
+    on_scrape_requested - лідеру на запит іншої репліки, on_data_changed -
+    коли вакансії змінив інший процес (лідер для реплік або скрипт для всіх).
+    """
+
+    def __init__(
+        self,
+        name: str = SCRAPING_LEASE,
+        candidate: bool = True,
+        on_elected: Callback = None,
+        on_deposed: Callback = None,
+        on_scrape_requested: Callback = None,
+        on_data_changed: Callback = None,
+    ):
+        self.name = name
+        self.holder = instance_id()
+        self.candidate = candidate
+        self.is_leader = False
+        self.leader: Optional[str] = None
+        self.last_check: Optional[float] = None  # time.monotonic() останньої успішної перевірки
+        self._on_elected = on_elected
+        self._on_deposed = on_deposed
+        self._on_scrape_requested = on_scrape_requested
+        self._on_data_changed = on_data_changed
+        self._deadline = 0.0  # до цього моменту оренда гарантовано наша
+        self._data_version: Optional[int] = None
+        self._stopped = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        """Запускає цикл перевірки оренди"""
+        self._stopped.clear()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        """Зупиняє цикл; лідер складає повноваження і звільняє оренду"""
+        self._stopped.set()
+        if self._task is not None:
+            await self._task
+            self._task = None
+        if self.is_leader:
+            await self._step_down()
+            try:
+                await asyncio.to_thread(_with_session, release_lease, self.name, self.holder)
+            except Exception as e:
+                logger.error(f"Не вдалося звільнити оренду лідера: {e}")
+
+    def holds_lease(self) -> bool:
+        """Чи оренда гарантовано наша зараз (перевірка перед роботою лідера)"""
+        return self.is_leader and time.monotonic() < self._deadline
+
+    async def publish_data_version(self):
+        """Лідер повідомляє репліки про зміну вакансій"""
+        try:
+            version = await asyncio.to_thread(_with_session, bump_data_version, self.name)
+        except Exception as e:
+            logger.error(f"Не вдалося оновити версію даних: {e}")
+            return
+        # Власну зміну лідер не застосовує; якщо версію збільшив ще хтось - застосує при перевірці
+        if version is not None and self._data_version == version - 1:
+            self._data_version = version
+
+    async def _run(self):
+        while not self._stopped.is_set():
+            await self.check()
+            try:
+                await asyncio.wait_for(self._stopped.wait(), timeout=settings.LEADER_RENEW_SECONDS)
+            except asyncio.TimeoutError:
+                pass
+
+    async def check(self):
+        """Одна перевірка: продовжити/взяти оренду і застосувати її стан"""
+        started = time.monotonic()
+        try:
+            if self.candidate:
+                state = await asyncio.to_thread(
+                    _with_session, try_acquire, self.name, self.holder, settings.LEADER_LEASE_SECONDS
+                )
+            else:
+                state = await asyncio.to_thread(_with_session, read_lease, self.name, self.holder)
+        except Exception as e:
+            logger.error(f"Помилка перевірки оренди лідера: {e}")
+            # Без зв'язку з БД лідер тримає роль лише доки оренда точно не минула
+            if self.is_leader and time.monotonic() >= self._deadline:
+                logger.warning("Оренду лідера не вдалося продовжити вчасно, роль складено")
+                await self._step_down()
+            return
+        self.last_check = time.monotonic()
+        self.leader = state.holder
+        leading = state.holder == self.holder
+
+        if leading:
+            self._deadline = started + settings.LEADER_LEASE_SECONDS
+            if not self.is_leader:
+                self.is_leader = True
+                logger.info(f"Інстанс {self.holder} став лідером")
+                await self._call(self._on_elected)
+        elif self.is_leader:
+            logger.warning(f"Роль лідера перейшла до {state.holder}")
+            await self._step_down()
+
+        if state.scrape_requested:
+            await self._call(self._on_scrape_requested)
+
+        changed = self._data_version is not None and state.data_version != self._data_version
+        self._data_version = state.data_version
+        if changed:
+            await self._call(self._on_data_changed)
+
+    async def _step_down(self):
+        self.is_leader = False
+        await self._call(self._on_deposed)
+
+    async def _call(self, callback: Callback):
+        if callback is None:
+            return
+        try:
+            await callback()
+        except Exception as e:
+            logger.error(f"Помилка обробника зміни ролі лідера: {e}")
@@ -0,0 +1,138 @@
+"""Офлайн-перепарсинг архівованих сторінок без звернень до мережі
+
+Використання:
+    python -m scraper.reparse                 # всі джерела
+    python -m scraper.reparse --source olx    # одне джерело
+    python -m scraper.reparse --days 7        # лише сторінки за останні 7 днів
+"""
+from typing import Dict, Optional
+from datetime import datetime, timedelta
+import argparse
+import logging
+import time
+from database.database import SessionLocal
+from database.models import JobListing
+from scraper.archive import PageArchive
+from scraper.leader import bump_data_version
+from scraper.scrapers.olx_scraper import OLXScraper
+from scraper.scrapers.pracuj_scraper import PracujScraper
+from search.ingest import on_jobs_changed
+from search.cache import bump_search_generation
+
+logger = logging.getLogger(__name__)
+
+# Розмір пачки для bulk update
+BATCH_SIZE = 500
+
+
+def reparse_source(scraper, archive: PageArchive, since: Optional[datetime] = None) -> Dict[str, int]:
+    """
+    Перепарсює архівовані сторінки одного джерела та оновлює job_listings
+
+    Args:
+        scraper: Екземпляр скрапера (переводиться в офлайн-режим)
+        archive: Архів сторінок
+        since: Обробляти лише сторінки, завантажені після цієї дати
+
+    Returns:
+        Статистика: кількість розібраних карток та оновлених вакансій
+    """
+    scraper.archive = archive
+    scraper.offline = True
+
+    parsed_count = 0
+    updated_count = 0
+    seen_urls = set()
+    updated_ids = []
+
+    db = SessionLocal()
+    try:
+        # Мапа url -> id існуючих вакансій джерела (один запит замість запиту на кожну картку)
+        existing_ids = dict(
+            db.query(JobListing.url, JobListing.id).filter(JobListing.source == scraper.source_name).all()
+        )
+
+        mappings = []
+        # Сторінки йдуть від нових до старих, тому для кожного URL береться найсвіжіша картка
+        for list_url, html in archive.iter_pages(scraper.source_name, "list", since=since):
+            for job_data in scraper.parse_list_page(html):
+                url = job_data.get('url')
+                if not url or url in seen_urls:
+                    continue
+                seen_urls.add(url)
+
+                try:
+                    # Детальна сторінка береться з архіву через fetch_page (offline)
+                    normalized_job = scraper.parse_job(job_data)
+                except Exception as e:
+                    logger.error(f"Помилка при перепарсингу {url}: {e}")
+                    continue
+                parsed_count += 1
+
+                job_id = existing_ids.get(url)
+                if not job_id:
+                    continue
+
+                mapping = {key: value for key, value in normalized_job.items() if value}
+                mapping['id'] = job_id
+                mappings.append(mapping)
+                updated_ids.append(job_id)
+
+                if len(mappings) >= BATCH_SIZE:
+                    db.bulk_update_mappings(JobListing, mappings)
+                    updated_count += len(mappings)
+                    mappings = []
+
+        if mappings:
+            db.bulk_update_mappings(JobListing, mappings)
+            updated_count += len(mappings)
+
+        db.commit()
+        on_jobs_changed(db, updated_ids)
+        bump_search_generation()
+        # Індекс цього процесу зникне з виходом - запущені боти перебудують свої
+        if updated_ids:
+            bump_data_version(db)
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Помилка при перепарсингу {scraper.source_name}: {e}")
+        raise
+    finally:
+        db.close()
+
+    return {'parsed': parsed_count, 'updated': updated_count}
+
+
+def reparse_all(source: str = None, days: int = None) -> Dict[str, Dict[str, int]]:
+    """Перепарсює архів для всіх (або одного) джерел"""
+    archive = PageArchive()
+    since = datetime.utcnow() - timedelta(days=days) if days else None
+
+    results = {}
+    for scraper in (OLXScraper(), PracujScraper()):
+        if source and scraper.source_name != source:
+            continue
+
+        start_time = time.time()
+        results[scraper.source_name] = reparse_source(scraper, archive, since=since)
+        logger.info(
+            f"{scraper.source_name}: розібрано {results[scraper.source_name]['parsed']}, "
+            f"оновлено {results[scraper.source_name]['updated']} вакансій "
+            f"за {time.time() - start_time:.1f}с"
+        )
+
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Офлайн-перепарсинг архіву сторінок")
+    parser.add_argument("--source", help="Джерело (olx, pracuj)")
+    parser.add_argument("--days", type=int, help="Лише сторінки за останні N днів")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    reparse_all(source=args.source, days=args.days)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 """Планувальник задач для скрапінгу"""
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.interval import IntervalTrigger
+from typing import Callable, List, Optional, Set
 from datetime import datetime
+import asyncio
 import time
 import logging
 from config import settings
@@ -9,20 +11,43 @@ from database.database import SessionLocal
 from database.models import JobListing
 from scraper.scrapers.olx_scraper import OLXScraper
 from scraper.scrapers.pracuj_scraper import PracujScraper
+from scraper.enrichment import DetailEnricher
+from search.index import rebuild_search_index
+from search.ingest import on_jobs_changed
+from search.sampling import reshuffle_keys
+from search.cache import bump_search_generation, hit_rate
+from search.suggest import rebuild_suggestion_index
+from notifications.delivery import NotificationSender, queue_new_job_notifications
+from notifications.digest import DigestSender
+from notifications.ledger import get_delivery_ledger
 from sqlalchemy.orm import Session
 
 logger = logging.getLogger(__name__)
 
+# Як часто планувальник відмічається (перевірка готовності, /readyz)
+HEARTBEAT_SECONDS = 15
+
 
 class ScrapingScheduler:
     """Планувальник для автоматичного скрапінгу"""
     
-    def __init__(self):
+    def __init__(self, bot=None, on_scraped=None, is_leader: Callable[[], bool] = None):
         self.scheduler = AsyncIOScheduler()
+        # Перевірка оренди лідера перед кожним джерелом і пачкою розсилки
+        # (старий лідер не продовжує роботу поруч з новим)
+        self.is_leader = is_leader or (lambda: True)
         self.scrapers = [
             OLXScraper(),
             PracujScraper(),
         ]
+        self.enricher = DetailEnricher() if settings.LAZY_DETAIL_FETCH else None
+        # Без бота (скрипти) збіги з підписками лише ставляться в чергу
+        self.notifier = NotificationSender(bot, self.is_leader) if bot is not None else None
+        self.digests = DigestSender(bot, self.is_leader) if bot is not None else None
+        # Викликається після кожного скрапінгу (лідер повідомляє репліки, scraper/leader.py)
+        self.on_scraped = on_scraped
+        self.heartbeat: Optional[float] = None  # time.monotonic() останньої відмітки
+        self._tasks: Set[asyncio.Task] = set()  # задачі, що виконуються (скасовуються в stop)
     
     def start(self):
         """Запускає планувальник"""
@@ -32,55 +57,250 @@ class ScrapingScheduler:
         
         # Додаємо задачу скрапінгу до планувальника
         self.scheduler.add_job(
-            self.scrape_all,
+            self._tracked(self.scrape_all),
             trigger=IntervalTrigger(minutes=settings.SCRAPING_INTERVAL_MINUTES),
             id="scraping_job",
             replace_existing=True,
             max_instances=1  # Запобігає накладанню запусків
         )
         
+        # Фонове дозавантаження деталей (низький пріоритет)
+        if self.enricher:
+            self.scheduler.add_job(
+                self._tracked(self.enricher.fill_backlog),
+                trigger=IntervalTrigger(minutes=settings.DETAIL_FILL_INTERVAL_MINUTES),
+                id="detail_fill_job",
+                replace_existing=True,
+                max_instances=1
+            )
+        
+        # Підказки запитів з історії пошуку
+        self.scheduler.add_job(
+            self._tracked(self.rebuild_suggestions),
+            trigger=IntervalTrigger(minutes=settings.SUGGESTIONS_REBUILD_MINUTES),
+            id="suggestions_job",
+            replace_existing=True,
+            max_instances=1
+        )
+        
+        # Відправка сповіщень, що залишились у черзі (повтори після помилок)
+        if self.notifier:
+            self.scheduler.add_job(
+                self._tracked(self.deliver_notifications),
+                trigger=IntervalTrigger(seconds=settings.NOTIFY_DELIVERY_INTERVAL_SECONDS),
+                id="notifications_job",
+                replace_existing=True,
+                max_instances=1
+            )
+        
+        # Очищення журналу відправлених сповіщень
+        if self.notifier:
+            self.scheduler.add_job(
+                self._tracked(self.prune_ledger),
+                trigger=IntervalTrigger(hours=24),
+                id="ledger_prune_job",
+                replace_existing=True,
+                max_instances=1
+            )
+        
+        # Щоденні та щотижневі добірки
+        if self.digests:
+            self.scheduler.add_job(
+                self._tracked(self.send_digests),
+                trigger=IntervalTrigger(minutes=settings.DIGEST_CHECK_MINUTES),
+                id="digest_job",
+                replace_existing=True,
+                max_instances=1
+            )
+        
+        # Відмітка живості: задача виконується, лише якщо планувальник і event loop працюють
+        self.scheduler.add_job(
+            self.beat,
+            trigger=IntervalTrigger(seconds=HEARTBEAT_SECONDS),
+            id="heartbeat_job",
+            replace_existing=True,
+            max_instances=1
+        )
+        
         self.scheduler.start()
+        self.heartbeat = time.monotonic()
         logger.info(f"Планувальник скрапінгу запущено. Інтервал: {settings.SCRAPING_INTERVAL_MINUTES} хвилин")
     
     def stop(self):
-        """Зупиняє планувальник"""
-        self.scheduler.shutdown()
+        """Зупиняє планувальник і скасовує задачі, що ще виконуються"""
+        if self.scheduler.running:
+            self.scheduler.shutdown(wait=False)
+        for task in list(self._tasks):
+            task.cancel()
         logger.info("Планувальник скрапінгу зупинено")
     
+    def _tracked(self, func):
+        """Обгортка задачі: поки вона виконується, її можна скасувати через stop()"""
+        async def run(*args, **kwargs):
+            task = asyncio.current_task()
+            self._tasks.add(task)
+            try:
+                return await func(*args, **kwargs)
+            finally:
+                self._tasks.discard(task)
+        run.__name__ = getattr(func, "__name__", "job")
+        return run
+    
+    def run_scrape(self) -> asyncio.Task:
+        """Позачерговий скрапінг (/update_jobs) у задачі, яку скасує stop()"""
+        return asyncio.create_task(self._tracked(self.scrape_all)())
+    
+    async def beat(self):
+        """Відмітка живості планувальника"""
+        self.heartbeat = time.monotonic()
+    
+    async def rebuild_suggestions(self):
+        """Перебудовує дерево підказок запитів з search_history"""
+        def rebuild():
+            db = SessionLocal()
+            try:
+                rebuild_suggestion_index(db)
+            finally:
+                db.close()
+        
+        try:
+            await asyncio.to_thread(rebuild)
+        except Exception as e:
+            logger.error(f"Помилка при перебудові підказок пошуку: {e}")
+    
+    async def deliver_notifications(self):
+        """Відправляє сповіщення про нові вакансії з черги"""
+        try:
+            await self.notifier.deliver_pending()
+        except Exception as e:
+            logger.error(f"Помилка при відправці сповіщень: {e}")
+    
+    async def prune_ledger(self):
+        """Видаляє старі записи журналу відправлених сповіщень"""
+        def prune():
+            db = SessionLocal()
+            try:
+                return get_delivery_ledger().prune(db)
+            finally:
+                db.close()
+        
+        try:
+            deleted = await asyncio.to_thread(prune)
+            if deleted:
+                logger.info(f"З журналу сповіщень видалено {deleted} старих записів")
+        except Exception as e:
+            logger.error(f"Помилка при очищенні журналу сповіщень: {e}")
+    
+    async def send_digests(self):
+        """Відправляє добірки, час яких настав"""
+        try:
+            await self.digests.send_due_digests()
+        except Exception as e:
+            logger.error(f"Помилка при відправці добірок: {e}")
+    
     async def scrape_all(self):
         """Запускає скрапінг для всіх джерел"""
         start_time = time.time()
         logger.info("Початок скрапінгу вакансій...")
         
         for scraper in self.scrapers:
+            if not self.is_leader():
+                logger.warning("Інстанс більше не лідер, скрапінг перервано")
+                return
             try:
                 await self.scrape_source(scraper)
             except Exception as e:
                 logger.error(f"Помилка при скрапінгу {scraper.source_name}: {e}")
         
+        if self.is_leader():
+            await self.reshuffle()
+        
+        if self.on_scraped:
+            await self.on_scraped()
+        
+        if self.notifier:
+            await self.deliver_notifications()
+        
         elapsed = time.time() - start_time
         logger.info(f"Скрапінг завершено за {elapsed:.1f} секунд")
+        logger.info(f"Кеш результатів пошуку: {hit_rate():.0%} влучань")
+        
+        # Чистимо архів сторінок за політикою зберігання
+        if settings.ARCHIVE_ENABLED:
+            from scraper.archive import PageArchive
+            try:
+                await asyncio.to_thread(PageArchive().prune)
+            except Exception as e:
+                logger.error(f"Помилка при очищенні архіву сторінок: {e}")
+    
+    async def reshuffle(self):
+        """Нова перестановка випадкового порядку для нового покоління результатів"""
+        def run():
+            db = SessionLocal()
+            try:
+                count = reshuffle_keys(db)
+                # Ключі змінились у всіх активних вакансій - індекс дешевше побудувати заново
+                rebuild_search_index(db)
+                return count
+            finally:
+                db.close()
+        
+        try:
+            count = await asyncio.to_thread(run)
+            bump_search_generation()
+            logger.info(f"Випадковий порядок оновлено для {count} вакансій")
+        except Exception as e:
+            logger.error(f"Помилка при оновленні випадкового порядку: {e}")
+    
+    @staticmethod
+    def after_commit(touched_ids: List[int], new_ids: List[int]):
+        """Оновлює пошукові структури та ставить сповіщення в чергу (блокуючий, власна сесія)"""
+        db = SessionLocal()
+        try:
+            # Оновлюємо пошукові індекси для змінених вакансій
+            on_jobs_changed(db, touched_ids)
+            # Закешовані результати пошуку більше не актуальні
+            bump_search_generation()
+            
+            # Збіги нових вакансій з підписками - у чергу сповіщень
+            try:
+                queue_new_job_notifications(db, new_ids)
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Помилка при зіставленні вакансій з підписками: {e}")
+        finally:
+            db.close()
     
     async def scrape_source(self, scraper):
         """Скрапить одне джерело"""
         source_start = time.time()
         logger.info(f"Скрапінг {scraper.source_name}...")
         
-        import asyncio
         # Отримуємо вакансії у окремому потоці, щоб не блокувати event loop
         jobs = await asyncio.to_thread(scraper.fetch_jobs, max_pages=3)
+        if not self.is_leader():
+            # Поки завантажували сторінки, роль перейшла до іншої репліки
+            logger.warning(f"Інстанс більше не лідер, вакансії {scraper.source_name} не збережено")
+            return
         
         new_jobs_count = 0
         updated_jobs_count = 0
         seen_urls = set()  # Уникальність в межах одного батчу
+        touched_jobs = []  # Нові та оновлені вакансії для індексації
+        new_jobs = []  # Нові вакансії для зіставлення з підписками
         
         # Використовуємо SessionLocal напряму з контекстним менеджером
         db = SessionLocal()
         try:
             for job_data in jobs:
                 try:
-                    # Парсимо деталі у окремому потоці
-                    normalized_job = await asyncio.to_thread(scraper.parse_job, job_data)
+                    if self.enricher:
+                        # Лінивий режим: зберігаємо дані картки, деталі - при першому перегляді
+                        normalized_job = scraper.normalize_data(job_data)
+                    else:
+                        # Парсимо деталі у окремому потоці
+                        normalized_job = await asyncio.to_thread(scraper.parse_job, job_data)
+                        normalized_job['details_fetched_at'] = datetime.utcnow()
                     
                     url = normalized_job.get('url')
                     if not url or url in seen_urls:
@@ -96,14 +316,20 @@ class ScrapingScheduler:
                     if existing_job:
                         # Оновлюємо існуючу
                         for key, value in normalized_job.items():
+                            # Не затираємо повний опис коротким описом з картки
+                            if key == 'description' and self.enricher and existing_job.details_fetched_at:
+                                continue
                             if hasattr(existing_job, key) and value:
                                 setattr(existing_job, key, value)
                         existing_job.scraped_at = datetime.utcnow()
+                        touched_jobs.append(existing_job)
                         updated_jobs_count += 1
                     else:
                         # Створюємо нову
                         new_job = JobListing(**normalized_job)
                         db.add(new_job)
+                        touched_jobs.append(new_job)
+                        new_jobs.append(new_job)
                         new_jobs_count += 1
                     
                 except Exception as e:
@@ -111,6 +337,12 @@ class ScrapingScheduler:
                     continue
             
             db.commit()
+            
+            # Індекси та збіги з підписками - у потоці, щоб не зупиняти обробку оновлень
+            await asyncio.to_thread(
+                self.after_commit, [job.id for job in touched_jobs], [job.id for job in new_jobs]
+            )
+            
             elapsed = time.time() - source_start
             logger.info(
                 f"{scraper.source_name}: додано {new_jobs_count} нових, "
@@ -23,22 +23,12 @@ class OLXScraper(BaseScraper):
         try:
             for page in range(1, max_pages + 1):
                 url = f"{self.jobs_url}?page={page}"
-                html = self.fetch_page(url)
+                html = self.fetch_page(url, kind="list")
                 
                 if not html:
                     continue
                 
-                soup = self.parse_html(html)
-                job_elements = soup.find_all('div', {'data-cy': 'l-card'})
-                
-                for element in job_elements:
-                    try:
-                        job_data = self._extract_job_data(element)
-                        if job_data:
-                            jobs.append(job_data)
-                    except Exception as e:
-                        logger.error(f"Помилка при парсингу вакансії: {e}")
-                        continue
+                jobs.extend(self.parse_list_page(html))
                 
                 # Затримка між сторінками
                 import time
@@ -49,6 +39,23 @@ class OLXScraper(BaseScraper):
         
         return jobs
     
+    def parse_list_page(self, html: str) -> List[Dict]:
+        """Витягує вакансії зі сторінки списку OLX"""
+        jobs = []
+        soup = self.parse_html(html)
+        job_elements = soup.find_all('div', {'data-cy': 'l-card'})
+        
+        for element in job_elements:
+            try:
+                job_data = self._extract_job_data(element)
+                if job_data:
+                    jobs.append(job_data)
+            except Exception as e:
+                logger.error(f"Помилка при парсингу вакансії: {e}")
+                continue
+        
+        return jobs
+    
     def _extract_job_data(self, element) -> Dict:
         """Витягує дані вакансії з елемента"""
         try:
@@ -106,10 +113,11 @@ class OLXScraper(BaseScraper):
             logger.error(f"Помилка при витягуванні даних: {e}")
             return None
     
-    def parse_job(self, job_data: Dict) -> Dict:
+    def parse_job(self, job_data: Dict, html: str = None) -> Dict:
         """Парсить деталі вакансії"""
         # Отримуємо детальну сторінку
-        html = self.fetch_page(job_data['url'])
+        if html is None:
+            html = self.fetch_page(job_data['url'])
         
         if html:
             soup = self.parse_html(html)
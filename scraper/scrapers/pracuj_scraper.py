@@ -25,14 +25,13 @@ class PracujScraper(BaseScraper):
             url = f"{self.jobs_url}?pn={page}" if page > 1 else self.jobs_url
             
             logger.info(f"Отримання сторінки {page}: {url}")
-            html = self.fetch_page(url)
+            html = self.fetch_page(url, kind="list")
             
             if not html:
                 logger.warning(f"Не вдалося отримати сторінку {page}")
                 break
             
-            # Шукаємо JSON дані Next.js
-            jobs = self._extract_jobs_from_nextjs(html)
+            jobs = self.parse_list_page(html)
             
             if not jobs:
                 logger.warning(f"Не знайдено вакансій на сторінці {page}")
@@ -43,6 +42,11 @@ class PracujScraper(BaseScraper):
         
         return all_jobs
     
+    def parse_list_page(self, html: str) -> List[Dict]:
+        """Витягує вакансії зі сторінки списку Pracuj.pl"""
+        # Шукаємо JSON дані Next.js
+        return self._extract_jobs_from_nextjs(html)
+    
     def _extract_jobs_from_nextjs(self, html: str) -> List[Dict]:
         """Витягує вакансії з Next.js JSON"""
         try:
@@ -186,10 +190,11 @@ class PracujScraper(BaseScraper):
         
         return jobs
     
-    def parse_job(self, job_data: Dict) -> Dict:
+    def parse_job(self, job_data: Dict, html: str = None) -> Dict:
         """Парсить деталі вакансії"""
         # Отримуємо детальну сторінку
-        html = self.fetch_page(job_data['url'])
+        if html is None:
+            html = self.fetch_page(job_data['url'])
         
         if html:
             # Спробуємо витягнути з JSON
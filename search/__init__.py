@@ -0,0 +1,23 @@
+"""Пошук вакансій: нормалізація тексту, повнотекстовий індекс, фільтри"""
+from .text import fold_text, tokenize
+from .query import apply_filters, apply_text_search, build_search_query, fetch_window
+from .cursor import ResultCursor, ORDER_RECENT, ORDER_RANDOM, ORDER_RELEVANCE
+from .index import get_search_index, rebuild_search_index
+from .cache import get_result_cache, bump_search_generation
+
+__all__ = [
+    'fold_text',
+    'tokenize',
+    'apply_filters',
+    'apply_text_search',
+    'build_search_query',
+    'fetch_window',
+    'ResultCursor',
+    'ORDER_RECENT',
+    'ORDER_RANDOM',
+    'ORDER_RELEVANCE',
+    'get_search_index',
+    'rebuild_search_index',
+    'get_result_cache',
+    'bump_search_generation'
+]
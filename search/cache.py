@@ -0,0 +1,185 @@
+"""Кеш вікон результатів пошуку
+
+Багато користувачів виконують однакові пошуки (ті самі фільтри, порожні
+ключові слова), тому вікно результатів (id + курсор наступного вікна)
+кешується за нормалізованими фільтрами, текстом запиту та позицією курсора.
+
+Інвалідація - через лічильник поколінь: він входить у ключ, а планувальник
+збільшує його після кожного скрапінгу, тому старі записи просто перестають
+читатись і витісняються LRU/TTL. З REDIS_URL кеш і покоління спільні для всіх
+процесів, інакше - LRU у пам'яті процесу.
+"""
+from typing import Dict, List, Optional, Tuple
+from collections import OrderedDict
+import json
+import logging
+import threading
+import time
+from sqlalchemy.orm import Session
+from config import settings
+from database.redis_client import get_redis
+from monitoring.metrics import registry
+from search.cursor import ResultCursor
+from search.query import RESULT_WINDOW_SIZE, fetch_window
+from search.lexicon import expand_query
+from search.text import parse_keywords
+
+logger = logging.getLogger(__name__)
+
+REDIS_PREFIX = "search:"
+GENERATION_KEY = REDIS_PREFIX + "generation"
+
+_hits = registry.counter("search_cache_hits_total", "Вікна результатів, віддані з кешу")
+_misses = registry.counter("search_cache_misses_total", "Вікна результатів, обчислені запитом")
+
+
+def hit_rate() -> float:
+    """Частка звернень до кешу, що завершились влучанням"""
+    total = _hits.value + _misses.value
+    return _hits.value / total if total else 0.0
+
+
+registry.gauge("search_cache_hit_ratio", "Частка влучань у кеш результатів пошуку", hit_rate)
+
+
+def canonical_search(filters_dict: Dict, query_text: str = None) -> str:
+    """
+    Нормалізоване представлення пошуку для ключа кешу
+
+    Порожні фільтри відкидаються, зарплата приводиться до числа, текст і
+    ключові слова - до розгорнутих груп токенів (так їх інтерпретує пошук),
+    тому "Kraków" і "krakow " дають однаковий ключ.
+    """
+    canonical = {}
+    for field in ("city", "category", "employment_type"):
+        if filters_dict.get(field):
+            canonical[field] = filters_dict[field]
+
+    if filters_dict.get("city") and filters_dict.get("radius_km"):
+        try:
+            canonical["radius_km"] = float(filters_dict["radius_km"])
+        except (ValueError, TypeError):
+            pass
+
+    if filters_dict.get("salary_min"):
+        try:
+            canonical["salary_min"] = float(filters_dict["salary_min"])
+        except (ValueError, TypeError):
+            pass
+
+    keywords = sorted(
+        [list(group) for group in expand_query(kw)] for kw in parse_keywords(filters_dict.get("keywords"))
+    )
+    if keywords:
+        canonical["keywords"] = keywords
+    if query_text:
+        canonical["query"] = [list(group) for group in expand_query(query_text)]
+
+    return json.dumps(canonical, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+
+
+class ResultCache:
+    """LRU + TTL кеш вікон результатів з інвалідацією поколіннями"""
+
+    def __init__(self, max_size: int = None, ttl: int = None):
+        self.max_size = max_size or settings.SEARCH_CACHE_SIZE
+        self.ttl = ttl or settings.SEARCH_CACHE_TTL_SECONDS
+        self._entries: "OrderedDict[str, Tuple[float, list]]" = OrderedDict()
+        self._generation = 0
+        self._lock = threading.Lock()
+
+    # --- Покоління ---
+
+    @property
+    def generation(self) -> int:
+        redis = get_redis()
+        if redis is not None:
+            try:
+                return int(redis.get(GENERATION_KEY) or 0)
+            except Exception as e:
+                logger.warning(f"Помилка читання покоління кешу з Redis: {e}")
+        return self._generation
+
+    def bump_generation(self) -> int:
+        """Робить усі закешовані результати застарілими"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+        redis = get_redis()
+        if redis is not None:
+            try:
+                return int(redis.incr(GENERATION_KEY))
+            except Exception as e:
+                logger.warning(f"Помилка оновлення покоління кешу в Redis: {e}")
+        return self._generation
+
+    # --- Сховище ---
+
+    def _get(self, key: str) -> Optional[list]:
+        redis = get_redis()
+        if redis is not None:
+            try:
+                raw = redis.get(REDIS_PREFIX + key)
+                return json.loads(raw) if raw else None
+            except Exception as e:
+                logger.warning(f"Помилка читання кешу з Redis: {e}")
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def _set(self, key: str, value: list):
+        redis = get_redis()
+        if redis is not None:
+            try:
+                redis.setex(REDIS_PREFIX + key, self.ttl, json.dumps(value))
+                return
+            except Exception as e:
+                logger.warning(f"Помилка запису кешу в Redis: {e}")
+
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    # --- Пошук ---
+
+    def fetch_window(self, db: Session, filters_dict: Dict, query_text: str = None,
+                     cursor: ResultCursor = None,
+                     limit: int = RESULT_WINDOW_SIZE) -> Tuple[List[int], Optional[ResultCursor]]:
+        """search.query.fetch_window з кешуванням результату"""
+        if cursor is None:
+            return fetch_window(db, filters_dict, query_text, cursor, limit)
+
+        key = f"{self.generation}|{canonical_search(filters_dict, query_text)}|{cursor.encode()}|{limit}"
+        cached = self._get(key)
+        if cached is not None:
+            _hits.inc()
+            job_ids, next_token = cached
+            return job_ids, ResultCursor.decode(next_token)
+
+        _misses.inc()
+        job_ids, next_cursor = fetch_window(db, filters_dict, query_text, cursor, limit)
+        self._set(key, [job_ids, next_cursor.encode() if next_cursor else None])
+        return job_ids, next_cursor
+
+
+_result_cache = ResultCache()
+
+
+def get_result_cache() -> ResultCache:
+    """Повертає кеш результатів процесу"""
+    return _result_cache
+
+
+def bump_search_generation() -> int:
+    """Інвалідує кеш результатів (викликається після commit нових вакансій)"""
+    return _result_cache.bump_generation()
@@ -0,0 +1,109 @@
+"""Keyset-курсори для посторінкового перегляду результатів пошуку
+
+Замість знімка з фіксованою кількістю id зберігається позиція останнього
+показаного результату. Наступне вікно читається з цієї позиції, тому
+результати не обмежені, а кожен запит читає лише кілька рядків.
+
+Порядки:
+    recent    - (published_date DESC NULLS LAST, id DESC)
+    random    - (shuffle_key, id), починаючи з випадкової точки pivot з переходом
+                через початок
+    relevance - (оцінка BM25 DESC, id DESC), лише in-memory індекс; pivot - час
+                оцінювання, ключ - зсув у збереженому ранжуванні
+"""
+from typing import Optional
+from datetime import datetime, timedelta
+from search.sampling import random_pivot
+
+ORDER_RECENT = "recent"
+ORDER_RANDOM = "random"
+ORDER_RELEVANCE = "relevance"
+# Однолітерні коди порядків у закодованому курсорі
+_ORDER_CODES = {ORDER_RECENT: "d", ORDER_RANDOM: "r", ORDER_RELEVANCE: "s"}
+_CODE_ORDERS = {code: order for order, code in _ORDER_CODES.items()}
+
+EPOCH = datetime(1970, 1, 1)
+# Ключ для вакансій без дати публікації (менший за будь-яку дату)
+NULL_DATE_KEY = -1
+
+
+def date_key(value: Optional[datetime]) -> int:
+    """Дата публікації -> ціле число мікросекунд (точне порівняння без float)"""
+    if value is None:
+        return NULL_DATE_KEY
+    delta = value.replace(tzinfo=None) - EPOCH
+    return (delta.days * 86400 + delta.seconds) * 1_000_000 + delta.microseconds
+
+
+def key_to_date(key: int) -> Optional[datetime]:
+    """Зворотне перетворення до date_key"""
+    if key == NULL_DATE_KEY:
+        return None
+    return EPOCH + timedelta(microseconds=key)
+
+
+def _to36(value: int) -> str:
+    """Ціле число -> base36 (з підтримкою від'ємних)"""
+    if value < 0:
+        return "-" + _to36(-value)
+    digits = "0123456789abcdefghijklmnopqrstuvwxyz"
+    result = ""
+    while True:
+        value, rem = divmod(value, 36)
+        result = digits[rem] + result
+        if not value:
+            return result
+
+
+class ResultCursor:
+    """Позиція в упорядкованому наборі результатів"""
+
+    def __init__(self, order: str, pivot: int = None, last_key: int = None, last_id: int = None):
+        self.order = order
+        self.pivot = pivot          # точка старту для random, час оцінювання для relevance
+        self.last_key = last_key    # date_key, shuffle_key або зсув у ранжуванні
+        self.last_id = last_id
+
+    @property
+    def started(self) -> bool:
+        """Чи вже показано хоча б один результат"""
+        return self.last_id is not None
+
+    @classmethod
+    def start(cls, order: str) -> "ResultCursor":
+        """Курсор на початку результатів"""
+        if order == ORDER_RANDOM:
+            return cls(order, pivot=random_pivot())
+        return cls(order if order == ORDER_RELEVANCE else ORDER_RECENT)
+
+    def advance(self, last_key: int, last_id: int) -> "ResultCursor":
+        """Курсор після вказаного результату"""
+        return ResultCursor(self.order, self.pivot, last_key, last_id)
+
+    def encode(self) -> str:
+        """Компактне текстове представлення, напр. 'd.k2x9f1.3kq' або 'r.1bz4.9xx.3kq'"""
+        parts = [_ORDER_CODES[self.order]]
+        if self.order == ORDER_RANDOM or (self.order == ORDER_RELEVANCE and self.pivot is not None):
+            parts.append(_to36(self.pivot))
+        if self.started:
+            parts += [_to36(self.last_key), _to36(self.last_id)]
+        return ".".join(parts)
+
+    @classmethod
+    def decode(cls, token: str) -> Optional["ResultCursor"]:
+        """Розбирає курсор; None якщо рядок пошкоджений"""
+        if not token:
+            return None
+        try:
+            parts = token.split(".")
+            order = _CODE_ORDERS[parts[0]]
+            pivot = None
+            # relevance без pivot - курсор старого формату (ключ - оцінка)
+            if order == ORDER_RANDOM or (order == ORDER_RELEVANCE and len(parts) in (2, 4)):
+                pivot = int(parts[1], 36)
+                parts = parts[1:]
+            if len(parts) == 3:
+                return cls(order, pivot, int(parts[1], 36), int(parts[2], 36))
+            return cls(order, pivot)
+        except (ValueError, IndexError, KeyError):
+            return None
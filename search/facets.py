@@ -0,0 +1,115 @@
+"""Матеріалізовані лічильники фасетів для клавіатур фільтрів
+
+Таблиця job_facet_counts зберігає кількість активних вакансій для кожної
+комбінації (місто, категорія, тип зайнятості). Комбінацій небагато, тому
+клавіатура читає всю таблицю одним запитом і рахує кількості для кнопок
+з урахуванням уже вибраних фільтрів. Ingest оновлює лише комбінації, яких
+торкнулися змінені вакансії.
+"""
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+import logging
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+from database.models import JobFacetCount, JobListing
+
+logger = logging.getLogger(__name__)
+
+FACET_FIELDS = ('city', 'category', 'employment_type')
+# Більше комбінацій за раз - дешевше перерахувати таблицю повністю
+MAX_INCREMENTAL_KEYS = 200
+
+FacetKey = Tuple[str, str, str]
+
+
+def _grouped_counts(db: Session, keys: Optional[Set[FacetKey]] = None) -> List[Tuple[str, str, str, int]]:
+    """Кількість активних вакансій за комбінаціями (усіма або вказаними)"""
+    columns = [func.coalesce(getattr(JobListing, field), '') for field in FACET_FIELDS]
+    query = db.query(*columns, func.count(JobListing.id)).filter(JobListing.is_active == True)
+    if keys is not None:
+        query = query.filter(or_(*[
+            and_(*[column == value for column, value in zip(columns, key)]) for key in keys
+        ]))
+    return query.group_by(*columns).all()
+
+
+def rebuild_facet_counts(db: Session):
+    """Повністю перераховує таблицю лічильників"""
+    rows = _grouped_counts(db)
+    db.query(JobFacetCount).delete(synchronize_session=False)
+    db.bulk_insert_mappings(JobFacetCount, [
+        {'city': city, 'category': category, 'employment_type': employment_type, 'job_count': count}
+        for city, category, employment_type, count in rows
+    ])
+    db.commit()
+
+
+def update_facet_counts(db: Session, job_ids: Iterable[int], old_keys: Optional[Iterable[FacetKey]] = None):
+    """
+    Оновлює лічильники після зміни вакансій
+
+    Args:
+        job_ids: Змінені вакансії (вже після commit)
+        old_keys: Комбінації цих вакансій до зміни (з in-memory індексу);
+            None - невідомі, тоді таблиця перераховується повністю
+    """
+    job_ids = list(job_ids)
+    if old_keys is None:
+        rebuild_facet_counts(db)
+        return
+
+    keys = set(old_keys)
+    columns = [func.coalesce(getattr(JobListing, field), '') for field in FACET_FIELDS]
+    for start in range(0, len(job_ids), 500):
+        keys.update(
+            tuple(row) for row in db.query(*columns)
+            .filter(JobListing.id.in_(job_ids[start:start + 500]), JobListing.is_active == True)
+        )
+    if not keys:
+        return
+    if len(keys) > MAX_INCREMENTAL_KEYS:
+        rebuild_facet_counts(db)
+        return
+
+    counts = {tuple(row[:3]): row[3] for row in _grouped_counts(db, keys)}
+    db.query(JobFacetCount).filter(or_(*[
+        and_(JobFacetCount.city == city, JobFacetCount.category == category,
+             JobFacetCount.employment_type == employment_type)
+        for city, category, employment_type in keys
+    ])).delete(synchronize_session=False)
+    db.bulk_insert_mappings(JobFacetCount, [
+        {'city': city, 'category': category, 'employment_type': employment_type, 'job_count': count}
+        for (city, category, employment_type), count in counts.items()
+    ])
+    db.commit()
+
+
+class FacetCounts:
+    """Знімок таблиці лічильників"""
+
+    def __init__(self, rows: List[Tuple[str, str, str, int]]):
+        self.rows = rows
+
+    def counts_for(self, field: str, filters_dict: Dict) -> Dict[str, int]:
+        """
+        Кількість вакансій для кожного значення поля з урахуванням інших фільтрів
+
+        Наприклад, для міста при вибраній категорії IT - кількість IT-вакансій у кожному місті.
+        """
+        target = FACET_FIELDS.index(field)
+        conditions = [
+            (i, filters_dict[other]) for i, other in enumerate(FACET_FIELDS)
+            if other != field and filters_dict.get(other)
+        ]
+        counts: Dict[str, int] = {}
+        for row in self.rows:
+            if all(row[i] == value for i, value in conditions):
+                counts[row[target]] = counts.get(row[target], 0) + row[3]
+        counts.pop('', None)
+        return counts
+
+
+def load_facet_counts(db: Session) -> FacetCounts:
+    """Читає таблицю лічильників одним запитом"""
+    return FacetCounts(db.query(
+        JobFacetCount.city, JobFacetCount.category, JobFacetCount.employment_type, JobFacetCount.job_count
+    ).all())
@@ -0,0 +1,138 @@
+"""Повнотекстовий індекс вакансій
+
+PostgreSQL: згенерована колонка tsvector (конфігурація 'simple') з GIN-індексом.
+SQLite: shadow-таблиця FTS5 з rowid = job_listings.id.
+
+В обох випадках індексується job_listings.search_text - текст, нормалізований
+в Python (нижній регістр, без діакритики), тому "wroclaw" знаходить "Wrocław",
+а запит з префіксами ("kierow") знаходить "kierowca". Колонку search_text та
+FTS5-таблицю оновлює ingest (index_jobs), а не тригери. Структури індексу
+створює міграція 7a3c9e1f2b40.
+"""
+from typing import Iterable, Tuple
+import logging
+from sqlalchemy import column, func, inspect, literal_column, select, table
+from sqlalchemy.orm import Session
+from database.models import JobListing
+from search.lexicon import expand_query
+from search.text import build_search_text
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = "job_listings_fts"
+# Розмір пачки при індексації
+INDEX_BATCH_SIZE = 500
+# Максимальна кількість токенів у запиті
+MAX_QUERY_TOKENS = 8
+
+_fts_table = table(FTS_TABLE, column("rowid"), column("search_text"))
+
+# Кеш перевірки наявності індексу: {dialect_name: bool}
+_fts_available = {}
+
+
+def is_fts_available(db: Session) -> bool:
+    """Перевіряє чи створено повнотекстовий індекс для поточної БД"""
+    bind = db.get_bind()
+    dialect = bind.dialect.name
+    if dialect not in _fts_available:
+        inspector = inspect(bind)
+        if dialect == "postgresql":
+            columns = {c["name"] for c in inspector.get_columns("job_listings")}
+            _fts_available[dialect] = "search_vector" in columns
+        elif dialect == "sqlite":
+            _fts_available[dialect] = inspector.has_table(FTS_TABLE)
+        else:
+            _fts_available[dialect] = False
+    return _fts_available[dialect]
+
+
+def index_jobs(db: Session, job_ids: Iterable[int]):
+    """
+    Оновлює search_text та FTS-індекс для вказаних вакансій
+
+    Викликається ingest-ом після commit нових/оновлених вакансій.
+    """
+    job_ids = list(job_ids)
+    use_fts5 = db.get_bind().dialect.name == "sqlite" and is_fts_available(db)
+
+    for start in range(0, len(job_ids), INDEX_BATCH_SIZE):
+        batch = job_ids[start:start + INDEX_BATCH_SIZE]
+        rows = db.query(
+            JobListing.id, JobListing.title, JobListing.company, JobListing.description
+        ).filter(JobListing.id.in_(batch)).all()
+
+        mappings = [
+            {'id': row.id, 'search_text': build_search_text(row.title, row.company, row.description)}
+            for row in rows
+        ]
+        if not mappings:
+            continue
+
+        db.bulk_update_mappings(JobListing, mappings)
+
+        if use_fts5:
+            db.execute(_fts_table.delete().where(_fts_table.c.rowid.in_([m['id'] for m in mappings])))
+            db.execute(
+                _fts_table.insert(),
+                [{'rowid': m['id'], 'search_text': m['search_text']} for m in mappings]
+            )
+
+    db.commit()
+
+
+def backfill_index(db: Session) -> int:
+    """Індексує вакансії, які ще не мають search_text (після оновлення схеми)"""
+    total = 0
+    while True:
+        job_ids = [
+            row.id for row in db.query(JobListing.id)
+            .filter(JobListing.search_text.is_(None))
+            .limit(INDEX_BATCH_SIZE).all()
+        ]
+        if not job_ids:
+            break
+        index_jobs(db, job_ids)
+        total += len(job_ids)
+
+    if total:
+        logger.info(f"Проіндексовано {total} вакансій")
+    return total
+
+
+def _query_groups(query_text: str) -> Tuple[Tuple[str, ...], ...]:
+    """Групи альтернатив запиту (обмежена кількість токенів)"""
+    return expand_query(query_text)[:MAX_QUERY_TOKENS]
+
+
+def match_clause(db: Session, query_text: str):
+    """
+    Умова повнотекстового пошуку з префіксним збігом кожного токена (AND)
+
+    Токен збігається, якщо збігся він сам або один з його перекладів
+    (search.lexicon) - альтернативи об'єднуються через OR в одному запиті.
+
+    Returns:
+        SQLAlchemy-вираз або None, якщо індекс недоступний чи запит порожній
+    """
+    groups = _query_groups(query_text)
+    if not groups or not is_fts_available(db):
+        return None
+
+    dialect = db.get_bind().dialect.name
+    if dialect == "postgresql":
+        ts_query = " & ".join(
+            "(" + " | ".join(f"{token}:*" for token in group) + ")" for group in groups
+        )
+        return literal_column("job_listings.search_vector").op("@@")(
+            func.to_tsquery("simple", ts_query)
+        )
+
+    fts_query = " AND ".join(
+        "(" + " OR ".join(f'"{token}"*' for token in group) + ")" for group in groups
+    )
+    matching_ids = select(_fts_table.c.rowid).where(
+        literal_column(FTS_TABLE).op("MATCH")(fts_query)
+    )
+    return JobListing.id.in_(matching_ids)
+
@@ -0,0 +1,164 @@
+"""Геокодування міст та пошук у радіусі
+
+Довідник міст Польщі з координатами поставляється разом з кодом
+(search/data/pl_cities.csv), тому геокодування працює офлайн: локація
+вакансії зіставляється з назвами та синонімами міст і отримує канонічний
+city_id. Для кожного міста заздалегідь обчислюється впорядкований за
+відстанню список сусідів, тому фільтр "в межах N км" - це бінарний пошук у
+списку, а не haversine для кожного рядка.
+"""
+from typing import Dict, List, Optional, Set
+from bisect import bisect_right
+import csv
+import logging
+import math
+import os
+from sqlalchemy.orm import Session
+from database.models import JobListing
+from search.text import tokenize
+
+logger = logging.getLogger(__name__)
+
+CITIES_FILE = os.path.join(os.path.dirname(__file__), "data", "pl_cities.csv")
+# city_id вакансій, локацію яких не вдалося геокодувати
+UNKNOWN_CITY_ID = 0
+# Варіанти радіуса для клавіатури фільтрів, км
+RADIUS_OPTIONS = (0, 25, 50, 100)
+# Найдовша назва міста у токенах ("Gorzów Wielkopolski" - 2, з синонімами - до 3)
+MAX_NAME_TOKENS = 3
+EARTH_RADIUS_KM = 6371.0
+# Розмір пачки при заповненні city_id
+BACKFILL_BATCH_SIZE = 1000
+
+
+class City:
+    """Місто з довідника"""
+
+    __slots__ = ("id", "name", "name_uk", "lat", "lon")
+
+    def __init__(self, city_id: int, name: str, name_uk: str, lat: float, lon: float):
+        self.id = city_id
+        self.name = name
+        self.name_uk = name_uk
+        self.lat = lat
+        self.lon = lon
+
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Відстань між точками по поверхні Землі, км"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    d_phi = phi2 - phi1
+    d_lambda = math.radians(lon2 - lon1)
+    a = math.sin(d_phi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(d_lambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+
+class CityGazetteer:
+    """Довідник міст: геокодування назв та сусіди за відстанню"""
+
+    def __init__(self, path: str = CITIES_FILE):
+        self.cities: Dict[int, City] = {}
+        self._aliases: Dict[str, int] = {}
+        with open(path, encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                city = City(int(row["id"]), row["name"], row["name_uk"], float(row["lat"]), float(row["lon"]))
+                self.cities[city.id] = city
+                names = [city.name, city.name_uk] + [a for a in (row.get("aliases") or "").split("|") if a]
+                for name in names:
+                    self._aliases.setdefault(" ".join(tokenize(name)), city.id)
+
+        # Сусіди кожного міста: відстані (для bisect) та id у тому ж порядку
+        self._neighbour_distances: Dict[int, List[float]] = {}
+        self._neighbour_ids: Dict[int, List[int]] = {}
+        for city in self.cities.values():
+            neighbours = sorted(
+                (haversine_km(city.lat, city.lon, other.lat, other.lon), other.id)
+                for other in self.cities.values()
+            )
+            self._neighbour_distances[city.id] = [distance for distance, _ in neighbours]
+            self._neighbour_ids[city.id] = [other_id for _, other_id in neighbours]
+
+    def geocode(self, location: str) -> Optional[City]:
+        """
+        Знаходить місто в тексті локації
+
+        Перевіряються послідовності токенів від найдовших, тому "Ruda Śląska"
+        не плутається з іншими назвами, а "Wrocław, Krzyki" дає Вроцлав.
+        """
+        tokens = tokenize(location or "")
+        for size in range(min(MAX_NAME_TOKENS, len(tokens)), 0, -1):
+            for start in range(len(tokens) - size + 1):
+                city_id = self._aliases.get(" ".join(tokens[start:start + size]))
+                if city_id is not None:
+                    return self.cities[city_id]
+        return None
+
+    def by_name(self, name: str) -> Optional[City]:
+        """Місто за точною назвою (польською, українською або синонімом)"""
+        city_id = self._aliases.get(" ".join(tokenize(name or "")))
+        return self.cities.get(city_id) if city_id is not None else None
+
+    def within(self, city_id: int, radius_km: float) -> List[int]:
+        """id міст у радіусі від міста (включно з ним самим)"""
+        distances = self._neighbour_distances.get(city_id)
+        if distances is None:
+            return []
+        return self._neighbour_ids[city_id][:bisect_right(distances, radius_km)]
+
+
+_gazetteer: Optional[CityGazetteer] = None
+
+
+def get_gazetteer() -> CityGazetteer:
+    """Довідник міст (завантажується при першому зверненні)"""
+    global _gazetteer
+    if _gazetteer is None:
+        _gazetteer = CityGazetteer()
+    return _gazetteer
+
+
+def radius_city_ids(filters_dict: Dict) -> Optional[Set[int]]:
+    """
+    id міст для фільтра "місто + радіус"
+
+    Returns:
+        Набір city_id або None, якщо радіус не задано чи місто невідоме
+        (тоді діє звичайний фільтр за назвою міста)
+    """
+    if not filters_dict.get("city") or not filters_dict.get("radius_km"):
+        return None
+    try:
+        radius_km = float(filters_dict["radius_km"])
+    except (ValueError, TypeError):
+        return None
+    city = get_gazetteer().by_name(filters_dict["city"])
+    if city is None:
+        return None
+    return set(get_gazetteer().within(city.id, radius_km))
+
+
+def backfill_city_ids(db: Session) -> int:
+    """Геокодує вакансії, створені до появи city_id"""
+    gazetteer = get_gazetteer()
+    total = 0
+    while True:
+        rows = db.query(JobListing.id, JobListing.location, JobListing.city).filter(
+            JobListing.city_id.is_(None)
+        ).limit(BACKFILL_BATCH_SIZE).all()
+        if not rows:
+            break
+
+        mappings = []
+        for row in rows:
+            city = gazetteer.geocode(row.location) or gazetteer.geocode(row.city)
+            mapping = {'id': row.id, 'city_id': city.id if city else UNKNOWN_CITY_ID}
+            if city:
+                mapping['city'] = city.name_uk
+            mappings.append(mapping)
+        db.bulk_update_mappings(JobListing, mappings)
+        db.commit()
+        total += len(rows)
+
+    if total:
+        logger.info(f"Геокодовано {total} вакансій")
+    return total
@@ -0,0 +1,580 @@
+"""In-memory інвертований індекс активних вакансій
+
+Активних вакансій небагато і вони змінюються лише після скрапінгу, тому пошук
+повністю обслуговується з пам'яті: токен -> бітмапа документів, плюс бітмапи
+фасетів (місто, категорія, тип зайнятості). Бітмапи - звичайні Python int,
+де біт N відповідає документу з позицією N; AND/OR виконуються на рівні C.
+БД потрібна лише щоб завантажити вакансії, які показуються користувачу.
+
+Для сортування за релевантністю індекс також зберігає зважені частоти токенів
+(BM25F: заголовок важить більше за компанію, компанія - більше за опис) і
+довжини документів. Статистика колекції (кількість документів, середня
+довжина, idf) оновлюється після кожної побудови/оновлення, тобто після
+скрапінгу. Оцінюються лише кандидати, відібрані бітмапами.
+
+Оцінки залежать від статистики колекції та часу, тому між сторінками вони
+змінюються. Щоб сторінки не повторювали й не пропускали вакансій, ранжування
+виконується один раз: курсор запам'ятовує час оцінювання (pivot), а
+впорядкований список id зберігається в кеші ранжувань; наступні сторінки -
+зсув у цьому списку.
+
+Індекс читають потоки пулу БД (обробники), а оновлюють ingest з event loop
+та потоків, тому стан змінюється і читається під локом. Оновлення
+виконуються по одному; дані з БД завантажуються до взяття локу читання.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from array import array
+from collections import OrderedDict
+from bisect import bisect_left
+from datetime import datetime
+import heapq
+import json
+import logging
+import math
+from sys import intern
+import threading
+import time
+from sqlalchemy.orm import Session
+from database.models import JobListing
+from search.geo import radius_city_ids
+from search.lexicon import expand_query
+from search.cursor import NULL_DATE_KEY, ORDER_RANDOM, ORDER_RELEVANCE, ResultCursor, date_key
+from search.sampling import SHUFFLE_KEY_SPACE
+from search.text import parse_keywords, tokenize
+
+logger = logging.getLogger(__name__)
+
+# Фасети, які індексуються бітмапами
+FACET_FIELDS = ('city', 'category', 'employment_type')
+# Максимальна кількість токенів у запиті (як і для FTS)
+MAX_QUERY_TOKENS = 8
+# Розмір пачки при завантаженні з БД
+LOAD_BATCH_SIZE = 2000
+# Скільки "мертвих" позицій допускається до перебудови індексу
+COMPACT_THRESHOLD = 1024
+
+# Ваги полів для BM25F
+FIELD_BOOSTS = {'title': 3.0, 'company': 1.5, 'description': 1.0}
+BM25_K1 = 1.2
+BM25_B = 0.75
+# Скільки токенів словника враховується для одного префікса запиту
+MAX_PREFIX_EXPANSIONS = 32
+# Затухання за свіжістю: частка оцінки, що залежить від віку, та період напіврозпаду
+RECENCY_WEIGHT = 0.3
+RECENCY_HALF_LIFE_DAYS = 14
+# Скільки найкращих результатів зберігається в ранжуванні та скільки ранжувань у кеші
+MAX_RANKED_RESULTS = 1000
+RANKING_CACHE_SIZE = 2000
+
+
+def iter_bits(bitmap: int) -> List[int]:
+    """Повертає позиції встановлених бітів (від молодших до старших)"""
+    positions = []
+    bits = bin(bitmap)[:1:-1]  # молодший біт першим, без префікса '0b'
+    pos = bits.find('1')
+    while pos != -1:
+        positions.append(pos)
+        pos = bits.find('1', pos + 1)
+    return positions
+
+
+def stat_key(row) -> Tuple:
+    """Внесок вакансії у статистику ринку: (джерело, місто, категорія, середина вилки зарплати)"""
+    salaries = [float(s) for s in (row.salary_min, row.salary_max) if s is not None]
+    salary = sum(salaries) / len(salaries) if salaries else None
+    return (row.source or '', row.city or '', row.category or '', salary)
+
+
+def ranking_key(filters_dict: Dict, query_text: str) -> str:
+    """Ключ ранжування в кеші (разом з часом оцінювання)"""
+    filters = {field: value for field, value in filters_dict.items() if value}
+    return json.dumps([filters, query_text or ''], sort_keys=True, ensure_ascii=False, default=str)
+
+
+class RankingCache:
+    """LRU ранжувань за релевантністю: (час оцінювання, пошук) -> id у порядку показу"""
+
+    def __init__(self, max_size: int = RANKING_CACHE_SIZE):
+        self.max_size = max_size
+        self._entries: "OrderedDict[Tuple[int, str], array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Tuple[int, str]) -> Optional[array]:
+        with self._lock:
+            ranked = self._entries.get(key)
+            if ranked is not None:
+                self._entries.move_to_end(key)
+            return ranked
+
+    def set(self, key: Tuple[int, str], ranked: array):
+        with self._lock:
+            self._entries[key] = ranked
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+
+_rankings = RankingCache()
+
+
+class SearchIndex:
+    """Інвертований індекс активних вакансій"""
+
+    def __init__(self):
+        self.ready = False
+        self._ids = array('q')            # позиція -> id вакансії
+        self._positions: Dict[int, int] = {}  # id вакансії -> позиція
+        self._salary = array('d')         # позиція -> max(salary_min, salary_max) або 0
+        self._published = array('q')      # позиція -> date_key дати публікації
+        self._shuffle = array('q')        # позиція -> shuffle_key
+        self._fresh = array('q')          # позиція -> date_key публікації або скрапінгу
+        self._doc_length = array('d')     # позиція -> зважена довжина документа
+        self._term_weights: Dict[str, Dict[int, float]] = {}  # токен -> {позиція: зважена частота}
+        self._doc_terms: List[Tuple[str, ...]] = []  # позиція -> токени документа (для видалення)
+        self._avg_length = 1.0
+        self._idf: Dict[str, float] = {}
+        self._scored_at = date_key(datetime.utcnow())  # час для затухання за свіжістю
+        self._active = 0                  # бітмапа активних документів
+        self._postings: Dict[str, int] = {}
+        self._facets: Dict[str, Dict[str, int]] = {field: {} for field in FACET_FIELDS}
+        self._city_ids: Dict[int, int] = {}  # city_id -> бітмапа (для фільтра за радіусом)
+        self._stat_keys: List[Tuple] = []  # позиція -> внесок у статистику ринку (search/stats.py)
+        self._vocabulary: List[str] = []
+        self._vocabulary_dirty = False
+        self._lock = threading.RLock()  # стан індексу (читання та зміни)
+        self._write_lock = threading.Lock()  # оновлення по одному
+
+    def __len__(self) -> int:
+        with self._lock:
+            return bin(self._active).count('1')
+
+    def facet_values(self, job_ids: Iterable[int]) -> List[Tuple[str, ...]]:
+        """Значення фасетів (місто, категорія, тип) активних вакансій з індексу"""
+        with self._lock:
+            return self._facet_values(job_ids)
+
+    def _facet_values(self, job_ids: Iterable[int]) -> List[Tuple[str, ...]]:
+        positions = [self._positions[job_id] for job_id in job_ids if job_id in self._positions]
+        if not positions:
+            return []
+        mask = 0
+        for pos in positions:
+            mask |= 1 << pos
+
+        values = {pos: [''] * len(FACET_FIELDS) for pos in positions}
+        for i, field in enumerate(FACET_FIELDS):
+            for value, bitmap in self._facets[field].items():
+                if bitmap & mask:
+                    for pos in iter_bits(bitmap & mask):
+                        values[pos][i] = value
+        return [tuple(value) for value in values.values()]
+
+    def stat_values(self, job_ids: Iterable[int]) -> List[Tuple]:
+        """Внески активних вакансій у статистику: (джерело, місто, категорія, зарплата або None)"""
+        with self._lock:
+            return [self._stat_keys[self._positions[job_id]] for job_id in job_ids if job_id in self._positions]
+
+    def is_active(self, job_id: int) -> Optional[bool]:
+        """Чи є вакансія серед активних (None, якщо індекс ще не побудовано)"""
+        if not self.ready:
+            return None
+        with self._lock:
+            return job_id in self._positions
+
+    # --- Побудова та оновлення ---
+
+    @staticmethod
+    def _load_rows(db: Session, job_ids: Optional[List[int]] = None):
+        """Завантажує поля, потрібні індексу"""
+        query = db.query(
+            JobListing.id, JobListing.search_text, JobListing.title, JobListing.company,
+            JobListing.city, JobListing.city_id, JobListing.category, JobListing.employment_type,
+            JobListing.salary_min, JobListing.salary_max, JobListing.published_date,
+            JobListing.scraped_at, JobListing.shuffle_key, JobListing.is_active, JobListing.source
+        )
+        if job_ids is None:
+            return query.filter(JobListing.is_active == True).yield_per(LOAD_BATCH_SIZE)
+        return query.filter(JobListing.id.in_(job_ids)).all()
+
+    def _add(self, row):
+        """Додає документ в індекс (нова позиція)"""
+        pos = len(self._ids)
+        bit = 1 << pos
+        self._ids.append(row.id)
+        self._positions[row.id] = pos
+
+        salaries = [float(s) for s in (row.salary_min, row.salary_max) if s is not None]
+        self._salary.append(max(salaries) if salaries else 0.0)
+        self._published.append(date_key(row.published_date))
+        self._shuffle.append(row.shuffle_key or 0)
+        self._fresh.append(date_key(row.published_date or row.scraped_at))
+        self._stat_keys.append(stat_key(row))
+
+        # search_text = токени заголовка, компанії та опису підряд (build_search_text),
+        # тому поле кожного токена визначається його позицією
+        # intern: токени документа зберігаються в _doc_terms без копій рядків
+        tokens = [intern(token) for token in (row.search_text or '').split()]
+        title_end = len(tokenize(row.title or ''))
+        company_end = title_end + len(tokenize(row.company or ''))
+        weights: Dict[str, float] = {}
+        for i, token in enumerate(tokens):
+            if i < title_end:
+                boost = FIELD_BOOSTS['title']
+            elif i < company_end:
+                boost = FIELD_BOOSTS['company']
+            else:
+                boost = FIELD_BOOSTS['description']
+            weights[token] = weights.get(token, 0.0) + boost
+        self._doc_length.append(sum(weights.values()))
+        self._doc_terms.append(tuple(weights))
+
+        for token, weight in weights.items():
+            if token not in self._postings:
+                self._postings[token] = 0
+                self._term_weights[token] = {}
+                self._vocabulary_dirty = True
+            self._postings[token] |= bit
+            self._term_weights[token][pos] = weight
+
+        for field in FACET_FIELDS:
+            value = getattr(row, field)
+            if value:
+                facet = self._facets[field]
+                facet[value] = facet.get(value, 0) | bit
+        if row.city_id:
+            self._city_ids[row.city_id] = self._city_ids.get(row.city_id, 0) | bit
+
+        self._active |= bit
+
+    def _remove(self, job_ids: Iterable[int]):
+        """Прибирає документи з бітмап (токени - лише ті, під якими документ індексовано)"""
+        mask = 0
+        token_masks: Dict[str, int] = {}
+        for job_id in job_ids:
+            pos = self._positions.pop(job_id, None)
+            if pos is None:
+                continue
+            bit = 1 << pos
+            mask |= bit
+            for token in self._doc_terms[pos]:
+                token_masks[token] = token_masks.get(token, 0) | bit
+                self._term_weights[token].pop(pos, None)
+            self._doc_terms[pos] = ()
+        if not mask:
+            return
+
+        keep = ~mask
+        self._active &= keep
+        for token, token_mask in token_masks.items():
+            bitmap = self._postings[token] & ~token_mask
+            if bitmap:
+                self._postings[token] = bitmap
+            else:
+                del self._postings[token]
+                del self._term_weights[token]
+                self._vocabulary_dirty = True
+        for facet in self._facets.values():
+            for value in list(facet):
+                if facet[value] & mask:
+                    facet[value] &= keep
+                    if not facet[value]:
+                        del facet[value]
+        for city_id in list(self._city_ids):
+            if self._city_ids[city_id] & mask:
+                self._city_ids[city_id] &= keep
+                if not self._city_ids[city_id]:
+                    del self._city_ids[city_id]
+
+    def build(self, db: Session):
+        """Будує індекс з усіх активних вакансій"""
+        start_time = time.time()
+        with self._write_lock, self._lock:
+            for row in self._load_rows(db):
+                self._add(row)
+            self._refresh_stats()
+            self.ready = True
+        logger.info(f"Пошуковий індекс побудовано: {len(self)} вакансій, "
+                    f"{len(self._postings)} токенів за {time.time() - start_time:.2f}с")
+
+    def _adopt(self, other: "SearchIndex"):
+        """Переймає стан іншого (щойно побудованого) індексу"""
+        state = dict(other.__dict__)
+        state.pop('_lock')
+        state.pop('_write_lock')
+        self.__dict__.update(state)
+
+    def refresh(self, db: Session, job_ids: Iterable[int]):
+        """Інкрементально оновлює індекс для змінених вакансій"""
+        job_ids = list(job_ids)
+        if not job_ids:
+            return
+        with self._write_lock:
+            # Позиції не перевикористовуються, тому при великій кількості
+            # видалених документів індекс будується заново окремо і підміняє
+            # стан цього одним кроком - читачі бачать або старий, або новий
+            if len(self._ids) > 2 * len(self._positions) + COMPACT_THRESHOLD:
+                fresh = SearchIndex()
+                fresh.build(db)
+                with self._lock:
+                    self._adopt(fresh)
+                return
+
+            rows = self._load_rows(db, job_ids)
+            with self._lock:
+                self._remove(job_ids)
+                for row in rows:
+                    if row.is_active:
+                        self._add(row)
+                self._refresh_stats()
+
+    def _refresh_stats(self):
+        """Оновлює статистику колекції для BM25 (idf рахується ліниво)"""
+        positions = self._positions.values()
+        if positions:
+            self._avg_length = sum(self._doc_length[pos] for pos in positions) / len(positions) or 1.0
+        self._idf = {}
+        self._scored_at = date_key(datetime.utcnow())
+
+    @property
+    def scored_at(self) -> int:
+        """Час (date_key), від якого рахується свіжість у нових ранжуваннях"""
+        return self._scored_at
+
+    # --- Пошук ---
+
+    def _expand_prefix(self, token: str) -> List[str]:
+        """Токени словника, що починаються з token"""
+        if self._vocabulary_dirty:
+            self._vocabulary = sorted(self._postings)
+            self._vocabulary_dirty = False
+
+        expansions = []
+        i = bisect_left(self._vocabulary, token)
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(token):
+            expansions.append(self._vocabulary[i])
+            i += 1
+        return expansions
+
+    def _token_bitmap(self, token: str) -> int:
+        """Бітмапа документів з токенами, що починаються з token"""
+        bitmap = 0
+        for expansion in self._expand_prefix(token):
+            bitmap |= self._postings[expansion]
+        return bitmap
+
+    def _token_idf(self, token: str) -> float:
+        """idf токена (BM25, завжди додатний)"""
+        idf = self._idf.get(token)
+        if idf is None:
+            total = len(self._positions)
+            df = bin(self._postings[token]).count('1')
+            idf = self._idf[token] = math.log(1 + (total - df + 0.5) / (df + 0.5))
+        return idf
+
+    def score(self, positions: List[int], query_text: str, now_key: int = None) -> Dict[int, float]:
+        """
+        Оцінки релевантності (BM25F з затуханням за свіжістю) для кандидатів
+
+        Для префікса запиту береться найкращий з токенів словника, що з нього
+        починаються; оцінки токенів запиту сумуються.
+        """
+        with self._lock:
+            return self._score(positions, query_text, now_key)
+
+    def _score(self, positions: List[int], query_text: str, now_key: int = None) -> Dict[int, float]:
+        scores = dict.fromkeys(positions, 0.0)
+        lengths = self._doc_length
+        norm = BM25_K1 / self._avg_length * BM25_B
+        base = BM25_K1 * (1 - BM25_B)
+
+        for group in expand_query(query_text)[:MAX_QUERY_TOKENS]:
+            expansions = list(dict.fromkeys(
+                expansion for alternative in group for expansion in self._expand_prefix(alternative)
+            ))
+            # Точний збіг першим, далі найкоротші продовження
+            expansions.sort(key=lambda t: (t not in group, len(t)))
+            best: Dict[int, float] = {}
+            for expansion in expansions[:MAX_PREFIX_EXPANSIONS]:
+                idf = self._token_idf(expansion)
+                weights = self._term_weights[expansion]
+                # Обходимо менший з двох наборів: кандидати або документи з токеном
+                if len(weights) < len(scores):
+                    matches = [(pos, tf) for pos, tf in weights.items() if pos in scores]
+                else:
+                    matches = [(pos, weights[pos]) for pos in positions if pos in weights]
+                for pos, tf in matches:
+                    value = idf * tf * (BM25_K1 + 1) / (tf + base + norm * lengths[pos])
+                    if value > best.get(pos, 0.0):
+                        best[pos] = value
+            for pos, value in best.items():
+                scores[pos] += value
+
+        if now_key is None:
+            now_key = self._scored_at
+        half_life = RECENCY_HALF_LIFE_DAYS * 86400 * 1_000_000
+        fresh = self._fresh
+        for pos in positions:
+            if fresh[pos] == NULL_DATE_KEY:
+                decay = 0.0
+            else:
+                decay = 0.5 ** (max(now_key - fresh[pos], 0) / half_life)
+            scores[pos] *= 1 - RECENCY_WEIGHT + RECENCY_WEIGHT * decay
+        return scores
+
+    def _text_bitmap(self, text: str) -> Optional[int]:
+        """Бітмапа для тексту: кожен токен (або його переклад) має збігтися префіксно"""
+        groups = expand_query(text)[:MAX_QUERY_TOKENS]
+        if not groups:
+            return None
+        bitmap = self._active
+        for group in groups:
+            group_bitmap = 0
+            for alternative in group:
+                group_bitmap |= self._token_bitmap(alternative)
+            bitmap &= group_bitmap
+            if not bitmap:
+                break
+        return bitmap
+
+    def match(self, filters_dict: Dict, query_text: str = None) -> Optional[int]:
+        """
+        Бітмапа вакансій, що відповідають фільтрам і тексту
+
+        Returns:
+            Бітмапа або None, якщо запит не можна обслужити індексом
+            (наприклад, запит з однієї літери - тоді працює SQL)
+        """
+        with self._lock:
+            return self._match(filters_dict, query_text)
+
+    def _match(self, filters_dict: Dict, query_text: str = None) -> Optional[int]:
+        bitmap = self._active
+
+        # Місто з радіусом - об'єднання бітмап сусідніх міст замість фасета
+        city_ids = radius_city_ids(filters_dict)
+        if city_ids is not None:
+            city_bitmap = 0
+            for city_id in city_ids:
+                city_bitmap |= self._city_ids.get(city_id, 0)
+            bitmap &= city_bitmap
+
+        for field in FACET_FIELDS:
+            value = filters_dict.get(field)
+            if value and not (field == 'city' and city_ids is not None):
+                bitmap &= self._facets[field].get(value, 0)
+
+        texts = parse_keywords(filters_dict.get("keywords"))
+        if query_text:
+            texts.insert(0, query_text)
+        for text in texts:
+            text_bitmap = self._text_bitmap(text)
+            if text_bitmap is None:
+                return None
+            bitmap &= text_bitmap
+
+        return bitmap
+
+    def window(self, filters_dict: Dict, query_text: str, cursor: ResultCursor,
+               limit: int) -> Optional[List[Tuple[int, int]]]:
+        """
+        Наступне вікно результатів після позиції курсора
+
+        Args:
+            filters_dict: Фільтри користувача
+            query_text: Текст запиту
+            cursor: Позиція (порядок recent, random або relevance)
+            limit: Розмір вікна
+
+        Returns:
+            Пари (id, ключ сортування) або None, якщо потрібен SQL-фолбек
+        """
+        if not self.ready:
+            return None
+        with self._lock:
+            return self._window(filters_dict, query_text, cursor, limit)
+
+    def _window(self, filters_dict: Dict, query_text: str, cursor: ResultCursor,
+                limit: int) -> Optional[List[Tuple[int, int]]]:
+        bitmap = self._match(filters_dict, query_text)
+        if bitmap is None:
+            return None
+
+        positions = iter_bits(bitmap)
+
+        if filters_dict.get("salary_min"):
+            try:
+                s_min = float(filters_dict["salary_min"])
+                positions = [pos for pos in positions if self._salary[pos] >= s_min]
+            except (ValueError, TypeError):
+                pass
+
+        ids = self._ids
+        if cursor.order == ORDER_RANDOM:
+            keys = self._shuffle
+            pivot = cursor.pivot
+
+            def sort_key(pos):
+                return ((keys[pos] - pivot) % SHUFFLE_KEY_SPACE, ids[pos])
+
+            if cursor.started:
+                last = ((cursor.last_key - pivot) % SHUFFLE_KEY_SPACE, cursor.last_id)
+                positions = [pos for pos in positions if sort_key(pos) > last]
+            positions = heapq.nsmallest(limit, positions, key=sort_key)
+        elif cursor.order == ORDER_RELEVANCE:
+            if cursor.pivot is None:
+                # Курсор без часу оцінювання (старий формат) - ранжування не відтворити
+                return None
+            return self._ranked_window(positions, filters_dict, query_text or '', cursor, limit)
+        else:
+            keys = self._published
+
+            def sort_key(pos):
+                return (keys[pos], ids[pos])
+
+            if cursor.started:
+                last = (cursor.last_key, cursor.last_id)
+                positions = [pos for pos in positions if sort_key(pos) < last]
+            positions = heapq.nlargest(limit, positions, key=sort_key)
+
+        return [(ids[pos], keys[pos]) for pos in positions]
+
+    def _ranked_window(self, positions: List[int], filters_dict: Dict, query_text: str,
+                       cursor: ResultCursor, limit: int) -> List[Tuple[int, int]]:
+        """Вікно з ранжування пошуку; ключ результату - зсув у ранжуванні після нього"""
+        key = (cursor.pivot, ranking_key(filters_dict, query_text))
+        ranked = _rankings.get(key)
+        if ranked is None:
+            # Перша сторінка (або ранжування витіснено) - оцінюємо на час курсора
+            scores = self._score(positions, query_text, cursor.pivot)
+            ids = self._ids
+            top = heapq.nlargest(MAX_RANKED_RESULTS, positions, key=lambda pos: (scores[pos], ids[pos]))
+            ranked = array('q', (ids[pos] for pos in top))
+            _rankings.set(key, ranked)
+
+        offset = cursor.last_key if cursor.started else 0
+        rows = []
+        while offset < len(ranked) and len(rows) < limit:
+            job_id = ranked[offset]
+            offset += 1
+            # Вакансії, що стали неактивними після ранжування, пропускаються
+            if job_id in self._positions:
+                rows.append((job_id, offset))
+        return rows
+
+
+# Поточний індекс процесу (замінюється цілком при перебудові)
+_search_index = SearchIndex()
+
+
+def get_search_index() -> SearchIndex:
+    """Повертає поточний індекс"""
+    return _search_index
+
+
+def rebuild_search_index(db: Session) -> SearchIndex:
+    """Будує новий індекс та атомарно підміняє поточний"""
+    global _search_index
+    index = SearchIndex()
+    index.build(db)
+    _search_index = index
+    return index
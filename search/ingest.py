@@ -0,0 +1,39 @@
+"""Оновлення пошукових структур після зміни вакансій (викликається ingest-ом)"""
+from typing import Iterable
+import logging
+from sqlalchemy.orm import Session
+from search.facets import update_facet_counts
+from search.fts import index_jobs
+from search.index import get_search_index
+from search.stats import rebuild_job_stats, update_job_stats
+
+logger = logging.getLogger(__name__)
+
+
+def on_jobs_changed(db: Session, job_ids: Iterable[int]):
+    """
+    Оновлює повнотекстовий та in-memory індекси, лічильники фасетів і
+    статистику ринку для вказаних вакансій
+
+    Викликати після commit нових/оновлених вакансій.
+    """
+    job_ids = list(job_ids)
+    if not job_ids:
+        return
+
+    index = get_search_index()
+    # Старі значення фасетів і внески в статистику беремо з індексу до його оновлення
+    old_facets = index.facet_values(job_ids) if index.ready else None
+    old_stats = index.stat_values(job_ids) if index.ready else None
+
+    index_jobs(db, job_ids)
+
+    if index.ready:
+        index.refresh(db, job_ids)
+
+    update_facet_counts(db, job_ids, old_facets)
+
+    if old_stats is None:
+        rebuild_job_stats(db)
+    else:
+        update_job_stats(db, old_stats, index.stat_values(job_ids))
@@ -0,0 +1,141 @@
+"""Розширення запитів: українські та російські слова -> польські
+
+Користувачі здебільшого пишуть запити українською ("водій", "склад"), а
+вакансії з OLX/Pracuj - польською ("kierowca", "magazyn"). Словник
+професій (search/data/job_terms.csv) та правила транслітерації кирилиці в
+польську абетку компілюються в таблицю пошуку при першому зверненні.
+
+Запит розгортається в групи альтернатив: кожен токен запиту - група з самого
+токена, польських відповідників та транслітерації. Пошук вимагає збігу хоча б
+однієї альтернативи з кожної групи, тож усі варіанти перевіряються одним
+запитом (бітмапи індексу, OR у FTS), без окремих звернень до БД.
+"""
+from typing import Dict, List, Optional, Tuple
+from functools import lru_cache
+import csv
+import logging
+import os
+import re
+from search.text import fold_text, tokenize
+
+logger = logging.getLogger(__name__)
+
+LEXICON_FILE = os.path.join(os.path.dirname(__file__), "data", "job_terms.csv")
+# Максимальна кількість токенів у запиті (як і для індексу та FTS)
+MAX_QUERY_TOKENS = 8
+# Максимальна кількість альтернатив для одного токена
+MAX_ALTERNATIVES = 6
+# Найкоротша основа слова для збігу за префіксом ("воді*")
+MIN_STEM_LENGTH = 3
+# Скільки розгорнутих запитів запам'ятовується
+EXPANSION_CACHE_SIZE = 4096
+
+# Апостроф усередині слова ("кур'єр") не розділяє його на токени
+_APOSTROPHE_RE = re.compile(r"(?<=\w)['’ʼ`](?=\w)")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+_CYRILLIC_RE = re.compile(r"[а-яіїєґёыэъ]")
+# Літери, що є лише в російській абетці
+_RUSSIAN_RE = re.compile(r"[ёыэъ]")
+
+# Кирилиця -> польська абетка (до згортання діакритики)
+_TRANSLIT_UK = {
+    'а': 'a', 'б': 'b', 'в': 'w', 'г': 'h', 'ґ': 'g', 'д': 'd', 'е': 'e',
+    'є': 'je', 'ж': 'ż', 'з': 'z', 'и': 'y', 'і': 'i', 'ї': 'ji', 'й': 'j',
+    'к': 'k', 'л': 'l', 'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r',
+    'с': 's', 'т': 't', 'у': 'u', 'ф': 'f', 'х': 'ch', 'ц': 'c', 'ч': 'cz',
+    'ш': 'sz', 'щ': 'szcz', 'ь': '', 'ю': 'ju', 'я': 'ja',
+}
+_TRANSLIT_RU = dict(_TRANSLIT_UK, **{
+    'г': 'g', 'и': 'i', 'ё': 'jo', 'ы': 'y', 'э': 'e', 'ъ': '',
+})
+
+
+def _clean_words(text: str) -> List[str]:
+    """Слова запиту в нижньому регістрі (з діакритикою, без апострофів)"""
+    return _WORD_RE.findall(_APOSTROPHE_RE.sub("", (text or "").lower()))
+
+
+def transliterate(word: str) -> List[str]:
+    """
+    Варіанти написання кириличного слова польською абеткою (згорнуті)
+
+    "менеджер" -> ["menedzer"], "логістика" -> ["lohistyka", "logistyka"]:
+    українське "г" у запозиченнях часто відповідає польському "g".
+    """
+    table = _TRANSLIT_RU if _RUSSIAN_RE.search(word) else _TRANSLIT_UK
+    variants = [''.join(table.get(ch, ch) for ch in word)]
+    if table is _TRANSLIT_UK and 'г' in word:
+        variants.append(''.join(_TRANSLIT_UK.get(ch, ch) if ch != 'г' else 'g' for ch in word))
+    return [fold_text(variant) for variant in variants]
+
+
+class Lexicon:
+    """Словник відповідників: точні слова та основи (з '*')"""
+
+    def __init__(self, path: str = LEXICON_FILE):
+        self._words: Dict[str, Tuple[str, ...]] = {}
+        self._stems: Dict[str, Tuple[str, ...]] = {}
+        with open(path, encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                term = row["term"].strip()
+                target = self._stems if term.endswith("*") else self._words
+                key = fold_text("".join(_clean_words(term)))
+                polish = tuple(token for value in row["pl"].split("|") for token in tokenize(value))
+                target[key] = target.get(key, ()) + polish
+
+    def __len__(self) -> int:
+        return len(self._words) + len(self._stems)
+
+    def lookup(self, token: str) -> Tuple[str, ...]:
+        """Польські відповідники токена: точне слово або найдовша основа"""
+        if token in self._words:
+            return self._words[token]
+        for length in range(len(token), MIN_STEM_LENGTH - 1, -1):
+            polish = self._stems.get(token[:length])
+            if polish is not None:
+                return polish
+        return ()
+
+
+_lexicon: Optional[Lexicon] = None
+
+
+def get_lexicon() -> Lexicon:
+    """Словник (компілюється при першому зверненні)"""
+    global _lexicon
+    if _lexicon is None:
+        _lexicon = Lexicon()
+        logger.info(f"Словник розширення запитів завантажено: {len(_lexicon)} термінів")
+    return _lexicon
+
+
+def normalize_query(text: str) -> str:
+    """Ключ кешу розширень: слова в нижньому регістрі через пробіл"""
+    return " ".join(_clean_words(text))
+
+
+@lru_cache(maxsize=EXPANSION_CACHE_SIZE)
+def _expand(normalized: str) -> Tuple[Tuple[str, ...], ...]:
+    lexicon = get_lexicon()
+    groups = []
+    for word in normalized.split():
+        for token in tokenize(word):
+            alternatives = [token]
+            if _CYRILLIC_RE.search(word):
+                alternatives.extend(lexicon.lookup(token))
+                alternatives.extend(transliterate(word))
+            # Без дублікатів, порядок зберігається (сам токен - першим)
+            unique = [alt for alt in dict.fromkeys(alternatives) if len(alt) >= 2 or alt.isdigit()]
+            groups.append(tuple(unique[:MAX_ALTERNATIVES]))
+    return tuple(groups[:MAX_QUERY_TOKENS])
+
+
+def expand_query(text: str) -> Tuple[Tuple[str, ...], ...]:
+    """
+    Групи альтернатив для запиту
+
+    "водій склад" -> (("водіи", "kierowc", "wodij"), ("склад", "magazyn", "sklad"))
+    Кожна група має збігтися хоча б однією альтернативою (префіксно).
+    Результат кешується за нормалізованим запитом.
+    """
+    return _expand(normalize_query(text))
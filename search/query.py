@@ -0,0 +1,170 @@
+"""Побудова запитів пошуку вакансій"""
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, Session
+from database.models import JobListing
+from search.fts import match_clause
+from search.geo import radius_city_ids
+from search.lexicon import expand_query
+from search.index import get_search_index
+from search.cursor import ORDER_RANDOM, ORDER_RECENT, ORDER_RELEVANCE, ResultCursor, date_key, key_to_date
+from search.sampling import random_window
+from search.text import parse_keywords
+
+# Скільки результатів завантажується за один раз
+RESULT_WINDOW_SIZE = 10
+
+
+def apply_filters(db_query: Query, filters_dict: Dict) -> Query:
+    """Застосовує збережені фільтри користувача (крім ключових слів)"""
+    city_ids = radius_city_ids(filters_dict)
+    if city_ids is not None:
+        db_query = db_query.filter(JobListing.city_id.in_(city_ids))
+    elif filters_dict.get("city"):
+        db_query = db_query.filter(JobListing.city == filters_dict["city"])
+    
+    if filters_dict.get("category"):
+        db_query = db_query.filter(JobListing.category == filters_dict["category"])
+    
+    if filters_dict.get("employment_type"):
+        db_query = db_query.filter(JobListing.employment_type == filters_dict["employment_type"])
+    
+    if filters_dict.get("salary_min"):
+        try:
+            s_min = float(filters_dict["salary_min"])
+            db_query = db_query.filter(
+                or_(
+                    JobListing.salary_min >= s_min,
+                    JobListing.salary_max >= s_min
+                )
+            )
+        except (ValueError, TypeError):
+            pass
+    
+    return db_query
+
+
+def apply_text_search(db_query: Query, db: Session, query_text: str, fields=None) -> Query:
+    """
+    Фільтр за текстом: повнотекстовий індекс, якщо він є, інакше ILIKE
+    
+    Args:
+        db_query: Запит до JobListing
+        db: Сесія БД (для визначення діалекту)
+        query_text: Текст запиту
+        fields: Поля для ILIKE-фолбеку (за замовчуванням title, description, company)
+    """
+    if not query_text:
+        return db_query
+    
+    clause = match_clause(db, query_text)
+    if clause is not None:
+        return db_query.filter(clause)
+    
+    fields = fields or (JobListing.title, JobListing.description, JobListing.company)
+    condition = or_(*[field.ilike(f"%{query_text}%") for field in fields])
+    # Переклади токенів (search.lexicon) - в тому ж запиті
+    translated = [group[1:] for group in expand_query(query_text)]
+    if translated and all(translated):
+        condition = or_(condition, and_(*[
+            or_(*[field.ilike(f"%{token}%") for token in group for field in fields])
+            for group in translated
+        ]))
+    return db_query.filter(condition)
+
+
+def apply_keywords(db_query: Query, db: Session, keywords: str) -> Query:
+    """Фільтр за ключовими словами з фільтрів (кожне слово має збігтися)"""
+    for kw in parse_keywords(keywords):
+        db_query = apply_text_search(
+            db_query, db, kw, fields=(JobListing.title, JobListing.description)
+        )
+    return db_query
+
+
+def build_search_query(db: Session, filters_dict: Dict, query_text: str = None) -> Query:
+    """Запит активних вакансій з усіма фільтрами та текстом"""
+    db_query = db.query(JobListing).filter(JobListing.is_active == True)
+    db_query = apply_text_search(db_query, db, query_text)
+    db_query = apply_filters(db_query, filters_dict)
+    db_query = apply_keywords(db_query, db, filters_dict.get("keywords"))
+    return db_query
+
+
+def recent_window(db_query: Query, cursor: ResultCursor, limit: int) -> List[Tuple[int, int]]:
+    """
+    Наступне вікно порядку (published_date DESC NULLS LAST, id DESC) після курсора
+    
+    Returns:
+        Пари (id, date_key)
+    """
+    rows_query = db_query.with_entities(JobListing.id, JobListing.published_date)
+    
+    if cursor.started:
+        last_date = key_to_date(cursor.last_key)
+        if last_date is None:
+            rows_query = rows_query.filter(
+                JobListing.published_date.is_(None),
+                JobListing.id < cursor.last_id
+            )
+        else:
+            rows_query = rows_query.filter(or_(
+                JobListing.published_date < last_date,
+                and_(JobListing.published_date == last_date, JobListing.id < cursor.last_id),
+                JobListing.published_date.is_(None)
+            ))
+    
+    rows = rows_query.order_by(
+        JobListing.published_date.desc().nullslast(), JobListing.id.desc()
+    ).limit(limit).all()
+    return [(row.id, date_key(row.published_date)) for row in rows]
+
+
+def fetch_window(db: Session, filters_dict: Dict, query_text: str = None,
+                 cursor: ResultCursor = None, limit: int = RESULT_WINDOW_SIZE) -> Tuple[List[int], Optional[ResultCursor]]:
+    """
+    Повертає наступне вікно id вакансій та курсор для наступного вікна
+    
+    Спочатку in-memory індекс (без SQL), якщо він побудований і може обслужити
+    запит; інакше - SQL з повнотекстовим індексом та keyset-умовою (порядок
+    relevance тоді замінюється на recent).
+    
+    Args:
+        filters_dict: Фільтри користувача
+        query_text: Текст запиту
+        cursor: Позиція (ResultCursor.start(order) для першого вікна)
+        limit: Розмір вікна
+    
+    Returns:
+        (id вакансій, курсор наступного вікна або None, якщо результати закінчились)
+    """
+    cursor = cursor or ResultCursor.start(ORDER_RECENT)
+    
+    index = get_search_index()
+    if cursor.order == ORDER_RELEVANCE and cursor.pivot is None and not cursor.started:
+        # Нове ранжування оцінюється на час останнього оновлення індексу
+        cursor = ResultCursor(ORDER_RELEVANCE, pivot=index.scored_at)
+    
+    # Беремо на один рядок більше, щоб знати чи є наступне вікно
+    rows = index.window(filters_dict, query_text, cursor, limit + 1)
+    if rows is None and cursor.order == ORDER_RELEVANCE:
+        # Релевантність рахує лише in-memory індекс; без нього - найновіші першими,
+        # а посеред сесії - далі від дати останньої показаної вакансії
+        if cursor.started:
+            published = db.query(JobListing.published_date).filter(JobListing.id == cursor.last_id).scalar()
+            cursor = ResultCursor.start(ORDER_RECENT).advance(date_key(published), cursor.last_id)
+        else:
+            cursor = ResultCursor.start(ORDER_RECENT)
+    if rows is None:
+        db_query = build_search_query(db, filters_dict, query_text)
+        if cursor.order == ORDER_RANDOM:
+            rows = random_window(db_query, cursor.pivot, cursor.last_key, cursor.last_id, limit + 1)
+        else:
+            rows = recent_window(db_query, cursor, limit + 1)
+    
+    if len(rows) <= limit:
+        return [job_id for job_id, _ in rows], None
+    
+    rows = rows[:limit]
+    last_id, last_key = rows[-1]
+    return [job_id for job_id, _ in rows], cursor.advance(last_key, last_id)
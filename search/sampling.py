@@ -0,0 +1,124 @@
+"""Випадкова вибірка вакансій без ORDER BY random()
+
+Кожна вакансія отримує випадковий shuffle_key при створенні. Вибірка - це
+"вікно" з limit рядків за індексом shuffle_key, починаючи з випадкової точки
+(з переходом через початок). Порядок ключів випадковий, тому вікно є
+випадковою підмножиною, а БД читає лише limit рядків з індексу замість
+сортування всього відфільтрованого набору. Наступні вікна продовжують з
+позиції останнього рядка (див. search.cursor).
+
+Точка старту - будь-яке значення ключа, а після кожного скрапінгу активні
+вакансії отримують нові ключі (reshuffle_keys). Інакше кожен пошук був би
+зсувом однієї незмінної перестановки: ті самі вакансії завжди поруч і в тому
+самому порядку, а вакансії після великого проміжку ключів - частіше першими.
+"""
+from typing import List, Tuple
+import logging
+import random
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Query, Session
+from database.models import JobListing
+
+logger = logging.getLogger(__name__)
+
+SHUFFLE_KEY_MAX = 2 ** 31 - 1
+SHUFFLE_KEY_SPACE = SHUFFLE_KEY_MAX + 1
+# Розмір пачки при заповненні ключів
+BACKFILL_BATCH_SIZE = 1000
+
+
+def random_shuffle_key() -> int:
+    """Випадковий ключ перемішування"""
+    return random.randint(0, SHUFFLE_KEY_MAX)
+
+
+def random_pivot() -> int:
+    """Випадкова точка старту вибірки"""
+    return random.randrange(SHUFFLE_KEY_SPACE)
+
+
+def random_window(db_query: Query, pivot: int, last_key: int = None,
+                  last_id: int = None, limit: int = 10) -> List[Tuple[int, int]]:
+    """
+    Наступне вікно випадкового порядку: (shuffle_key, id) від pivot до кінця,
+    далі від початку до pivot
+
+    Args:
+        db_query: Запит до JobListing з усіма фільтрами
+        pivot: Випадкова точка старту
+        last_key, last_id: Позиція останнього показаного результату
+        limit: Розмір вікна
+
+    Returns:
+        Пари (id, shuffle_key)
+    """
+    rows_query = db_query.with_entities(JobListing.id, JobListing.shuffle_key).order_by(
+        JobListing.shuffle_key, JobListing.id
+    )
+    after = None
+    if last_id is not None:
+        after = or_(
+            JobListing.shuffle_key > last_key,
+            and_(JobListing.shuffle_key == last_key, JobListing.id > last_id)
+        )
+
+    rows = []
+    # Фаза 1: ключі >= pivot (поки не дійшли до фази 2)
+    if last_id is None or last_key >= pivot:
+        phase_query = rows_query.filter(JobListing.shuffle_key >= pivot)
+        if after is not None:
+            phase_query = phase_query.filter(after)
+        rows = phase_query.limit(limit).all()
+        after = None
+
+    # Фаза 2: ключі < pivot
+    if len(rows) < limit:
+        phase_query = rows_query.filter(JobListing.shuffle_key < pivot)
+        if after is not None:
+            phase_query = phase_query.filter(after)
+        rows += phase_query.limit(limit - len(rows)).all()
+
+    return [(row.id, row.shuffle_key) for row in rows]
+
+
+def reshuffle_keys(db: Session) -> int:
+    """Нові випадкові ключі для активних вакансій (нова перестановка після скрапінгу)"""
+    total = 0
+    last_id = 0
+    while True:
+        job_ids = [
+            row.id for row in db.query(JobListing.id)
+            .filter(JobListing.is_active == True, JobListing.id > last_id)
+            .order_by(JobListing.id).limit(BACKFILL_BATCH_SIZE).all()
+        ]
+        if not job_ids:
+            break
+        db.bulk_update_mappings(
+            JobListing, [{'id': job_id, 'shuffle_key': random_shuffle_key()} for job_id in job_ids]
+        )
+        db.commit()
+        total += len(job_ids)
+        last_id = job_ids[-1]
+    return total
+
+
+def backfill_shuffle_keys(db: Session) -> int:
+    """Заповнює shuffle_key для вакансій, створених до його появи"""
+    total = 0
+    while True:
+        job_ids = [
+            row.id for row in db.query(JobListing.id)
+            .filter(JobListing.shuffle_key.is_(None))
+            .limit(BACKFILL_BATCH_SIZE).all()
+        ]
+        if not job_ids:
+            break
+        db.bulk_update_mappings(
+            JobListing, [{'id': job_id, 'shuffle_key': random_shuffle_key()} for job_id in job_ids]
+        )
+        db.commit()
+        total += len(job_ids)
+
+    if total:
+        logger.info(f"Заповнено shuffle_key для {total} вакансій")
+    return total
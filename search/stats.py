@@ -0,0 +1,176 @@
+"""Знімок статистики ринку для /stats
+
+Таблиця job_stats зберігає лічильники активних вакансій (усього, за
+містом, категорією та джерелом) разом із сумою та кількістю зарплат для
+середніх, а також кількість користувачів. Ingest коригує лічильники на
+різницю між старим і новим внеском змінених вакансій (нова, оновлена,
+деактивована, знову активна), тому /stats не виконує COUNT/GROUP BY, а
+читає готові рядки - і то не частіше за STATS_CACHE_TTL_SECONDS.
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+import time
+from sqlalchemy import func
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+from config import settings
+from database.models import JobListing, JobStat, User
+
+logger = logging.getLogger(__name__)
+
+# Виміри статистики
+TOTAL = "total"
+USERS = "users"
+BY_FIELD = ("city", "category", "source")
+
+StatDelta = Dict[Tuple[str, str], List[float]]  # (вимір, значення) -> [кількість, сума зарплат, кількість зарплат]
+
+
+def _add_contribution(deltas: StatDelta, contribution: Tuple, sign: int):
+    source, city, category, salary = contribution
+    keys = [(TOTAL, '')] + [
+        (dimension, value) for dimension, value in zip(BY_FIELD, (city, category, source)) if value
+    ]
+    for key in keys:
+        delta = deltas.setdefault(key, [0, 0.0, 0])
+        delta[0] += sign
+        if salary is not None:
+            delta[1] += sign * salary
+            delta[2] += sign
+
+
+def _apply(db: Session, deltas: StatDelta):
+    """Додає різниці до рядків таблиці (рядок створюється при першій зміні)"""
+    rows = [
+        {'dimension': dimension, 'key': key, 'item_count': count, 'salary_sum': salary_sum, 'salary_count': salary_count}
+        for (dimension, key), (count, salary_sum, salary_count) in deltas.items()
+        if count or salary_sum or salary_count
+    ]
+    if not rows:
+        return
+    dialect = db.get_bind().dialect.name
+    insert = postgresql.insert if dialect == "postgresql" else sqlite.insert
+    stmt = insert(JobStat).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[JobStat.dimension, JobStat.key],
+        set_={
+            'item_count': JobStat.item_count + stmt.excluded.item_count,
+            'salary_sum': JobStat.salary_sum + stmt.excluded.salary_sum,
+            'salary_count': JobStat.salary_count + stmt.excluded.salary_count,
+        }
+    )
+    db.execute(stmt)
+
+
+def update_job_stats(db: Session, old_values: Iterable[Tuple], new_values: Iterable[Tuple]):
+    """
+    Коригує лічильники на різницю внесків змінених вакансій
+
+    Args:
+        old_values: Внески цих вакансій до зміни (SearchIndex.stat_values)
+        new_values: Внески після зміни (неактивних вакансій серед них немає)
+    """
+    deltas: StatDelta = {}
+    for contribution in old_values:
+        _add_contribution(deltas, contribution, -1)
+    for contribution in new_values:
+        _add_contribution(deltas, contribution, 1)
+    _apply(db, deltas)
+    db.commit()
+    _cache.invalidate()
+
+
+def increment_user_count(db: Session):
+    """Новий користувач (без commit - у транзакції реєстрації)"""
+    _apply(db, {(USERS, ''): [1, 0.0, 0]})
+    _cache.invalidate()
+
+
+def rebuild_job_stats(db: Session):
+    """Повністю перераховує таблицю (початкове заповнення та відновлення)"""
+    salary = func.coalesce(
+        (JobListing.salary_min + JobListing.salary_max) / 2, JobListing.salary_min, JobListing.salary_max
+    )
+    salary_count = func.count(salary)
+    rows = []
+    total = db.query(func.count(JobListing.id), func.sum(salary), salary_count).filter(
+        JobListing.is_active == True
+    ).one()
+    rows.append((TOTAL, '', *total))
+    for dimension in BY_FIELD:
+        column = getattr(JobListing, dimension)
+        rows.extend(
+            (dimension, value, *aggregates) for value, *aggregates in db.query(
+                column, func.count(JobListing.id), func.sum(salary), salary_count
+            ).filter(JobListing.is_active == True, column.isnot(None), column != '').group_by(column)
+        )
+    rows.append((USERS, '', db.query(func.count(User.id)).filter(User.is_active == True).scalar(), 0, 0))
+
+    db.query(JobStat).delete(synchronize_session=False)
+    db.bulk_insert_mappings(JobStat, [
+        {'dimension': dimension, 'key': key, 'item_count': count or 0,
+         'salary_sum': float(salary_sum or 0), 'salary_count': salary_count or 0}
+        for dimension, key, count, salary_sum, salary_count in rows
+    ])
+    db.commit()
+    _cache.invalidate()
+    logger.info("Статистику ринку перераховано")
+
+
+def job_stats_empty(db: Session) -> bool:
+    """Таблиця ще не заповнена (перший запуск після міграції)"""
+    return db.query(JobStat.dimension).first() is None
+
+
+class StatsSnapshot:
+    """Знімок таблиці статистики"""
+
+    def __init__(self, rows: List[JobStat]):
+        self._rows: Dict[str, Dict[str, Tuple[int, Optional[float]]]] = {}
+        for row in rows:
+            average = row.salary_sum / row.salary_count if row.salary_count else None
+            self._rows.setdefault(row.dimension, {})[row.key] = (row.item_count, average)
+
+    def count(self, dimension: str, key: str = '') -> int:
+        return self._rows.get(dimension, {}).get(key, (0, None))[0]
+
+    def average_salary(self, dimension: str = TOTAL, key: str = '') -> Optional[float]:
+        return self._rows.get(dimension, {}).get(key, (0, None))[1]
+
+    def top(self, dimension: str, limit: int = 10) -> List[Tuple[str, int, Optional[float]]]:
+        """Значення виміру з найбільшою кількістю вакансій: (значення, кількість, середня зарплата)"""
+        values = [(key, count, average) for key, (count, average) in self._rows.get(dimension, {}).items() if count > 0]
+        values.sort(key=lambda value: (-value[1], value[0]))
+        return values[:limit]
+
+
+class _SnapshotCache:
+    """Копія знімка в пам'яті процесу з коротким TTL"""
+
+    def __init__(self):
+        self._snapshot: Optional[StatsSnapshot] = None
+        self._expires_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, db: Session) -> StatsSnapshot:
+        with self._lock:
+            if self._snapshot is not None and self._expires_at > time.monotonic():
+                return self._snapshot
+        snapshot = StatsSnapshot(db.query(JobStat).all())
+        with self._lock:
+            self._snapshot = snapshot
+            self._expires_at = time.monotonic() + settings.STATS_CACHE_TTL_SECONDS
+        return snapshot
+
+    def invalidate(self):
+        with self._lock:
+            self._expires_at = 0.0
+
+
+_cache = _SnapshotCache()
+
+
+def load_stats_snapshot(db: Session) -> StatsSnapshot:
+    """Знімок статистики (з пам'яті, з таблиці - не частіше за STATS_CACHE_TTL_SECONDS)"""
+    return _cache.get(db)
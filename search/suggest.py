@@ -0,0 +1,132 @@
+"""Підказки запитів з історії пошуку
+
+Популярні запити з search_history нормалізуються (як і текст вакансій) та
+складаються у префіксне дерево. У кожному вузлі дерева зберігається готовий
+топ запитів з цим префіксом, тому пошук підказок - це лише прохід по літерах
+префікса, без звернень до БД. Дерево перебудовується періодично
+планувальником.
+"""
+from typing import Dict, List, Tuple
+from datetime import datetime, timedelta
+import heapq
+import logging
+import math
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from database.models import SearchHistory
+from search.text import tokenize
+
+logger = logging.getLogger(__name__)
+
+# Скільки підказок зберігається у вузлі
+TOP_SUGGESTIONS = 5
+# Скільки найпопулярніших запитів потрапляє в дерево
+MAX_QUERIES = 5000
+# За який період враховується історія
+HISTORY_DAYS = 90
+# Найкоротший префікс для "можливо, ви мали на увазі"
+MIN_PREFIX_LENGTH = 2
+
+
+def normalize_query(text: str) -> str:
+    """Нормалізований запит: токени без регістру та діакритики через пробіл"""
+    return " ".join(tokenize(text))
+
+
+class _Node:
+    __slots__ = ("children", "top")
+
+    def __init__(self):
+        self.children: Dict[str, "_Node"] = {}
+        self.top: List[Tuple[float, str]] = []
+
+
+class SuggestionIndex:
+    """Префіксне дерево популярних запитів"""
+
+    def __init__(self):
+        self._root = _Node()
+        self.size = 0
+
+    def add(self, query: str, weight: float):
+        """Додає запит, оновлюючи топ у кожному вузлі шляху"""
+        node = self._root
+        self._push(node, weight, query)
+        for char in query:
+            node = node.children.setdefault(char, _Node())
+            self._push(node, weight, query)
+        self.size += 1
+
+    @staticmethod
+    def _push(node: _Node, weight: float, query: str):
+        node.top.append((weight, query))
+        if len(node.top) > TOP_SUGGESTIONS:
+            node.top.sort(reverse=True)
+            node.top.pop()
+
+    def complete(self, prefix: str, limit: int = TOP_SUGGESTIONS) -> List[str]:
+        """Найпопулярніші запити, що починаються з prefix (O(довжина префікса))"""
+        node = self._root
+        for char in normalize_query(prefix):
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return [query for _, query in sorted(node.top, reverse=True)[:limit]]
+
+    def popular(self, limit: int = TOP_SUGGESTIONS) -> List[str]:
+        """Найпопулярніші запити загалом"""
+        return [query for _, query in sorted(self._root.top, reverse=True)[:limit]]
+
+    def did_you_mean(self, text: str, limit: int = TOP_SUGGESTIONS) -> List[str]:
+        """
+        Підказки для запиту без результатів
+
+        Беремо все коротші префікси запиту, поки не знайдуться інші запити
+        (так "kierocwa" знаходить "kierowca" через префікс "kiero").
+        """
+        query = normalize_query(text)
+        for length in range(len(query), MIN_PREFIX_LENGTH - 1, -1):
+            suggestions = [s for s in self.complete(query[:length], limit + 1) if s != query]
+            if suggestions:
+                return suggestions[:limit]
+        return []
+
+
+def build_suggestion_index(db: Session) -> SuggestionIndex:
+    """Будує дерево з історії пошуку (лише запити, що мали результати)"""
+    since = datetime.utcnow() - timedelta(days=HISTORY_DAYS)
+    rows = db.query(
+        SearchHistory.query, func.count(SearchHistory.id), func.max(SearchHistory.results_count)
+    ).filter(
+        SearchHistory.created_at >= since,
+        SearchHistory.query.isnot(None),
+        SearchHistory.results_count > 0
+    ).group_by(SearchHistory.query).all()
+
+    # Різні написання одного запиту ("Kraków", "krakow") зливаються
+    weights: Dict[str, float] = {}
+    for text, count, results_count in rows:
+        query = normalize_query(text)
+        if len(query) >= MIN_PREFIX_LENGTH:
+            weights[query] = weights.get(query, 0.0) + count * math.log1p(results_count)
+
+    index = SuggestionIndex()
+    for query, weight in heapq.nlargest(MAX_QUERIES, weights.items(), key=lambda item: item[1]):
+        index.add(query, weight)
+    return index
+
+
+_suggestion_index = SuggestionIndex()
+
+
+def get_suggestion_index() -> SuggestionIndex:
+    """Повертає поточне дерево підказок"""
+    return _suggestion_index
+
+
+def rebuild_suggestion_index(db: Session) -> SuggestionIndex:
+    """Перебудовує дерево та атомарно підміняє поточне"""
+    global _suggestion_index
+    _suggestion_index = build_suggestion_index(db)
+    logger.info(f"Підказки пошуку перебудовано: {_suggestion_index.size} запитів")
+    return _suggestion_index
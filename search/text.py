@@ -0,0 +1,50 @@
+"""Нормалізація та токенізація тексту для пошуку"""
+from typing import List
+import re
+import unicodedata
+
+# Літери, які не розкладаються через NFKD
+_SPECIAL_FOLDS = str.maketrans({
+    'ł': 'l',
+    'đ': 'd',
+    'ø': 'o',
+    'ß': 'ss',
+    'ё': 'е',
+})
+
+_TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def fold_text(text: str) -> str:
+    """
+    Приводить текст до нижнього регістру та прибирає діакритику
+
+    "Wrocław" -> "wroclaw", "Kraków" -> "krakow", "Київ" -> "киів"
+    (однаково для тексту вакансій і для запитів, тому збіг не залежить від
+    того, чи користувач набрав польські літери)
+    """
+    if not text:
+        return ""
+    text = text.lower().translate(_SPECIAL_FOLDS)
+    decomposed = unicodedata.normalize('NFKD', text)
+    return ''.join(ch for ch in decomposed if not unicodedata.combining(ch))
+
+
+def tokenize(text: str, min_length: int = 2) -> List[str]:
+    """Розбиває текст на нормалізовані токени"""
+    return [
+        token for token in _TOKEN_RE.findall(fold_text(text))
+        if len(token) >= min_length or token.isdigit()
+    ]
+
+
+def parse_keywords(keywords: str) -> List[str]:
+    """Розбиває рядок ключових слів (через кому)"""
+    if not keywords:
+        return []
+    return [kw.strip() for kw in keywords.split(",") if kw.strip()]
+
+
+def build_search_text(title: str = None, company: str = None, description: str = None) -> str:
+    """Будує нормалізований текст вакансії для повнотекстового індексу"""
+    return ' '.join(tokenize(' '.join(part for part in (title, company, description) if part)))